@@ -1,7 +1,5 @@
 import random
 import numpy as np
-import keras as k
-import tensorflow as tf
 import model
 
 # REGUL_CONST = 0.5
@@ -62,6 +60,22 @@ class OurAgent:
         act_values = self.nnet.model.predict(state)
         return np.argmax(act_values[0])  # returns action
 
+    def act_batch(self, states):
+        """
+        Arguments: N x input_dim array of the current states of N environments.
+        Returns: Array of N actions, each random or the action with the highest
+            predicted reward, predicted with one network call for the batch.
+        """
+        actions = np.array([
+            random.randint(0, self.output_dim - 1)
+            if random.random() <= self.epsilon else -1
+            for _ in range(len(states))])
+        greedy = actions < 0
+        if greedy.any():
+            act_values = self.nnet.model.predict(states[greedy])
+            actions[greedy] = np.argmax(act_values, axis=1)
+        return actions
+
     def store_state(self, state, action, reward, next_state, done):
         """
         Adds the below arguments into the systems memory
@@ -0,0 +1,215 @@
+"""Throughput and latency benchmarks of cipher.py and cracker.py
+
+Run with:
+    python3 src/benchmark.py [--save results.json] [--compare baseline.json]
+
+Each benchmark records the characters (or keys) processed per second and the
+latency percentiles of a single call. With --compare the results are checked
+against a saved baseline, and the exit status is 1 if any benchmark regressed
+by more than --threshold.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import numpy as np
+import cipher
+import cracker
+import stream
+
+# TEXT_SIZES: default text sizes in characters, from one digraph to megabytes
+TEXT_SIZES = [2, 100, 10000, 1000000]
+
+# KEY_COUNTS: default numbers of keys
+KEY_COUNTS = [1, 100, 10000, 100000]
+
+# ANNEALER_SIZES: default cipher text sizes of the cracker.Annealer benchmarks
+ANNEALER_SIZES = [2300, 20000, 200000]
+
+# BATCH_TEXT_SZ: text size used by the benchmarks over many keys
+BATCH_TEXT_SZ = 100
+
+# MIN_TIME: each benchmark repeats until it has run for this many seconds
+MIN_TIME = 0.2
+
+# MIN_REPEAT, MAX_REPEAT: bounds on the number of calls per benchmark
+MIN_REPEAT = 3
+MAX_REPEAT = 10000
+
+# THRESHOLD: default allowed slowdown before a benchmark counts as regressed
+THRESHOLD = 0.1
+
+# PERCENTILES: latency percentiles recorded for every benchmark
+PERCENTILES = [50, 90, 99]
+
+
+def measure(func, units):
+    """
+    Calls func repeatedly and records its latency
+
+    Arguments:
+        func: function taking no arguments
+        units: number of characters (or keys) processed by a single call
+    Returns:
+        Dictionary of the number of calls, units per second and the latency
+        percentiles in seconds
+    """
+    samples = []
+    total = 0.0
+    while len(samples) < MAX_REPEAT and (
+            len(samples) < MIN_REPEAT or total < MIN_TIME):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        total += elapsed
+    result = {
+        'calls': len(samples),
+        'per_sec': units * len(samples) / total if total else float('inf'),
+    }
+    for pct, value in zip(PERCENTILES, np.percentile(samples, PERCENTILES)):
+        result['p{}'.format(pct)] = float(value)
+    return result
+
+
+def random_text(size, rng):
+    """Returns size random letters"""
+    return ''.join(rng.choice('abcdefghiklmnopqrstuvwxyz') for _ in range(size))
+
+
+def random_table(rng):
+    """Returns a random quadgram log probability table"""
+    return np.log10(np.random.default_rng(rng.getrandbits(64)).random(
+        (26,) * 4))
+
+
+def run(text_sizes=TEXT_SIZES, key_counts=KEY_COUNTS, seed=0,
+        annealer_sizes=ANNEALER_SIZES):
+    """
+    Runs every benchmark
+
+    Returns:
+        Dictionary of benchmark name to the result of measure
+    """
+    rng = random.Random(seed)
+    results = {}
+    key = cipher.generate_key(rng)
+
+    results['generate_key'] = measure(lambda: cipher.generate_key(rng), 1)
+    for size in text_sizes:
+        plain = random_text(size, rng)
+        encp = cipher.encipher_text(key, plain)
+        results['encipher_text/{}'.format(size)] = measure(
+            lambda: cipher.encipher_text(key, plain), size)
+        results['decipher_text/{}'.format(size)] = measure(
+            lambda: cipher.decipher_text(key, encp), size)
+        results['encipher_stream/{}'.format(size)] = measure(
+            lambda: sum(map(len, stream.encipher_stream(key, [plain]))), size)
+
+    for count in key_counts:
+        keys = [cipher.generate_key(rng) for _ in range(count)]
+        texts = [random_text(BATCH_TEXT_SZ, rng) for _ in range(min(count, 100))]
+        texts = (texts * (count // len(texts) + 1))[:count]
+        key_arr = cipher.key_array(keys)
+        text_arr = cipher.text_array(texts)
+        units = count * BATCH_TEXT_SZ
+
+        def compile_all():
+            cipher._compile_key.cache_clear()
+            for each in keys:
+                cipher.compile_key(each)
+
+        results['compile_key/{}'.format(count)] = measure(compile_all, count)
+        results['encipher_text/keys/{}'.format(count)] = measure(
+            lambda: [cipher.encipher_text(k, t) for k, t in zip(keys, texts)],
+            units)
+        results['encipher_batch/keys/{}'.format(count)] = measure(
+            lambda: cipher.encipher_batch(key_arr, text_arr), units)
+        results['decipher_batch/keys/{}'.format(count)] = measure(
+            lambda: cipher.decipher_batch(key_arr, text_arr), units)
+
+    table = random_table(rng)
+    for size in annealer_sizes:
+        state = cracker.Annealer(table, random_text(size, rng), key)
+        results['key_score/{}'.format(size)] = measure(
+            lambda: state.key_score(cracker.mutate_swap(key, rng)), size)
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Compares results against a baseline
+
+    Arguments:
+        results: output of run
+        baseline: output of run saved earlier
+        threshold: fraction a benchmark may slow down by, in throughput or
+            in median latency, before it counts as regressed
+    Returns:
+        List of (name, old per_sec, new per_sec) of every regressed benchmark
+    """
+    regressions = []
+    for name, new in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        slower = new['per_sec'] < old['per_sec'] * (1 - threshold)
+        slower |= new['p50'] > old['p50'] * (1 + threshold)
+        if slower:
+            regressions.append((name, old['per_sec'], new['per_sec']))
+    return regressions
+
+
+def print_results(results):
+    """Prints the results as a table"""
+    print("{:32} {:>14} {:>12} {:>12} {:>12}".format(
+        'benchmark', 'per sec', 'p50 (s)', 'p90 (s)', 'p99 (s)'))
+    for name, result in results.items():
+        print("{:32} {:>14.0f} {:>12.3g} {:>12.3g} {:>12.3g}".format(
+            name, result['per_sec'], result['p50'], result['p90'],
+            result['p99']))
+
+
+def main(args):
+    """
+    Runs every benchmark, prints, saves and compares the results, and exits
+        with status 1 if a benchmark regressed
+
+    Arguments:
+        args: parsed command line arguments, see the __main__ block (the bench
+            command of cli.py takes the same ones)
+    """
+    results = run([size + size % 2 for size in args.sizes], args.keys,
+                  args.seed,
+                  [max(size + size % 2, 4) for size in args.annealer_sizes])
+    print_results(results)
+    if args.save:
+        with open(args.save, 'w') as outf:
+            json.dump(results, outf, indent=2)
+    regressions = []
+    if args.compare:
+        with open(args.compare) as inf:
+            regressions = compare(results, json.load(inf), args.threshold)
+        for name, old, new in regressions:
+            print("REGRESSION {}: {:.0f} -> {:.0f} per sec".format(
+                name, old, new))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(
+        description='Benchmark cipher.py and cracker.py')
+    PARSER.add_argument('--sizes', type=int, nargs='+', default=TEXT_SIZES,
+                        help='text sizes in characters (rounded to even)')
+    PARSER.add_argument('--keys', type=int, nargs='+', default=KEY_COUNTS,
+                        help='numbers of keys')
+    PARSER.add_argument('--annealer-sizes', type=int, nargs='+',
+                        default=ANNEALER_SIZES,
+                        help='cipher text sizes of the annealer benchmarks')
+    PARSER.add_argument('--seed', type=int, default=0)
+    PARSER.add_argument('--save', help='file to save the results to')
+    PARSER.add_argument('--compare', help='baseline results to compare to')
+    PARSER.add_argument('--threshold', type=float, default=THRESHOLD)
+    main(PARSER.parse_args())
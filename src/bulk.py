@@ -0,0 +1,158 @@
+"""Enciphers a corpus with many keys at once, spread over several processes
+
+Run with:
+    python3 src/bulk.py <corpus> <outfile> (--keys <keyfile> | --count <n>)
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import cipher
+import training_data
+
+# CHUNK_SZ: default number of characters in each record, must be even
+CHUNK_SZ = 100
+
+# SHARD_SZ: default number of records handed to a worker at a time
+SHARD_SZ = 4096
+
+
+def read_keys(filename):
+    """
+    Reads a key file, one key of 25 letters per line, blank lines are skipped
+
+    Returns:
+        list of keys as lists of characters
+    """
+    keys = []
+    with open(filename) as inf:
+        for line in inf:
+            line = line.strip()
+            if line:
+                cipher.compile_key(line)  # validates the key
+                keys.append(list(line))
+    return keys
+
+
+def random_keys(count, seed):
+    """Returns count keys from generate_key, seeded with seed"""
+    rng = random.Random(seed)
+    return [cipher.generate_key(rng) for _ in range(count)]
+
+
+def shards(chunks, keys, shard_sz):
+    """
+    Groups the chunks into shards of shard_sz records, record number i is
+        enciphered with keys[i % len(keys)], so the assignment of keys does
+        not depend on the number of workers
+
+    Returns:
+        Generator of lists of (chunk, key) tuples
+    """
+    shard = []
+    for idx, chunk in enumerate(chunks):
+        shard.append((chunk, keys[idx % len(keys)]))
+        if len(shard) == shard_sz:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def encipher_shard(shard):
+    """
+    Enciphers a shard of records with the batch api
+
+    Arguments:
+        shard: list of (chunk, key) tuples
+    Returns:
+        Tuple of N x chunk_sz arrays of deciphered and enciphered text, and
+        the N x 25 array of keys
+    """
+    keys = cipher.key_array([key for _, key in shard])
+    plain = cipher.text_array([chunk for chunk, _ in shard])
+    encp = cipher.encipher_batch(keys, plain)
+    return cipher.decipher_batch(keys, encp), encp, keys
+
+
+def write_jsonl(outf, result):
+    """Writes a shard result as one JSON object per record"""
+    decp, encp, keys = result
+    for plain, ciph, key in zip(cipher.array_text(decp),
+                                cipher.array_text(encp),
+                                cipher.array_text(keys)):
+        outf.write(json.dumps({'plain': plain, 'cipher': ciph, 'key': key}))
+        outf.write('\n')
+
+
+def write_binary(outf, result):
+    """
+    Writes a shard result as fixed width records of the ascii bytes of the
+        deciphered text, enciphered text and key
+    """
+    decp, encp, keys = result
+    for row in zip(decp, encp, keys):
+        for arr in row:
+            outf.write(arr.tobytes())
+
+
+def run(corpus, out_name, keys, chunk_sz=CHUNK_SZ, shard_sz=SHARD_SZ,
+        fmt='jsonl', workers=None):
+    """
+    Enciphers every chunk of the corpus and writes the records to out_name in
+        corpus order
+
+    Arguments:
+        corpus: string path to a text file
+        out_name: string path the records are written to
+        keys: list of keys, cycled over the records
+        chunk_sz: number of characters in each record, must be even
+        shard_sz: number of records handed to a worker at a time
+        fmt: 'jsonl' or 'binary'
+        workers: number of processes, defaults to the number of cpus
+    Returns:
+        The number of records written
+    """
+    if chunk_sz % 2:
+        raise ValueError("chunk_sz must be even")
+    if not keys:
+        raise ValueError("at least one key is needed")
+    write = write_jsonl if fmt == 'jsonl' else write_binary
+    count = 0
+    with multiprocessing.Pool(workers) as pool, \
+            open(out_name, 'w' if fmt == 'jsonl' else 'wb') as outf:
+        work = shards(training_data.iter_chunks(corpus, chunk_sz), keys,
+                      shard_sz)
+        # imap returns the shards in the order they were submitted
+        for result in pool.imap(encipher_shard, work):
+            write(outf, result)
+            count += len(result[2])
+    return count
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(
+        description='Encipher a corpus with many keys in parallel'
+    )
+    PARSER.add_argument('corpus')
+    PARSER.add_argument('outfile')
+    KEY_SRC = PARSER.add_mutually_exclusive_group(required=True)
+    KEY_SRC.add_argument('--keys', help='file of keys, one per line')
+    KEY_SRC.add_argument('--count', type=int, help='number of random keys')
+    PARSER.add_argument('--seed', type=int, default=0,
+                        help='seed for the random keys')
+    PARSER.add_argument('--chunk-sz', type=int, default=CHUNK_SZ)
+    PARSER.add_argument('--shard-sz', type=int, default=SHARD_SZ)
+    PARSER.add_argument('--format', choices=['jsonl', 'binary'],
+                        default='jsonl')
+    PARSER.add_argument('--workers', type=int, default=None)
+    ARGS = PARSER.parse_args()
+
+    if ARGS.keys:
+        KEYS = read_keys(ARGS.keys)
+    else:
+        KEYS = random_keys(ARGS.count, ARGS.seed)
+    COUNT = run(ARGS.corpus, ARGS.outfile, KEYS, ARGS.chunk_sz, ARGS.shard_sz,
+                ARGS.format, ARGS.workers)
+    print("Wrote {} records".format(COUNT), file=sys.stderr)
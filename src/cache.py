@@ -0,0 +1,156 @@
+"""Cache of generated datasets, keyed on everything that affects their content
+
+Each dataset is stored in its own directory under CACHE_DIR, named after a
+hash of the corpus contents, the chunk size, the seed and the format
+versions, so changing any of them generates a new dataset next to the old
+ones instead of silently reusing stale data. When the cache grows past its
+size limit the least recently used datasets are removed.
+"""
+import hashlib
+import json
+import os
+import shutil
+import dataset
+import stream
+import training_data as td
+
+# CACHE_DIR: default directory datasets are cached in
+CACHE_DIR = 'data/cache'
+
+# MAX_BYTES: default size limit of the cache
+MAX_BYTES = 1 << 30
+
+# GENERATOR_VERSION: version of the way datasets are generated from a corpus,
+#   changing it invalidates every cached dataset
+GENERATOR_VERSION = 2
+
+# HASHES_NAME: file remembering corpus hashes, so unchanged corpora are not
+#   read again
+HASHES_NAME = 'hashes.json'
+
+
+def _file_hash(filename):
+    """Returns the sha256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as inf:
+        for block in stream.read_blocks(inf):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def corpus_hash(filename, cache_dir=CACHE_DIR):
+    """
+    Returns the sha256 of a corpus, reusing the hash stored for the file if
+        its size and modification time have not changed
+    """
+    info = os.stat(filename)
+    stamp = [info.st_size, info.st_mtime_ns]
+    hashes_name = os.path.join(cache_dir, HASHES_NAME)
+    try:
+        with open(hashes_name) as inf:
+            hashes = json.load(inf)
+    except (IOError, ValueError):
+        hashes = {}
+    name = os.path.abspath(filename)
+    entry = hashes.get(name)
+    if entry and entry['stamp'] == stamp:
+        return entry['sha256']
+    digest = _file_hash(filename)
+    hashes[name] = {'stamp': stamp, 'sha256': digest}
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_name = hashes_name + '.{}.tmp'.format(os.getpid())
+    with open(tmp_name, 'w') as outf:
+        json.dump(hashes, outf)
+    os.replace(tmp_name, hashes_name)
+    return digest
+
+
+def cache_key(corpus_sha, subset_sz, seed):
+    """Returns the name of the cache entry of a dataset"""
+    inputs = json.dumps({
+        'corpus': corpus_sha,
+        'subset_sz': subset_sz,
+        'seed': seed,
+        'format': dataset.FORMAT_VERSION,
+        'generator': GENERATOR_VERSION,
+    }, sort_keys=True)
+    return hashlib.sha256(inputs.encode('ascii')).hexdigest()[:32]
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(dirpath, name))
+               for dirpath, _, filenames in os.walk(path)
+               for name in filenames)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_BYTES, keep=None):
+    """
+    Removes least recently used datasets (and incomplete ones) until the
+        cache fits in max_bytes
+
+    Arguments:
+        cache_dir: directory of the cache
+        max_bytes: size limit of the cache
+        keep: name of an entry that is never removed
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name == keep or not os.path.isdir(path) or name.endswith('.tmp'):
+            continue
+        meta = os.path.join(path, dataset.META_NAME)
+        if not os.path.exists(meta):
+            shutil.rmtree(path, ignore_errors=True)
+            continue
+        entries.append((os.path.getmtime(meta), _dir_size(path), path))
+    total = sum(size for _, size, _ in entries)
+    if keep and os.path.isdir(os.path.join(cache_dir, keep)):
+        total += _dir_size(os.path.join(cache_dir, keep))
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def get_dataset(corpus, subset_sz, seed, cache_dir=CACHE_DIR,
+                max_bytes=MAX_BYTES, workers=None):
+    """
+    Returns the dataset generated from a corpus, generating and caching it
+        only if no dataset was cached for the same inputs
+
+    Arguments:
+        corpus: string path to a text file
+        subset_sz: size of each chunk of text, must be even
+        seed: seed of the keys
+        cache_dir: directory of the cache
+        max_bytes: size limit of the cache
+        workers: number of processes generating a missing dataset, defaults
+            to the number of cpus
+    Returns:
+        The dataset.Dataset
+    """
+    corpus_sha = corpus_hash(corpus, cache_dir)
+    name = cache_key(corpus_sha, subset_sz, seed)
+    path = os.path.join(cache_dir, name)
+    try:
+        cached = dataset.Dataset(path)
+        # the header's modification time records when it was last used
+        os.utime(os.path.join(path, dataset.META_NAME))
+        return cached
+    except IOError:
+        # left over from an interrupted run
+        shutil.rmtree(path, ignore_errors=True)
+
+    # generate into a temporary directory, so a dataset is only ever visible
+    #   under its name once it is complete
+    tmp_path = path + '.{}.tmp'.format(os.getpid())
+    td.generate_dataset(corpus, subset_sz, tmp_path, seed, workers,
+                        corpus=corpus, corpus_sha256=corpus_sha)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # another process cached the same dataset first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    evict(cache_dir, max_bytes, keep=name)
+    return dataset.Dataset(path)
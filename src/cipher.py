@@ -1,67 +1,195 @@
 """Contains methods for the generation of cipher text and cipher keys"""
-from random import shuffle
+from functools import lru_cache
+import random
 from string import ascii_lowercase
+import numpy as np
 
+# ORD_A: ascii code of 'a', texts and keys in the batch api are stored as
+#   uint8 arrays of ascii codes
+ORD_A = ord('a')
+# LTR_I, LTR_J, LTR_X: letter numbers (0-25) of 'i', 'j' and 'x'
+LTR_I = ord('i') - ORD_A
+LTR_J = ord('j') - ORD_A
+LTR_X = ord('x') - ORD_A
 
-def generate_key():
+
+def generate_key(rng=random):
     """
     Creates a key table to encipher and decipher plain text
+
+    Arguments:
+        rng: random number generator to shuffle with, defaults to the global
+            random module
     Returns:
         The 5 x 5 array of unique letters (not containing 'j'), stored in a 1
         dimensional array
     """
     arr = list(ascii_lowercase)
-    shuffle(arr)
+    rng.shuffle(arr)
     arr.remove('j')
     return arr
 
 
+def _digraph_positions(step):
+    """
+    Builds the table of key positions a digraph is replaced with
+
+    Arguments:
+        step: 1 to encipher (shift right/down), -1 to decipher (shift
+            left/up)
+    Returns:
+        25 x 25 x 2 array, where [idx1, idx2] holds the key positions of the
+        two letters replacing the letters at key positions idx1 and idx2
+    """
+    table = np.zeros((25, 25, 2), dtype=np.uint8)
+    for idx1 in range(25):
+        for idx2 in range(25):
+            # 2. If letters are on same row replace each with letter to the
+            #   right (left when deciphering) on row, wrapping around if
+            #   necessary
+            if idx1 // 5 == idx2 // 5:
+                table[idx1, idx2] = [
+                    idx // 5 * 5 + ((idx + step) % 5) for idx in (idx1, idx2)
+                ]
+            # 3. Else if letters are in the same column replace with the
+            #   letters below (above when deciphering) wrapping if necessary
+            elif idx1 % 5 == idx2 % 5:
+                table[idx1, idx2] = [
+                    idx % 5 + 5 * (((idx // 5) + step) % 5)
+                    for idx in (idx1, idx2)
+                ]
+            # 4. If letters are not in the same row or column, replace each
+            #   letter with the letter in the same row but the opposite
+            #   corner of the rectangle defined by their positions
+            else:
+                table[idx1, idx2] = [
+                    idx2 % 5 + (idx1 // 5 * 5), idx1 % 5 + (idx2 // 5 * 5)
+                ]
+    return table
+
+
+# ENC_POS, DEC_POS: digraph position tables, the positions of the replacing
+#   letters only depend on the positions of the replaced letters, not on the
+#   key itself, so a single table serves every key
+ENC_POS = _digraph_positions(1)
+DEC_POS = _digraph_positions(-1)
+
+# SCHEDULE_CACHE_SZ: number of compiled keys kept by compile_key
+SCHEDULE_CACHE_SZ = 1024
+
+
+class KeySchedule:
+    """
+    A key compiled into lookup tables, so enciphering and deciphering a
+        digraph is a single table lookup
+
+    Attributes:
+        key: bytes of the 25 letters of the key
+        pos: bytes of length 26 mapping each letter number (0-25) to its
+            position in the key, 'j' shares the position of 'i'
+        fwd: bytes of length 26 * 26 * 2, the enciphered digraph of every
+            digraph, indexed by (letter1 * 26 + letter2) * 2
+        bwd: bytes of length 26 * 26 * 2, the deciphered digraph of every
+            digraph, indexed the same way as fwd
+    """
+    __slots__ = ('key', 'pos', 'fwd', 'bwd')
+
+    def __init__(self, key):
+        """
+        Arguments:
+            key: bytes of 25 unique lowercase letters not including 'j'
+        """
+        if (len(key) != 25 or len(set(key)) != 25 or not key.isalpha()
+                or not key.islower() or b'j' in key):
+            raise ValueError(
+                "key must be 25 unique lowercase letters not including 'j'"
+            )
+        key_arr = np.frombuffer(key, dtype=np.uint8)
+        pos = np.zeros(26, dtype=np.intp)
+        pos[key_arr - ORD_A] = np.arange(25)
+        pos[LTR_J] = pos[LTR_I]
+        # idx1, idx2: key positions of the letters of all 26 x 26 digraphs
+        idx1 = np.repeat(pos, 26)
+        idx2 = np.tile(pos, 26)
+        bwd = key_arr[DEC_POS[idx1, idx2]]
+        # 1. If both letters are the same, make second 'x'
+        idx2[idx1 == idx2] = pos[LTR_X]
+        fwd = key_arr[ENC_POS[idx1, idx2]]
+        self.key = bytes(key)
+        self.pos = pos.astype(np.uint8).tobytes()
+        self.fwd = fwd.tobytes()
+        self.bwd = bwd.tobytes()
+
+    def __len__(self):
+        return 25
+
+    def __getitem__(self, idx):
+        return self.key.decode('ascii')[idx]
+
+    def __iter__(self):
+        return iter(self.key.decode('ascii'))
+
+    def __repr__(self):
+        return 'KeySchedule({!r})'.format(self.key.decode('ascii'))
+
+    @staticmethod
+    def _translate(table, text):
+        """Replaces every digraph in text using the given digraph table"""
+        codes = text.encode('ascii')
+        if len(codes) % 2:
+            raise ValueError("text must have an even number of characters")
+        if codes and not (codes.isalpha() and codes.islower()):
+            raise ValueError("text must only contain lowercase letters")
+        return b''.join([
+            table[out:out + 2] for out in [
+                ((ch1 - ORD_A) * 26 + ch2 - ORD_A) * 2
+                for ch1, ch2 in zip(codes[0::2], codes[1::2])
+            ]
+        ]).decode('ascii')
+
+    def encipher(self, plain_text):
+        """Returns plain_text enciphered with this key"""
+        return KeySchedule._translate(self.fwd, plain_text)
+
+    def decipher(self, cipher_text):
+        """Returns cipher_text deciphered with this key"""
+        return KeySchedule._translate(self.bwd, cipher_text)
+
+
+@lru_cache(maxsize=SCHEDULE_CACHE_SZ)
+def _compile_key(key):
+    """Compiles the key bytes, cached on the key bytes"""
+    return KeySchedule(key)
+
+
+def compile_key(key):
+    """
+    Returns the KeySchedule of a key, reusing the schedule if the same key was
+        compiled recently
+
+    Arguments:
+        key: a KeySchedule, or 25 unique letters not including 'j' as a list
+            of characters (as returned by generate_key), a string or bytes
+    """
+    if isinstance(key, KeySchedule):
+        return key
+    if not isinstance(key, bytes):
+        key = ''.join(key).encode('ascii')
+    return _compile_key(key)
+
+
 def encipher_text(key, plain_text):
     """
     Generates the enciphered text for given key and plain text
 
     Arguments:
-        key: 5 x 5 array of unique letters not including 'j'
+        key: 5 x 5 array of unique letters not including 'j', or its
+            KeySchedule
         plain_text: String of characters to be enciphered
     Returns:
         String of the enciphered plain_text using the inputted key
     """
-    cipher_text = ""
-    for i in range(0, len(plain_text), 2):
-        # get current char pair, change j's to i's
-        ch1 = plain_text[i] if plain_text[i] != 'j' else 'i'
-        ch2 = plain_text[i+1] if plain_text[i+1] != 'j' else 'i'
-
-        # 1. If both letters are the same, make second 'x' and continue
-        if ch1 == ch2:
-            ch2 = 'x'
-        idx1 = key.index(ch1)
-        idx2 = key.index(ch2)
-
-        # 2. If letters are on same row replace each with letter to the right
-        #   on row, wrapping around the left side if necessary
-        if idx1 // 5 == idx2 // 5:
-            for idx in (idx1, idx2):
-                cipher_text += key[idx // 5 * 5 + ((idx + 1) % 5)]
-
-        # 3. Else if letters are in the same column replace with the letters
-        #   below wrapping to top if necessary
-        elif idx1 % 5 == idx2 % 5:
-            for idx in (idx1, idx2):
-                cipher_text += key[idx % 5 + 5 * (((idx // 5) + 1) % 5)]
-
-        # 4. If letters are not in the same row or column, replace each using
-        #   the rectangle defined by their positions, replace each letter using
-        #   with the letter in the same row but the opposite corner to that
-        #   letter
-        else:
-            cipher_text += key[
-                idx1 % 5 + (idx2 % 5 - idx1 % 5) + (idx1 // 5 * 5)
-            ]
-            cipher_text += key[
-                idx2 % 5 + (idx1 % 5 - idx2 % 5) + (idx2 // 5 * 5)
-            ]
-    return cipher_text
+    return compile_key(key).encipher(plain_text)
 
 
 def decipher_text(key, cipher_text):
@@ -70,44 +198,134 @@ def decipher_text(key, cipher_text):
 
     Arguments:
         key: 5 x 5 array of unique letters not including 'j', that was used to
-            encipher the given cipher text
+            encipher the given cipher text, or its KeySchedule
         cipher_text: String of characters to be deciphered
     Returns:
         String of the deciphered cipher_text using the inputted key
     """
-    deciphered_text = ""
-    for i in range(0, len(cipher_text), 2):
-        # get current char pair
-        ch1 = cipher_text[i] if cipher_text[i] != 'j' else 'i'
-        ch2 = cipher_text[i+1] if cipher_text[i+1] != 'j' else 'i'
-
-        idx1 = key.index(ch1)
-        idx2 = key.index(ch2)
-
-        # 2. If letters are on same row replace each with letter to the left
-        #   on row, wrapping around the right side if necessary
-        if idx1 // 5 == idx2 // 5:
-            for idx in (idx1, idx2):
-                deciphered_text += key[idx // 5 * 5 + ((idx - 1) % 5)]
-
-        # 3. Else if letters are in the same column replace with the letters
-        #   above wrapping to bottom if necessary
-        elif idx1 % 5 == idx2 % 5:
-            for idx in (idx1, idx2):
-                deciphered_text += key[idx % 5 + 5 * (((idx // 5) - 1) % 5)]
-
-        # 4. If letters are not in the same row or column, replace each using
-        #   the rectangle defined by their positions, replace each letter using
-        #   with the letter in the same row but the opposite corner to that
-        #   letter
-        else:
-            deciphered_text += key[
-                idx1 % 5 + (idx2 % 5 - idx1 % 5) + (idx1 // 5 * 5)
-            ]
-            deciphered_text += key[
-                idx2 % 5 + (idx1 % 5 - idx2 % 5) + (idx2 // 5 * 5)
-            ]
-    return deciphered_text
+    return compile_key(key).decipher(cipher_text)
+
+
+def key_array(keys):
+    """
+    Converts keys to the array representation used by the batch functions
+
+    Arguments:
+        keys: list of keys, each a list (or string) of 25 unique letters
+    Returns:
+        N x 25 uint8 array of the ascii codes of each key
+    """
+    return np.array(
+        [np.frombuffer(''.join(key).encode('ascii'), dtype=np.uint8)
+         for key in keys],
+        dtype=np.uint8
+    ).reshape(-1, 25)
+
+
+def text_array(texts):
+    """
+    Converts equal length strings to the array representation used by the
+        batch functions
+
+    Arguments:
+        texts: list of N strings of the same length
+    Returns:
+        N x len(text) uint8 array of the ascii codes of each text
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.uint8)
+    if len({len(text) for text in texts}) > 1:
+        raise ValueError("texts must all have the same length")
+    arr = np.frombuffer(''.join(texts).encode('ascii'), dtype=np.uint8)
+    return arr.reshape(len(texts), -1)
+
+
+def array_text(arr):
+    """
+    Converts an N x L uint8 array of ascii codes back into a list of strings
+    """
+    arr = np.ascontiguousarray(arr, dtype=np.uint8)
+    return [row.tobytes().decode('ascii') for row in arr]
+
+
+def _key_positions(keys):
+    """
+    Returns an N x 26 array mapping each letter number to its position in the
+        corresponding key, 'j' shares the position of 'i'
+    """
+    letters = keys.astype(np.intp) - ORD_A
+    if letters.min(initial=0) < 0 or letters.max(initial=0) > 25:
+        raise ValueError("keys must only contain lowercase letters")
+    rows = np.arange(len(keys))[:, None]
+    inv = np.full((len(keys), 26), -1, dtype=np.intp)
+    inv[rows, letters] = np.arange(25)
+    inv[:, LTR_J] = inv[:, LTR_I]
+    return inv
+
+
+def _batch_digraphs(keys, texts, table, double_x):
+    """
+    Replaces every digraph of every text using the key of the same row and
+        the given position table, see encipher_batch and decipher_batch
+    """
+    keys = np.asarray(keys, dtype=np.uint8)
+    texts = np.asarray(texts, dtype=np.uint8)
+    if keys.ndim != 2 or keys.shape[1] != 25:
+        raise ValueError("keys must have shape (N, 25)")
+    if texts.ndim != 2 or texts.shape[0] != keys.shape[0]:
+        raise ValueError("texts must have shape (N, L) matching the keys")
+    if texts.shape[1] % 2:
+        raise ValueError("texts must have an even number of characters")
+
+    letters = texts.astype(np.intp) - ORD_A
+    if letters.min(initial=0) < 0 or letters.max(initial=0) > 25:
+        raise ValueError("texts must only contain lowercase letters")
+    # change j's to i's
+    letters[letters == LTR_J] = LTR_I
+    ch1 = letters[:, 0::2]
+    ch2 = letters[:, 1::2]
+    if double_x:
+        # 1. If both letters are the same, make second 'x'
+        ch2 = np.where(ch1 == ch2, LTR_X, ch2)
+
+    inv = _key_positions(keys)
+    if (inv[:, :LTR_J] < 0).any() or (inv[:, LTR_J + 1:] < 0).any():
+        raise ValueError("keys must contain 25 unique letters other than 'j'")
+    rows = np.arange(len(keys))[:, None]
+    out_pos = table[inv[rows, ch1], inv[rows, ch2]]
+    result = np.empty_like(texts)
+    result[:, 0::2] = keys[rows, out_pos[..., 0]]
+    result[:, 1::2] = keys[rows, out_pos[..., 1]]
+    return result
+
+
+def encipher_batch(keys, plain_texts):
+    """
+    Enciphers many texts at once, each with its own key
+
+    Arguments:
+        keys: N x 25 uint8 array of keys (see key_array)
+        plain_texts: N x L uint8 array of texts to be enciphered, L even
+            (see text_array)
+    Returns:
+        N x L uint8 array where row n is encipher_text(keys[n],
+        plain_texts[n])
+    """
+    return _batch_digraphs(keys, plain_texts, ENC_POS, True)
+
+
+def decipher_batch(keys, cipher_texts):
+    """
+    Deciphers many texts at once, each with its own key
+
+    Arguments:
+        keys: N x 25 uint8 array of the keys used to encipher the texts
+        cipher_texts: N x L uint8 array of texts to be deciphered, L even
+    Returns:
+        N x L uint8 array where row n is decipher_text(keys[n],
+        cipher_texts[n])
+    """
+    return _batch_digraphs(keys, cipher_texts, DEC_POS, False)
 
 
 def print_key(key):
@@ -0,0 +1,183 @@
+"""Command line entry point of the project
+
+Run with:
+    python3 src/cli.py <command> [options]
+where command is one of:
+    generate: generates (or finds in the cache) the training data of a corpus
+    index: stores per episode statistics with the training data
+    train: trains an agent, optionally saving its weights
+    eval: runs an agent with saved weights on episodes it was not trained on
+    crack: recovers the key of a cipher text without the plain text
+    bench: benchmarks cipher.py and cracker.py
+
+Every command imports the modules it needs when it runs, so only train and
+eval pay for importing TensorFlow and the other commands start quickly.
+"""
+import argparse
+
+
+def _add_data_args(parser):
+    parser.add_argument('--corpus', default='data/melville-moby_dick.txt')
+    parser.add_argument('--subset-sz', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def generate(args):
+    """Generates the training data of a corpus into the dataset cache"""
+    import cache
+    import training_data as td
+
+    if args.out:
+        td.generate_dataset(args.corpus, args.subset_sz, args.out, args.seed,
+                            args.workers, corpus=args.corpus)
+        path = args.out
+    else:
+        path = cache.get_dataset(args.corpus, args.subset_sz, args.seed,
+                                 workers=args.workers).path
+    print(path)
+
+
+def index(args):
+    """Computes and stores the per episode statistics of a dataset"""
+    import numpy as np
+    import cache
+    import stats
+
+    path = args.dataset
+    if path is None:
+        path = cache.get_dataset(args.corpus, args.subset_sz, args.seed).path
+    episode_stats = stats.index(path)
+    for name in stats.STATS:
+        values = episode_stats[name]
+        print("{:18} min {:3d} mean {:6.2f} max {:3d}".format(
+            name, int(values.min()), float(np.mean(values)),
+            int(values.max())))
+
+
+def train(args):
+    """Trains an agent"""
+    import main
+
+    shard = None
+    if args.nodes > 1 or args.workers > 1 or args.shuffle_seed is not None:
+        shard = (args.node, args.nodes, args.worker, args.workers,
+                 args.shuffle_seed)
+    source = main.episode_source(args.corpus, args.subset_sz, args.seed,
+                                 args.sample, shard=shard)
+    our_agent, average, stats = main.train(source, args.episodes,
+                                           args.subset_sz)
+    print("Average = " + str(average))
+    print("Episode loading: {work_time:.2f}s, waited {wait_time:.2f}s "
+          "({overlap:.0%} overlapped)".format(**stats))
+    if args.save:
+        our_agent.nnet.model.save_weights(args.save)
+
+
+def evaluate(args):
+    """Runs an agent with saved weights"""
+    import agent
+    import main
+
+    our_agent = agent.OurAgent(main.INPUT_DIM, main.OUTPUT_DIM)
+    our_agent.nnet.model.load_weights(args.weights)
+    source = main.episode_source(args.corpus, args.subset_sz, args.seed,
+                                 args.sample, args.start)
+    average = main.evaluate(our_agent, source, args.episodes, args.subset_sz,
+                            args.envs)
+    print("Average = " + str(average))
+
+
+def crack(args):
+    """Recovers the key of a cipher text from its n-gram statistics"""
+    import cracker
+
+    cracker.main(args)
+
+
+def bench(args):
+    """Benchmarks cipher.py and cracker.py, exits with 1 on a regression"""
+    import benchmark
+
+    benchmark.main(args)
+
+
+def build_parser():
+    """Returns the argument parser of every command"""
+    parser = argparse.ArgumentParser(description='Deep learning Playfair')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    cmd = commands.add_parser('generate', help=generate.__doc__)
+    _add_data_args(cmd)
+    cmd.add_argument('--out', help='directory to write the dataset to '
+                                   'instead of the cache')
+    cmd.add_argument('--workers', type=int, default=None)
+    cmd.set_defaults(func=generate)
+
+    cmd = commands.add_parser('index', help=index.__doc__)
+    _add_data_args(cmd)
+    cmd.add_argument('--dataset', help='directory of the dataset, by default '
+                                       'the cached training data of corpus')
+    cmd.set_defaults(func=index)
+
+    cmd = commands.add_parser('train', help=train.__doc__)
+    _add_data_args(cmd)
+    cmd.add_argument('--episodes', type=int, default=2000)
+    cmd.add_argument('--sample', action='store_true',
+                     help='sample episodes from the corpus on the fly')
+    cmd.add_argument('--save', help='file to save the weights to')
+    cmd.add_argument('--nodes', type=int, default=1,
+                     help='number of machines training on the same data')
+    cmd.add_argument('--node', type=int, default=0,
+                     help='number of this machine')
+    cmd.add_argument('--workers', type=int, default=1,
+                     help='number of training processes on each machine')
+    cmd.add_argument('--worker', type=int, default=0,
+                     help='number of this process on its machine')
+    cmd.add_argument('--shuffle-seed', type=int, default=None,
+                     help='reshuffle the training data every epoch')
+    cmd.set_defaults(func=train)
+
+    cmd = commands.add_parser('eval', help=evaluate.__doc__)
+    _add_data_args(cmd)
+    cmd.add_argument('weights', help='file of weights saved by train')
+    cmd.add_argument('--episodes', type=int, default=100)
+    cmd.add_argument('--start', type=int, default=2000,
+                     help='index of the first episode of the training data, '
+                          'by default the first one train does not use with '
+                          'its default --episodes')
+    cmd.add_argument('--envs', type=int, default=32,
+                     help='number of episodes run side by side')
+    cmd.add_argument('--sample', action='store_true',
+                     help='sample episodes from the corpus on the fly')
+    cmd.set_defaults(func=evaluate)
+
+    cmd = commands.add_parser('crack', help=crack.__doc__)
+    cmd.add_argument('cipher_file')
+    cmd.add_argument('--corpus', default='data/melville-moby_dick.txt',
+                     help='corpus the n-gram tables are built from')
+    cmd.add_argument('--ngrams', default='data/ngrams',
+                     help='directory of the n-gram tables')
+    cmd.add_argument('--restarts', type=int, default=8)
+    cmd.add_argument('--iterations', type=int, default=20000)
+    cmd.add_argument('--seed', type=int, default=0)
+    cmd.add_argument('--workers', type=int, default=None)
+    cmd.set_defaults(func=crack)
+
+    cmd = commands.add_parser('bench', help=bench.__doc__)
+    cmd.add_argument('--sizes', type=int, nargs='+',
+                     default=[2, 100, 10000, 1000000])
+    cmd.add_argument('--keys', type=int, nargs='+',
+                     default=[1, 100, 10000, 100000])
+    cmd.add_argument('--annealer-sizes', type=int, nargs='+',
+                     default=[2300, 20000, 200000])
+    cmd.add_argument('--seed', type=int, default=0)
+    cmd.add_argument('--save', help='file to save the results to')
+    cmd.add_argument('--compare', help='baseline results to compare to')
+    cmd.add_argument('--threshold', type=float, default=0.1)
+    cmd.set_defaults(func=bench)
+    return parser
+
+
+if __name__ == '__main__':
+    ARGS = build_parser().parse_args()
+    ARGS.func(ARGS)
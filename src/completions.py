@@ -0,0 +1,218 @@
+"""Counts and samples the full keys consistent with a partial key
+
+A partial key (as returned by KeyState.get_key, ' ' marking unused spots) and
+the digraphs seen so far constrain where the remaining letters can go. Letter
+placements are searched with each letter's possible positions, and the
+occupied positions of the key, stored as 25 bit masks. Letters that appear in
+no digraph can fill the leftover positions in any order, so only the
+placements of constrained letters are enumerated and the rest is counted
+with a factorial.
+"""
+from math import factorial
+import random
+from string import ascii_lowercase
+import cipher
+import solver
+
+# LIMIT: default cap on the number of placements of constrained letters
+#   enumerated
+LIMIT = 100000
+
+# ALL: mask of every key position
+ALL = (1 << 25) - 1
+
+# UNUSED: placeholder of letters not placed yet
+UNUSED = -1
+
+# KEY_LETTERS: letter numbers of the 25 letters of a key
+KEY_LETTERS = [ord(char) - cipher.ORD_A for char in ascii_lowercase
+               if char != 'j']
+
+
+def _mask(test):
+    """Returns the mask of positions q, for each position p, where test(p, q)"""
+    return [
+        sum(1 << idx2 for idx2 in range(25) if test(idx1, idx2))
+        for idx1 in range(25)
+    ]
+
+
+# FOLLOW[p]: positions an enciphered letter can be at if its plain letter is
+#   at p (same row, or directly below)
+FOLLOW = _mask(solver._can_follow)
+# PRECEDE[p]: positions a plain letter can be at if its enciphered letter is
+#   at p
+PRECEDE = _mask(lambda idx1, idx2: solver._can_follow(idx2, idx1))
+# ROW_COL[p]: positions sharing a row or a column with p
+ROW_COL = _mask(lambda idx1, idx2: idx1 != idx2 and
+                solver._row_or_col(idx1, idx2))
+
+
+def _popcount(mask):
+    return bin(mask).count('1')
+
+
+class Completions:
+    """
+    The placements of constrained letters consistent with a partial key and a
+        set of digraph constraints
+
+    Attributes:
+        constraints: list of (a, b, c, d) letter number tuples
+        by_letter: list of 26 lists of the constraints each letter is part of
+        base: list of 26 key positions of the letters of the partial key,
+            UNUSED if not placed
+        placements: list of bytes of length 25, the letter number at every
+            position (255 for positions left to unconstrained letters)
+        rotated: True if the partial key was empty and there were
+            constraints, the first letter was then fixed to position 0 and
+            every placement stands for its 25 rotations
+        complete: False if the enumeration stopped at the limit
+        free: number of positions left to unconstrained letters
+    """
+
+    def __init__(self, partial_key, constraints, limit=LIMIT):
+        self.constraints = constraints
+        self.by_letter = [[] for _ in range(26)]
+        for cons in constraints:
+            for ltr in set(cons):
+                self.by_letter[ltr].append(cons)
+        self.placements = []
+        self.complete = True
+        self.limit = limit
+
+        pos = [UNUSED] * 26
+        doms = [ALL] * 26
+        occupied = 0
+        queue = []
+        for idx, char in enumerate(partial_key):
+            if char != ' ':
+                queue.append((ord(char) - cipher.ORD_A, idx))
+        constrained = set(ltr for cons in constraints for ltr in cons)
+        # with nothing constrained no letter is fixed to position 0, so the
+        #   placements do not stand for their rotations
+        self.rotated = not queue and bool(constrained)
+        self.base = pos
+        self.free = 25 - len(constrained.union(ltr for ltr, _ in queue))
+        occupied = self._place(pos, doms, occupied, queue)
+        if occupied is not None:
+            self._search(pos, doms, occupied, constrained)
+
+    def _place(self, pos, doms, occupied, queue):
+        """
+        Places the (letter, position) pairs of queue and propagates the
+            constraints, updating pos and doms in place
+
+        Returns:
+            The new occupied mask, or None on a contradiction
+        """
+        while queue:
+            ltr, idx = queue.pop()
+            if pos[ltr] != UNUSED:
+                if pos[ltr] != idx:
+                    return None
+                continue
+            bit = 1 << idx
+            if occupied & bit or not doms[ltr] & bit:
+                return None
+            pos[ltr] = idx
+            doms[ltr] = bit
+            occupied |= bit
+            for ltr_a, ltr_b, ltr_c, ltr_d in self.by_letter[ltr]:
+                pos_a, pos_b = pos[ltr_a], pos[ltr_b]
+                pos_c, pos_d = pos[ltr_c], pos[ltr_d]
+                if pos_a != UNUSED and pos_b != UNUSED:
+                    out = solver.ENC[pos_a][pos_b]
+                    queue.append((ltr_c, out[0]))
+                    queue.append((ltr_d, out[1]))
+                elif pos_c != UNUSED and pos_d != UNUSED:
+                    out = solver.DEC[pos_c][pos_d]
+                    queue.append((ltr_a, out[0]))
+                    queue.append((ltr_b, out[1]))
+                if pos_a != UNUSED:
+                    doms[ltr_c] &= FOLLOW[pos_a]
+                    doms[ltr_d] &= ROW_COL[pos_a] | (1 << pos_a)
+                if pos_b != UNUSED:
+                    doms[ltr_d] &= FOLLOW[pos_b]
+                    doms[ltr_c] &= ROW_COL[pos_b] | (1 << pos_b)
+                if pos_c != UNUSED:
+                    doms[ltr_a] &= PRECEDE[pos_c]
+                    doms[ltr_b] &= ROW_COL[pos_c] | (1 << pos_c)
+                if pos_d != UNUSED:
+                    doms[ltr_b] &= PRECEDE[pos_d]
+                    doms[ltr_a] &= ROW_COL[pos_d] | (1 << pos_d)
+                for other in (ltr_a, ltr_b, ltr_c, ltr_d):
+                    if pos[other] == UNUSED and not doms[other] & ~occupied:
+                        return None
+        return occupied
+
+    def _search(self, pos, doms, occupied, constrained):
+        """Enumerates the placements of the unplaced constrained letters"""
+        if len(self.placements) >= self.limit:
+            self.complete = False
+            return
+        best, best_mask = None, 0
+        for ltr in constrained:
+            if pos[ltr] == UNUSED:
+                mask = doms[ltr] & ~occupied & ALL
+                if best is None or _popcount(mask) < _popcount(best_mask):
+                    best, best_mask = ltr, mask
+        if best is None:
+            placement = bytearray([255] * 25)
+            for ltr, idx in enumerate(pos):
+                if idx != UNUSED:
+                    placement[idx] = ltr
+            self.placements.append(bytes(placement))
+            return
+        if self.rotated and not occupied:
+            # the count of every rotation is the same, so only the
+            #   placements with this letter at position 0 are enumerated
+            best_mask &= 1
+        while best_mask:
+            bit = best_mask & -best_mask
+            best_mask ^= bit
+            new_pos = pos[:]
+            new_doms = doms[:]
+            new_occupied = self._place(new_pos, new_doms, occupied,
+                                       [(best, bit.bit_length() - 1)])
+            if new_occupied is not None:
+                self._search(new_pos, new_doms, new_occupied, constrained)
+
+    def count(self):
+        """
+        Returns the number of full keys consistent with the partial key and
+            the constraints, a lower bound if the enumeration was not complete
+        """
+        total = len(self.placements) * factorial(self.free)
+        return total * 25 if self.rotated else total
+
+    def sample(self, rng=random):
+        """
+        Returns a consistent full key chosen uniformly at random (uniform
+            among the enumerated placements if the enumeration was not
+            complete), or None if there is none
+        """
+        if not self.placements:
+            return None
+        placement = rng.choice(self.placements)
+        used = set(placement)
+        rest = [ltr for ltr in KEY_LETTERS if ltr not in used]
+        rng.shuffle(rest)
+        key = [chr(ltr + cipher.ORD_A) if ltr != 255 else chr(
+            rest.pop() + cipher.ORD_A) for ltr in placement]
+        if self.rotated:
+            key = list(solver.rotations(key))[rng.randrange(25)]
+        return key
+
+
+def for_state(ken, limit=LIMIT):
+    """
+    Returns the Completions of a KeyState, using the digraphs it has already
+        placed
+    """
+    return Completions(
+        ken.get_key(),
+        solver.digraph_constraints(ken.decp_txt[:ken.txt_idx],
+                                   ken.encp_txt[:ken.txt_idx]),
+        limit
+    )
@@ -0,0 +1,251 @@
+"""Cipher text only attack on Playfair ciphers
+
+Searches for the key with simulated annealing, scoring candidate keys by the
+quadgram log probability of the text they decipher to. The score is computed
+over the distinct pairs and triples of consecutive cipher digraphs rather
+than over every quadgram of the text. Run with:
+    python3 src/cracker.py <cipher text file>
+"""
+import argparse
+import math
+import multiprocessing
+import random
+import time
+import numpy as np
+import cipher
+import ngrams
+import stream
+
+# ITERATIONS: default number of mutations tried per restart
+ITERATIONS = 20000
+
+# RESTARTS: default number of independent restarts
+RESTARTS = 8
+
+# START_TEMP: default starting temperature, cooled linearly to 0
+START_TEMP = 10.0
+
+# FULL_MUTATION_RATE: probability of a mutation moving whole rows or columns
+#   instead of swapping two letters
+FULL_MUTATION_RATE = 0.1
+
+
+class Annealer:
+    """
+    A candidate key and the score of the cipher text deciphered with it
+
+    Every occurrence of the same cipher digraph deciphers to the same plain
+    digraph, so the text is indexed by its distinct cipher digraphs (types).
+    The quadgram starting at the first letter of a digraph reads it and the
+    next digraph, the one starting at its second letter reads the next two,
+    so a key is scored once per distinct pair and triple of consecutive
+    types, weighted by how often it occurs, instead of once per quadgram of
+    the text.
+
+    Attributes:
+        table: flat quadgram log probability table, see ngrams.load
+        ch1, ch2: letter numbers of the first and second letter of each type
+        pairs, triples: 2 x pairs and 3 x triples arrays of the types of
+            each distinct pair and triple of consecutive digraphs
+        pair_count, triple_count: number of occurrences of each
+        key: list of the 25 characters of the key
+        score: quadgram score of the text deciphered with key
+    """
+
+    def __init__(self, table, cipher_text, key):
+        if len(cipher_text) % 2 or len(cipher_text) < 4:
+            raise ValueError("cipher text must have an even length of at "
+                             "least 4")
+        self.table = np.asarray(table).reshape(-1)
+        ltrs = np.frombuffer(
+            cipher_text.encode('ascii'), dtype=np.uint8
+        ).astype(np.intp) - cipher.ORD_A
+        ltrs[ltrs == cipher.LTR_J] = cipher.LTR_I
+        types, digraphs = np.unique(ltrs[0::2] * 26 + ltrs[1::2],
+                                    return_inverse=True)
+        self.ch1, self.ch2 = types // 26, types % 26
+
+        num = len(types)
+        pairs, self.pair_count = np.unique(
+            digraphs[:-1] * num + digraphs[1:], return_counts=True)
+        self.pairs = np.stack([pairs // num, pairs % num])
+        triples, self.triple_count = np.unique(
+            (digraphs[:-2] * num + digraphs[1:-1]) * num + digraphs[2:],
+            return_counts=True)
+        self.triples = np.stack([triples // (num * num), triples // num % num,
+                                 triples % num])
+        self.set_key(key)
+
+    def set_key(self, key, score=None):
+        """
+        Sets the key
+
+        Arguments:
+            key: list of the 25 characters of the key
+            score: score of key as returned by key_score, computed if not
+                given
+        """
+        self.key = list(key)
+        self.score = self.key_score(key) if score is None else score
+
+    def get_key(self):
+        """Returns the key as a list of characters"""
+        return list(self.key)
+
+    def key_score(self, key):
+        """
+        Returns the quadgram score of the text deciphered with key, without
+            changing the current key
+        """
+        key = np.array([ord(ch) - cipher.ORD_A for ch in key],
+                       dtype=np.intp)
+        pos = np.zeros(26, dtype=np.intp)
+        pos[key] = np.arange(25)
+        pos[cipher.LTR_J] = pos[cipher.LTR_I]
+        # plain digraph of each type, as first letter * 26 + second letter
+        out_pos = cipher.DEC_POS[pos[self.ch1], pos[self.ch2]]
+        type_plain = key[out_pos[:, 0]] * 26 + key[out_pos[:, 1]]
+
+        first, second = self.pairs
+        pair_score = self.table[(type_plain * 676)[first]
+                                + type_plain[second]]
+        first, second, third = self.triples
+        triple_score = self.table[(type_plain % 26 * 17576)[first]
+                                  + (type_plain * 26)[second]
+                                  + (type_plain // 26)[third]]
+        return (self.pair_count @ pair_score
+                + self.triple_count @ triple_score)
+
+
+def mutate_swap(key, rng):
+    """Returns a copy of key with two letters swapped"""
+    key = list(key)
+    idx1, idx2 = rng.sample(range(25), 2)
+    key[idx1], key[idx2] = key[idx2], key[idx1]
+    return key
+
+
+def mutate_full(key, rng):
+    """
+    Returns a copy of key with two rows swapped, two columns swapped, or
+        flipped around its rows, columns or both
+    """
+    grid = [key[idx:idx + 5] for idx in range(0, 25, 5)]
+    choice = rng.randrange(5)
+    if choice == 0:
+        row1, row2 = rng.sample(range(5), 2)
+        grid[row1], grid[row2] = grid[row2], grid[row1]
+    elif choice == 1:
+        col1, col2 = rng.sample(range(5), 2)
+        for row in grid:
+            row[col1], row[col2] = row[col2], row[col1]
+    elif choice == 2:
+        grid.reverse()
+    elif choice == 3:
+        grid = [row[::-1] for row in grid]
+    else:
+        grid = [row[::-1] for row in reversed(grid)]
+    return [char for row in grid for char in row]
+
+
+def anneal(ngram_dir, cipher_text, seed, iterations=ITERATIONS,
+           start_temp=START_TEMP):
+    """
+    Runs one simulated annealing restart from a random key, the quadgram
+        table is memory mapped from ngram_dir so restarts share its pages
+
+    Returns:
+        Tuple of the best score, the best key, and the number of iterations
+        per second
+    """
+    rng = random.Random(seed)
+    state = Annealer(ngrams.load(4, ngram_dir), cipher_text,
+                     cipher.generate_key(rng))
+    best_score, best_key = state.score, state.get_key()
+    start = time.perf_counter()
+    for step in range(iterations):
+        temp = start_temp * (1 - step / iterations)
+        if rng.random() < FULL_MUTATION_RATE:
+            key = mutate_full(state.key, rng)
+        else:
+            key = mutate_swap(state.key, rng)
+        score = state.key_score(key)
+        delta = score - state.score
+        if delta >= 0 or (temp > 0 and
+                          rng.random() < math.exp(delta / temp)):
+            state.set_key(key, score)
+        if state.score > best_score:
+            best_score, best_key = state.score, state.get_key()
+    elapsed = time.perf_counter() - start
+    return best_score, best_key, iterations / elapsed if elapsed else 0.0
+
+
+def _anneal_star(args):
+    return anneal(*args)
+
+
+def crack(cipher_text, ngram_dir=ngrams.NGRAM_DIR, restarts=RESTARTS,
+          iterations=ITERATIONS, seed=0, workers=None):
+    """
+    Runs independent annealing restarts in parallel and keeps the best key
+
+    Arguments:
+        cipher_text: enciphered text
+        ngram_dir: directory of the n-gram tables, see ngrams.build
+        restarts: number of independent restarts
+        iterations: mutations tried per restart
+        seed: master seed, restart i is seeded with seed + i
+        workers: number of processes, defaults to the number of cpus
+    Returns:
+        Dictionary with the best key, its score, the text it deciphers to and
+        the total number of iterations per second over all restarts
+    """
+    work = [(ngram_dir, cipher_text, seed + idx, iterations)
+            for idx in range(restarts)]
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        results = pool.map(_anneal_star, work)
+    elapsed = time.perf_counter() - start
+    score, key, _ = max(results, key=lambda result: result[0])
+    return {
+        'key': key,
+        'score': score,
+        'plain_text': cipher.decipher_text(key, cipher_text),
+        'iterations_per_sec': restarts * iterations / elapsed,
+    }
+
+
+def main(args):
+    """
+    Cracks a cipher text file and prints the key, its score, the iterations
+        per second and the plain text
+
+    Arguments:
+        args: parsed command line arguments, see the __main__ block (the crack
+            command of cli.py takes the same ones)
+    """
+    with open(args.cipher_file, 'rb') as inf:
+        cipher_text = ''.join(stream.digraph_blocks(
+            stream.normalize_blocks(stream.read_blocks(inf)), None))
+    ngrams.load_or_build(4, args.ngrams, args.corpus)
+    result = crack(cipher_text, args.ngrams, args.restarts, args.iterations,
+                   args.seed, args.workers)
+    print("Key:")
+    cipher.print_key(result['key'])
+    print("Score: {:.2f}".format(result['score']))
+    print("Iterations/sec: {:.0f}".format(result['iterations_per_sec']))
+    print(result['plain_text'])
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(description='Cipher text only attack')
+    PARSER.add_argument('cipher_file')
+    PARSER.add_argument('--corpus', default=ngrams.DATA_FILE,
+                        help='corpus the n-gram tables are built from')
+    PARSER.add_argument('--ngrams', default=ngrams.NGRAM_DIR,
+                        help='directory of the n-gram tables')
+    PARSER.add_argument('--restarts', type=int, default=RESTARTS)
+    PARSER.add_argument('--iterations', type=int, default=ITERATIONS)
+    PARSER.add_argument('--seed', type=int, default=0)
+    PARSER.add_argument('--workers', type=int, default=None)
+    main(PARSER.parse_args())
@@ -0,0 +1,144 @@
+"""Columnar on disk format of the training data
+
+A dataset is a directory holding three uint8 .npy arrays of ascii codes:
+    plain.npy: N x SUBSET_SZ deciphered texts
+    cipher.npy: N x SUBSET_SZ enciphered texts
+    key.npy: N x 25 keys
+and a small meta.json header, written last, so a directory without one is an
+incomplete dataset. The arrays are opened as read only memory maps, so
+opening a dataset takes the same time whatever its size, slices of episodes
+are views that copy nothing, and processes opening the same dataset share its
+pages.
+"""
+import json
+import os
+import numpy as np
+import cipher
+
+# FORMAT_VERSION: version of the on disk format, stored in meta.json
+FORMAT_VERSION = 1
+
+# META_NAME: name of the header file
+META_NAME = 'meta.json'
+
+# COLUMNS: name of each array file
+COLUMNS = ('plain', 'cipher', 'key')
+
+
+def _column_path(path, column):
+    return os.path.join(path, column + '.npy')
+
+
+def allocate(path, size, subset_sz):
+    """
+    Creates the arrays of a dataset of size episodes, to be filled in and
+        then completed with finish
+
+    Returns:
+        Tuple of the writable plain, cipher and key memory maps
+    """
+    os.makedirs(path, exist_ok=True)
+    meta = os.path.join(path, META_NAME)
+    if os.path.exists(meta):
+        os.remove(meta)
+    shapes = {'plain': (size, subset_sz), 'cipher': (size, subset_sz),
+              'key': (size, 25)}
+    return tuple(
+        np.lib.format.open_memmap(_column_path(path, column), mode='w+',
+                                  dtype=np.uint8, shape=shapes[column])
+        for column in COLUMNS
+    )
+
+
+def open_columns(path, mode='r'):
+    """
+    Opens the arrays of a dataset as memory maps, mode 'r+' allows
+        writing to a dataset made by allocate
+    """
+    return tuple(np.load(_column_path(path, column), mmap_mode=mode)
+                 for column in COLUMNS)
+
+
+def finish(path, size, subset_sz, **extra):
+    """
+    Writes the header of a dataset, marking it as complete
+
+    Arguments:
+        path: directory of the dataset
+        size: number of episodes
+        subset_sz: number of characters of each text
+        extra: additional entries stored in the header
+    """
+    meta = dict(extra, version=FORMAT_VERSION, size=size, subset_sz=subset_sz)
+    tmp_name = os.path.join(path, META_NAME + '.tmp')
+    with open(tmp_name, 'w') as outf:
+        json.dump(meta, outf)
+    os.replace(tmp_name, os.path.join(path, META_NAME))
+
+
+def write(path, records, subset_sz, **extra):
+    """
+    Saves a list of (deciphered text, enciphered text, key) tuples, as
+        returned by training_data.generate_data, extra entries are stored in
+        the header
+
+    Returns:
+        The saved Dataset
+    """
+    plain, ciph, key = allocate(path, len(records), subset_sz)
+    if records:
+        plain[:] = cipher.text_array([rec[0] for rec in records])
+        ciph[:] = cipher.text_array([rec[1] for rec in records])
+        key[:] = cipher.key_array([rec[2] for rec in records])
+    for arr in (plain, ciph, key):
+        arr.flush()
+    del plain, ciph, key
+    finish(path, len(records), subset_sz, **extra)
+    return Dataset(path)
+
+
+class Dataset:
+    """
+    A dataset opened from disk, indexing it gives the same (deciphered text,
+        enciphered text, key) tuples as the list returned by generate_data
+
+    Attributes:
+        path: directory of the dataset
+        meta: dictionary of the header
+        size: number of episodes
+        subset_sz: number of characters of each text
+        plain: N x subset_sz memory map of deciphered texts
+        cipher: N x subset_sz memory map of enciphered texts
+        key: N x 25 memory map of keys
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_NAME)) as inf:
+            self.meta = json.load(inf)
+        if self.meta.get('version') != FORMAT_VERSION:
+            raise IOError("{} has format version {}, expected {}".format(
+                path, self.meta.get('version'), FORMAT_VERSION))
+        self.size = self.meta['size']
+        self.subset_sz = self.meta['subset_sz']
+        self.plain, self.cipher, self.key = open_columns(path)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, idx):
+        if not -self.size <= idx < self.size:
+            raise IndexError("episode index out of range")
+        return (
+            self.plain[idx].tobytes().decode('ascii'),
+            self.cipher[idx].tobytes().decode('ascii'),
+            list(self.key[idx].tobytes().decode('ascii')),
+        )
+
+    def episodes(self, start, stop):
+        """
+        Returns views (no copy) of the plain, cipher and key arrays of
+            episodes start to stop
+        """
+        return (self.plain[start:stop], self.cipher[start:stop],
+                self.key[start:stop])
@@ -0,0 +1,94 @@
+"""Endless source of training episodes sampled from a corpus
+
+Instead of a fixed list of pre generated episodes, every episode is a random
+slice of the corpus enciphered with a fresh key when it is needed. The
+normalized corpus is saved once as a .npy file next to the dataset cache and
+memory mapped, so only the episodes being prepared are held in memory.
+"""
+import os
+import random
+import numpy as np
+import cache
+import loader
+import training_data as td
+from cipher import encipher_text, decipher_text, generate_key
+
+# PREFETCH: default number of episodes prepared ahead on a background thread
+PREFETCH = 4
+
+
+def corpus_array(filename, cache_dir=cache.CACHE_DIR):
+    """
+    Returns the letters of a corpus (normalized like generate_data) as a read
+        only uint8 memory map of ascii codes, saving them in the cache the
+        first time the corpus is seen
+    """
+    name = 'corpus-{}.npy'.format(cache.corpus_hash(filename, cache_dir))
+    path = os.path.join(cache_dir, name)
+    if not os.path.exists(path):
+        tmp_path = path + '.{}.tmp'.format(os.getpid())
+        letters = np.lib.format.open_memmap(
+            tmp_path, mode='w+', dtype=np.uint8,
+            shape=(td.count_letters(filename),)
+        )
+        start = 0
+        # keep_tail with a large subset_sz yields the corpus in large pieces
+        for text in td.iter_chunks(filename, 1 << 20, keep_tail=True):
+            letters[start:start + len(text)] = np.frombuffer(
+                text.encode('ascii'), dtype=np.uint8)
+            start += len(text)
+        letters.flush()
+        del letters
+        os.replace(tmp_path, path)
+    return np.load(path, mmap_mode='r')
+
+
+class EpisodeSampler:
+    """
+    Iterator over endless (deciphered text, enciphered text, key) episodes,
+        in the same form as the items of the training data
+
+    Attributes:
+        letters: uint8 array of the ascii codes of the corpus letters
+        subset_sz: number of characters of each episode, must be even
+        rng: random number generator choosing offsets and keys
+        prefetch: number of episodes prepared ahead on a background thread,
+            0 prepares each episode when it is asked for
+    """
+
+    def __init__(self, letters, subset_sz, seed=None, prefetch=PREFETCH):
+        if subset_sz % 2:
+            raise ValueError("subset_sz must be even")
+        if len(letters) < subset_sz:
+            raise ValueError("corpus is shorter than an episode")
+        self.letters = letters
+        self.subset_sz = subset_sz
+        self.rng = random.Random(seed)
+        self.prefetch = prefetch
+        self._loader = None
+        if prefetch:
+            self._loader = loader.Prefetcher(iter(self.sample, None), prefetch)
+
+    def sample(self):
+        """Enciphers a random slice of the corpus with a fresh key"""
+        start = self.rng.randrange(len(self.letters) - self.subset_sz + 1)
+        text = self.letters[start:start + self.subset_sz].tobytes()
+        key = generate_key(self.rng)
+        cipher_text = encipher_text(key, text.decode('ascii'))
+        return decipher_text(key, cipher_text), cipher_text, key
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._loader is None:
+            return self.sample()
+        return next(self._loader)
+
+    def close(self):
+        """
+        Stops the background thread, with prefetch next raises StopIteration
+            from then on
+        """
+        if self._loader is not None:
+            self._loader.close()
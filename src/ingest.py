@@ -0,0 +1,190 @@
+"""Ingests a directory tree of (possibly compressed) text files into dataset
+shards
+
+Every .txt, .gz and .bz2 file under the input directory is read in blocks,
+compressed files are decompressed as they are read, and the letters of all
+files are chunked as one corpus. The chunks are written as datasets (see
+dataset.py) of bounded size, listed in a manifest.json, so corpora larger
+than memory can be used and shards can be copied to different machines. Run
+with:
+    python3 src/ingest.py <input directory> <output directory>
+"""
+import argparse
+import bisect
+import bz2
+import gzip
+import itertools
+import json
+import multiprocessing
+import os
+import dataset
+import stream
+import training_data as td
+
+# SUFFIXES: file endings that are ingested
+SUFFIXES = ('.txt', '.gz', '.bz2')
+
+# SHARD_BYTES: default size limit of each shard
+SHARD_BYTES = 64 << 20
+
+# MANIFEST_NAME: name of the file listing the shards
+MANIFEST_NAME = 'manifest.json'
+
+
+def iter_files(root):
+    """Returns the ingested files under root, in a fixed (sorted) order"""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.endswith(SUFFIXES):
+                found.append(os.path.join(dirpath, name))
+    return found
+
+
+def open_binary(filename):
+    """Opens a text file for reading bytes, decompressing .gz and .bz2"""
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'rb')
+    if filename.endswith('.bz2'):
+        return bz2.open(filename, 'rb')
+    return open(filename, 'rb')
+
+
+def read_files(filenames, block_sz=stream.BLOCK_SZ):
+    """Yields the (decompressed) contents of the files one block at a time"""
+    for filename in filenames:
+        with open_binary(filename) as inf:
+            yield from stream.read_blocks(inf, block_sz)
+
+
+def _shard_work(chunks, shard_len, seed):
+    """Groups the chunks into (seed, start index, chunks) work items"""
+    chunks = iter(chunks)
+    start = 0
+    while True:
+        shard = list(itertools.islice(chunks, shard_len))
+        if not shard:
+            return
+        yield seed, start, shard
+        start += len(shard)
+
+
+def _encipher_shard(work):
+    seed, start, chunks = work
+    return start, td.encipher_chunks(seed, start, chunks)
+
+
+def ingest(root, out_dir, subset_sz, seed, shard_bytes=SHARD_BYTES,
+           workers=None):
+    """
+    Turns every text file under root into dataset shards
+
+    Arguments:
+        root: directory searched for .txt, .gz and .bz2 files
+        out_dir: directory the shards and the manifest are written to
+        subset_sz: size of each chunk of text, must be even
+        seed: master seed of the keys (see training_data.chunk_key), chunk
+            numbers count across all shards
+        shard_bytes: size limit of each shard
+        workers: number of processes enciphering shards, defaults to the
+            number of cpus
+    Returns:
+        The manifest as a dictionary
+    """
+    if subset_sz % 2:
+        raise ValueError("subset_sz must be even")
+    # each episode stores two texts and a key
+    shard_len = max(1, shard_bytes // (2 * subset_sz + 25))
+    filenames = iter_files(root)
+    chunks = td.chunk_blocks(read_files(filenames), subset_sz)
+    shards = []
+    os.makedirs(out_dir, exist_ok=True)
+    with multiprocessing.Pool(workers) as pool:
+        work = _shard_work(chunks, shard_len, seed)
+        results = td.imap_bounded(pool, _encipher_shard, work)
+        for start, (plain, ciph, key) in results:
+            name = 'shard-{:05d}'.format(len(shards))
+            path = os.path.join(out_dir, name)
+            columns = dataset.allocate(path, len(key), subset_sz)
+            for column, arr in zip(columns, (plain, ciph, key)):
+                column[:] = arr
+                column.flush()
+            del columns
+            dataset.finish(path, len(key), subset_sz, seed=seed, start=start,
+                           root=os.path.abspath(root))
+            shards.append({'path': name, 'start': start, 'size': len(key)})
+    manifest = {
+        'version': dataset.FORMAT_VERSION,
+        'subset_sz': subset_sz,
+        'seed': seed,
+        'size': sum(shard['size'] for shard in shards),
+        'shards': shards,
+        'sources': [
+            {'path': os.path.relpath(name, root),
+             'bytes': os.path.getsize(name)}
+            for name in filenames
+        ],
+    }
+    tmp_name = os.path.join(out_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp_name, 'w') as outf:
+        json.dump(manifest, outf, indent=2)
+    os.replace(tmp_name, os.path.join(out_dir, MANIFEST_NAME))
+    return manifest
+
+
+class ShardedDataset:
+    """
+    The shards listed in a manifest, indexed as one dataset
+
+    Attributes:
+        manifest: dictionary of the manifest
+        shards: list of the dataset.Dataset of each shard, opened when first
+            used
+        starts: index of the first episode of each shard
+        size: total number of episodes
+        subset_sz: number of characters of each text
+    """
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        with open(os.path.join(out_dir, MANIFEST_NAME)) as inf:
+            self.manifest = json.load(inf)
+        self.shards = [None] * len(self.manifest['shards'])
+        self.starts = [shard['start'] for shard in self.manifest['shards']]
+        self.size = self.manifest['size']
+        self.subset_sz = self.manifest['subset_sz']
+
+    def shard(self, num):
+        """Returns shard number num, opening it if needed"""
+        if self.shards[num] is None:
+            self.shards[num] = dataset.Dataset(os.path.join(
+                self.out_dir, self.manifest['shards'][num]['path']))
+        return self.shards[num]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self.size
+        if not 0 <= idx < self.size:
+            raise IndexError("episode index out of range")
+        num = bisect.bisect_right(self.starts, idx) - 1
+        return self.shard(num)[idx - self.starts[num]]
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(
+        description='Ingest a directory of text files into dataset shards')
+    PARSER.add_argument('root')
+    PARSER.add_argument('out_dir')
+    PARSER.add_argument('--subset-sz', type=int, default=100)
+    PARSER.add_argument('--seed', type=int, default=0)
+    PARSER.add_argument('--shard-mb', type=int, default=SHARD_BYTES >> 20)
+    PARSER.add_argument('--workers', type=int, default=None)
+    ARGS = PARSER.parse_args()
+    MANIFEST = ingest(ARGS.root, ARGS.out_dir, ARGS.subset_sz, ARGS.seed,
+                      ARGS.shard_mb << 20, ARGS.workers)
+    print("Wrote {} episodes in {} shards".format(
+        MANIFEST['size'], len(MANIFEST['shards'])))
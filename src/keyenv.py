@@ -1,6 +1,9 @@
 """Contain KeyState Class"""
-import cipher
+import copy
+import functools
 import random
+import numpy as np
+import cipher
 SUCCESS = True
 FAILURE = False
 SUBSET_SZ = 100
@@ -8,56 +11,494 @@ GOOD_REWARD = 1000
 BAD_REWARD = -20
 LIVING_REWARD = 10
 
+# ORD_A: ascii code of 'a', letters are numbered from it
+ORD_A = cipher.ORD_A
+
+# SPACE: ascii code of ' ', marking an empty spot of the key
+SPACE = ord(' ')
+
+# UNUSED: key position of a letter that is not in the key yet
+UNUSED = 25
+
+# STATE_DIM: length of a state, 2 deciphered and 2 enciphered letters followed
+#   by the 25 spots of the key
+STATE_DIM = 29
+
+# KEY_START: index of the first spot of the key in a state
+KEY_START = 4
+
+# MEM_*: part of the bytes of a KeyState (see KeyState.mem) holding each of
+#   its byte arrays
+MEM_BUF = slice(0, STATE_DIM)
+MEM_POS = slice(MEM_BUF.stop, MEM_BUF.stop + 26)
+MEM_AVBL_ROW = slice(MEM_POS.stop, MEM_POS.stop + 5)
+MEM_AVBL_COL = slice(MEM_AVBL_ROW.stop, MEM_AVBL_ROW.stop + 5)
+MEM_ROW_TAKEN = slice(MEM_AVBL_COL.stop, MEM_AVBL_COL.stop + 5)
+MEM_COL_TAKEN = slice(MEM_ROW_TAKEN.stop, MEM_ROW_TAKEN.stop + 5)
+
+# EMPTY_MEM: bytes of a KeyState with an empty key
+EMPTY_MEM = bytes([SPACE] * STATE_DIM + [UNUSED] * 26 + [5] * 10 + [0] * 10)
+
+# ============================= PLACEMENT TABLES ==============================
+# Every valid placement of the current pairs is worked out once here, for
+#   every pattern of taken spots, so the actions only look them up. A line is
+#   a row (spots numbered by column) or a column (spots numbered by row), and
+#   its taken spots are a 5 bit pattern, bit i set if spot i is taken. The row
+#   and column actions put the deciphered letters of a pair in a line with
+#   each enciphered letter on the spot after its deciphered letter, so their
+#   placements are stored as the (d1, d2) spots of the deciphered letters.
+
+# Slots of the current deciphered and enciphered pairs, in the order the
+#   actions look at them
+D1, D2, E1, E2 = range(4)
+
+# Letters shared by the slots of the current pairs:
+#   DISTINCT: four different letters
+#   D1_E2: d1 is also e2
+#   D2_E1: d2 is also e1
+#   OTHER: any other repeat, e.g. both letters of a doubled pair
+DISTINCT, D1_E2, D2_E1, OTHER = range(4)
+
+# SLOT_LETTERS: for DISTINCT, D1_E2 and D2_E1, which of the (at most 4)
+#   letters each slot holds
+SLOT_LETTERS = ((0, 1, 2, 3), (0, 1, 2, 0), (0, 1, 1, 3))
+
+# POW6: place value of each line in a count code, the number whose base 6
+#   digits are the number of free spots in each line
+POW6 = (1, 6, 36, 216, 1296)
+
+# EMPTY_CODE: count code of an empty key
+EMPTY_CODE = 5 * sum(POW6)
+
+
+def _free_counts(code):
+    """Number of free spots of each line of a count code"""
+    return [code // POW6[line] % 6 for line in range(5)]
+
+
+def _line_order(code):
+    """Lines from most to fewest free spots, ties by higher line number"""
+    counts = _free_counts(code)
+    return tuple(sorted(range(5), key=lambda line: (counts[line], line),
+                        reverse=True))
+
+
+def _taken(bits, spot):
+    return bits >> spot % 5 & 1
+
+
+def _new_pairs(bits):
+    """Spots of two pairs of unplaced letters in a line"""
+    if bits == 0:
+        return tuple((i, (i + gap) % 5) for i in range(5) for gap in (2, 3))
+    if bin(bits).count('1') == 1:
+        j = bits.bit_length() - 1
+        return (((j + 1) % 5, (j + 3) % 5), ((j + 3) % 5, (j + 1) % 5))
+    return ()
+
+
+def _shared_pairs(repeat, bits):
+    """
+    Spots of the pairs of three unplaced letters in a line, when d1 is e2
+        (d2 on the spot before d1) or d2 is e1 (d2 on the spot after d1)
+    """
+    gap = 4 if repeat == D1_E2 else 1
+    free = 5 - bin(bits).count('1')
+    if free == 5:
+        return tuple((i, (i + gap) % 5) for i in range(5))
+    taken = [j for j in range(5) if _taken(bits, j)]
+    if free == 4:
+        j = taken[0]
+        return tuple(((j + i) % 5, (j + i + gap) % 5) for i in (
+            (2, 3) if repeat == D1_E2 else (1, 2)))
+    pairs = []
+    if free == 3:
+        # when the two taken spots are next to each other, each of them
+        #   gives the (same) pair
+        for j in taken:
+            if repeat == D1_E2:
+                if _taken(bits, j + 1):
+                    pairs.append(((j + 3) % 5, (j + 2) % 5))
+                if _taken(bits, j + 4):
+                    pairs.append(((j + 2) % 5, (j + 1) % 5))
+            else:
+                if _taken(bits, j + 4):
+                    pairs.append(((j + 1) % 5, (j + 2) % 5))
+                if _taken(bits, j + 1):
+                    pairs.append(((j + 2) % 5, (j + 3) % 5))
+    return tuple(pairs)
+
+
+def _one_placed_pairs(slot, i, bits):
+    """
+    Spots of the pairs in a line when only the letter of slot is placed, on
+        spot i of the line
+    """
+    # others: spots of the other deciphered letter with 4 free spots, then
+    #   with 3 free spots each with the taken spot that allows it
+    if slot == D1:
+        pairs, others = (lambda j: (i, j)), ((2, 3), ((2, 3), (4, 2)))
+    elif slot == D2:
+        pairs, others = (lambda j: (j, i)), ((2, 3), ((2, 3), (4, 2)))
+    elif slot == E1:
+        pairs, others = (lambda j: (i + 4, j)), ((1, 2), ((1, 2), (3, 1)))
+    else:
+        pairs, others = (lambda j: (j, i + 4)), ((1, 2), ((1, 2), (3, 1)))
+    free = 5 - bin(bits).count('1')
+    if free == 4:
+        spots = [i + j for j in others[0]]
+    elif free == 3:
+        spots = [i + j for taken, j in others[1] if _taken(bits, i + taken)]
+    else:
+        spots = []
+    return tuple(tuple(spot % 5 for spot in pairs(j)) for j in spots)
+
+
+def _layout_code(repeat, offsets, placed):
+    """
+    Number identifying which slots are placed and at which spots (relative
+        to the first placed slot)
+    """
+    code = repeat
+    for slot in range(4):
+        code = code * 6 + (offsets[slot] + 1 if placed[slot] else 0)
+    return code
+
+
+def _completions():
+    """
+    Maps the layout code of one or two unplaced letters to the spots of
+        their pairs, indexed by the taken spots of the line rotated so the
+        first placed slot is on spot 0, None if they do not fit
+    """
+    table = {}
+    for repeat in (DISTINCT, D1_E2, D2_E1):
+        letters = SLOT_LETTERS[repeat]
+        # layouts: every (d1, d2) where slots share a spot exactly when they
+        #   share a letter
+        layouts = []
+        for d1 in range(5):
+            for d2 in range(5):
+                offsets = (d1, d2, (d1 + 1) % 5, (d2 + 1) % 5)
+                if all((offsets[a] == offsets[b]) == (letters[a] == letters[b])
+                       for a in range(4) for b in range(a)):
+                    layouts.append(offsets)
+        for placed_ltrs in range(1, 16):
+            placed = [placed_ltrs >> ltr & 1 for ltr in letters]
+            if not 1 <= len(set(letters)) - sum(
+                    placed_ltrs >> ltr & 1 for ltr in set(letters)) <= 2:
+                continue
+            anchor = placed.index(1)
+            for offsets in layouts:
+                if offsets[anchor]:
+                    continue
+                code = _layout_code(repeat, offsets, placed)
+                fits = table.setdefault(code, [None] * 32)
+                for bits in range(32):
+                    if fits[bits] is None and not any(
+                            _taken(bits, offsets[slot])
+                            for slot in range(4) if not placed[slot]):
+                        fits[bits] = offsets[:2]
+    return {code: tuple(fits) for code, fits in table.items()}
+
+
+# LINE_ORDER: lines of each count code from most to fewest free spots
+LINE_ORDER = tuple(_line_order(code) for code in range(6 ** 5))
+
+# NEW_PAIRS: spots of two pairs of 4 unplaced letters, by taken spots
+NEW_PAIRS = tuple(_new_pairs(bits) for bits in range(32))
+
+# SHARED_PAIRS: spots of two pairs of 3 unplaced letters, by repeat (D1_E2 or
+#   D2_E1) and taken spots
+SHARED_PAIRS = {repeat: tuple(_shared_pairs(repeat, bits)
+                              for bits in range(32))
+                for repeat in (D1_E2, D2_E1)}
+
+# ONE_PLACED: spots of two pairs of 4 letters where only one is placed, by
+#   its slot, its spot and the taken spots
+ONE_PLACED = tuple(tuple(tuple(_one_placed_pairs(slot, i, bits)
+                               for bits in range(32))
+                         for i in range(5))
+                   for slot in range(4))
+
+# COMPLETIONS: see _completions
+COMPLETIONS = _completions()
+
+# The square action puts the pairs on the corners of a rectangle, d1 and e1
+#   on one row, d2 and e2 on the other, d1 and e2 on one column and d2 and e1
+#   on the other
+# SLOT_ROW, SLOT_COL: which of the two rows and columns each slot is on
+SLOT_ROW = (0, 1, 0, 1)
+SLOT_COL = (0, 1, 1, 0)
+
+# ROW_MATE, COL_MATE: the slot sharing its row and its column with each slot
+ROW_MATE = (E1, E2, D1, D2)
+COL_MATE = (E2, E1, D2, D1)
+
+def _square_lines(code):
+    """Lines of a count code with more than one free spot, most free first"""
+    counts = _free_counts(code)
+    return tuple(line for line in LINE_ORDER[code] if counts[line] > 1)
+
+
+@functools.lru_cache(maxsize=None)
+def _pairs(lines):
+    """Every pair of lines, in order of the first line then the second one"""
+    return tuple((first, second) for idx, first in enumerate(lines)
+                 for second in lines[idx + 1:])
+
+
+# SQUARE_PAIRS: pairs of the lines of each count code with more than one free
+#   spot, from most to fewest free spots
+# SQUARE_LINES: the lines of each count code with more than one free spot,
+#   from most to fewest free spots, but the last one
+SQUARE_PAIRS, SQUARE_LINES = zip(*(
+    (_pairs(lines), lines[:-1])
+    for lines in map(_square_lines, range(6 ** 5))))
+
+# MASK64: keeps numbers to 64 bits
+MASK64 = (1 << 64) - 1
+
+
+class SplitMix64:
+    """
+    Small random number generator (SplitMix64) choosing between the
+        placements of the actions. Its whole state is one 64 bit number, so
+        it is copied, saved and restored almost for free, unlike
+        random.Random whose state is 625 numbers. Has the methods of
+        random.Random the actions and KeyState use, so either can be used.
+
+    Attributes:
+        state: the 64 bit state
+    """
+
+    __slots__ = ('state',)
+
+    def __init__(self, seed=None):
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        """Seeds with an int, by default with bits of the random module"""
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.state = seed & MASK64
+
+    def getstate(self):
+        return self.state
+
+    def setstate(self, state):
+        self.state = state
+
+    def __copy__(self):
+        rng = SplitMix64.__new__(SplitMix64)
+        rng.state = self.state
+        return rng
+
+    def randbelow(self, num):
+        """Returns a random int in range(num)"""
+        self.state = state = (self.state + 0x9E3779B97F4A7C15) & MASK64
+        state = (state ^ state >> 30) * 0xBF58476D1CE4E5B9 & MASK64
+        state = (state ^ state >> 27) * 0x94D049BB133111EB & MASK64
+        return (state ^ state >> 31) % num
+
+    def choice(self, seq):
+        """Returns a random item of a non empty sequence"""
+        return seq[self.randbelow(len(seq))]
+
+
+def episode_rng(seed, idx):
+    """
+    Returns the SplitMix64 of episode number idx, derived from the master seed
+        alone, so it does not depend on the thread the KeyState is built on
+        or on other uses of the random module
+    """
+    return SplitMix64(random.Random('{}:{}'.format(seed, idx)).getrandbits(64))
+
 
 class KeyState:
     """The current state of the key being built
 
     Attributes:
-        avbl: list of available key indexes
-        avbl_row: list of 5 numbers representing the number of available
+        mem: bytearray of every byte array below, which are memoryviews of
+            its parts (see MEM_*), so the KeyState is copied by copying mem
+            and the numbers
+        mask: 25 bit number, bit idx is set if key index idx is taken
+        pos: bytes of the key index of each of the 26 letters (numbered
+            from 'a'), UNUSED if the letter is not in the key
+        buf: bytes of the current state (see get_state), updated in
+            place as letters are placed and the texts advance
+        at: the part of buf holding the ascii code of the
+            letter at each of the 25 key indexes, ' ' for an unused spot
+        avbl_row: bytes of 5 numbers representing the number of available
             indexes in the row corresponding to the index in the list
-        avbl_col: list of 5 numbers representing the number of available
+        avbl_col: bytes of 5 numbers representing the number of available
             indexes in the column corresponding to the index in the list
-        used: dictionary of used characters and the key indexes they occupy
+        row_taken: bytes of the taken spots of each row, bit col set if
+            column col is taken
+        col_taken: bytes of the taken spots of each column, bit row set
+            if row row is taken
+        row_code: count code (see POW6) of avbl_row
+        col_code: count code of avbl_col
+        num_used: number of characters in the key
         decp_txt: deciphered text
         encp_txt: enciphered text
         txt_idx: location in the enciphered and deciphered strings we are
             currently
+        rng: random number generator choosing between the placements of the
+            actions, a SplitMix64 (or random.Random)
     """
 
+    __slots__ = ('mem', 'mask', 'pos', 'buf', 'at', 'avbl_row', 'avbl_col',
+                 'row_taken', 'col_taken', 'row_code', 'col_code', 'num_used',
+                 'decp_txt', 'encp_txt', 'txt_idx', 'rng', '_state', '_decp',
+                 '_encp')
+
     # Vector representation of actions:
     ACT_ROW = 0
     ACT_COL = 1
     ACT_SQR = 2
 
-    def __init__(self, decp_txt, encp_txt):
-        self.avbl = list(range(0, 25))
-        self.avbl_row = [5]*5
-        self.avbl_col = [5]*5
-        self.used = {}
+    def __init__(self, decp_txt, encp_txt, rng=None):
+        """
+        Arguments:
+            decp_txt: deciphered text
+            encp_txt: enciphered text
+            rng: random number generator used by the actions, a new
+                SplitMix64 by default
+        """
+        self.mem = bytearray(EMPTY_MEM)
+        self._bind()
+        self.mask = 0
+        self.row_code = EMPTY_CODE
+        self.col_code = EMPTY_CODE
+        self.num_used = 0
         self.decp_txt = decp_txt
         self.encp_txt = encp_txt
+        self._decp = decp_txt.encode('ascii')
+        self._encp = encp_txt.encode('ascii')
         self.txt_idx = 0
+        self.rng = SplitMix64() if rng is None else rng
+        self._load_text()
+
+    def _bind(self):
+        """Makes the byte arrays views of the parts of mem"""
+        mem = memoryview(self.mem)
+        self.buf = mem[MEM_BUF]
+        self.at = mem[KEY_START:STATE_DIM]
+        self.pos = mem[MEM_POS]
+        self.avbl_row = mem[MEM_AVBL_ROW]
+        self.avbl_col = mem[MEM_AVBL_COL]
+        self.row_taken = mem[MEM_ROW_TAKEN]
+        self.col_taken = mem[MEM_COL_TAKEN]
+        # _state: read only array sharing the memory of buf
+        self._state = np.frombuffer(self.mem, dtype=np.uint8,
+                                    count=STATE_DIM)
+        self._state.flags.writeable = False
+
+    def clone(self):
+        """
+        Returns an independent copy of the KeyState, with a copy of its rng
+            in the same state, so both make the same choices from here on
+        """
+        ken = KeyState.__new__(KeyState)
+        ken.mem = bytearray(self.mem)
+        ken._bind()
+        ken.mask = self.mask
+        ken.row_code = self.row_code
+        ken.col_code = self.col_code
+        ken.num_used = self.num_used
+        ken.decp_txt = self.decp_txt
+        ken.encp_txt = self.encp_txt
+        ken._decp = self._decp
+        ken._encp = self._encp
+        ken.txt_idx = self.txt_idx
+        ken.rng = copy.copy(self.rng)
+        return ken
+
+    def __deepcopy__(self, memo):
+        return self.clone()
+
+    def snapshot(self):
+        """
+        Returns a snapshot of the KeyState that restore returns it to: a copy
+            of mem, its numbers and the state of its rng
+        """
+        return (bytes(self.mem), self.mask, self.row_code, self.col_code,
+                self.num_used, self.txt_idx, self.rng.getstate())
+
+    def restore(self, snapshot):
+        """
+        Returns the KeyState to a snapshot taken of it (or of a KeyState of
+            the same texts), undoing the actions made since
+        """
+        (self.mem[:], self.mask, self.row_code, self.col_code, self.num_used,
+         self.txt_idx, rng_state) = snapshot
+        self.rng.setstate(rng_state)
+
+    @property
+    def avbl(self):
+        """List of available key indexes"""
+        return [idx for idx in range(25) if not self.mask >> idx & 1]
+
+    @property
+    def used(self):
+        """Dictionary of used characters and the key indexes they occupy"""
+        return {chr(ltr + ORD_A): idx for ltr, idx in enumerate(self.pos)
+                if idx != UNUSED}
 
     def get_state(self):
         """
-        Returns a list representation of the current KeyState,
-            2 deciphered text, followed by 2 enciphered text, followed
-            by a 25 character representation of the current key, where unused
-            spots are represented by spaces
+        Returns the current KeyState as a read only uint8 array of ascii
+            codes: 2 deciphered text, followed by 2 enciphered text (spaces
+            once the texts are used up), followed by the 25 spots of the
+            current key, where unused spots are represented by spaces.
+            The array is a view of the state kept up to date by the
+            KeyState, copy it to keep a state after the next action.
         """
-        result = list(self.decp_txt[self.txt_idx:self.txt_idx+2])
-        result += list(self.encp_txt[self.txt_idx:self.txt_idx+2])
-        key = [' '] * 25
-        for char in self.used:
-            key[self.used[char]] = char
-        result = result + key
-        for i, char in enumerate(result):
-            result[i] = ord(char)
-        return result
+        return self._state
 
+    def _load_text(self):
+        """Puts the current pairs of the texts in the state"""
+        idx = self.txt_idx
+        buf = self.buf
+        if idx + 2 <= min(len(self._decp), len(self._encp)):
+            buf[0] = self._decp[idx]
+            buf[1] = self._decp[idx + 1]
+            buf[2] = self._encp[idx]
+            buf[3] = self._encp[idx + 1]
+        else:
+            buf[0] = buf[1] = buf[2] = buf[3] = SPACE
 
+    def _advance(self):
+        """Moves on to the next pairs of the texts"""
+        self.txt_idx += 2
+        self._load_text()
 
+    def place(self, ltr, idx):
+        """
+        Adds a letter to given index, marking the index as taken
+        Arguments:
+            ltr: letter number (0 for 'a')
+            idx: index in the key
+        """
+        if self.mask >> idx & 1:
+            raise ValueError("key index {} is already used".format(idx))
+        old = self.pos[ltr]
+        if old == UNUSED:
+            self.num_used += 1
+        else:
+            # the letter moves, its old index stays taken
+            self.at[old] = SPACE
+        self.mask |= 1 << idx
+        self.pos[ltr] = idx
+        self.at[idx] = ltr + ORD_A
+        row, col = divmod(idx, 5)
+        self.avbl_row[row] -= 1
+        self.avbl_col[col] -= 1
+        self.row_taken[row] |= 1 << col
+        self.col_taken[col] |= 1 << row
+        self.row_code -= POW6[row]
+        self.col_code -= POW6[col]
 
     def add_char(self, char, idx):
         """
@@ -66,29 +507,28 @@ class KeyState:
             char: inputed character
             idx: index in the key
         """
-        self.avbl.remove(idx)
-        self.avbl_row[idx // 5] -= 1
-        self.avbl_col[idx % 5] -= 1
-        self.used[char] = idx
+        self.place(ord(char) - ORD_A, idx)
 
     def print_key(self):
         """
         Prints the current key being built
         """
-        key_arr = [' ']*25
-        for char in self.used.keys():
-            key_arr[self.used[char]] = char
-        cipher.print_key(key_arr)
+        cipher.print_key(self.get_key())
 
     def get_key(self):
         """
         Returns used dictionary as a list representation of a key, with the
             character ' ' denoting an unused spot in the key
         """
-        key_arr = [' ']*25
-        for char in self.used.keys():
-            key_arr[self.used[char]] = char
-        return key_arr
+        return list(self.at.tobytes().decode('ascii'))
+
+    def unplaced(self, d1, d2, e1, e2):
+        """
+        Returns the set of the given letter numbers that are not already in
+            the key being built
+        """
+        pos = self.pos
+        return {ltr for ltr in (d1, d2, e1, e2) if pos[ltr] == UNUSED}
 
     def check_avbl(self):
         """
@@ -97,7 +537,129 @@ class KeyState:
         """
         cur_text = self.decp_txt[self.txt_idx: self.txt_idx + 2]
         cur_text += self.encp_txt[self.txt_idx: self.txt_idx + 2]
-        return set(cur_text).difference(self.used.keys())
+        return {char for char in cur_text
+                if self.pos[ord(char) - ORD_A] == UNUSED}
+
+    def _letters(self):
+        """Letter numbers of the current d1, d2, e1 and e2"""
+        decp = self._decp
+        encp = self._encp
+        idx = self.txt_idx
+        return (decp[idx] - ORD_A, decp[idx + 1] - ORD_A,
+                encp[idx] - ORD_A, encp[idx + 1] - ORD_A)
+
+    @staticmethod
+    def _repeat(ltrs):
+        """Returns the letters shared by the slots of the current pairs"""
+        d1, d2, e1, e2 = ltrs
+        if d1 == d2 or e1 == e2 or d1 == e1 or d2 == e2:
+            return OTHER
+        if d1 == e2:
+            return OTHER if d2 == e1 else D1_E2
+        return D2_E1 if d2 == e1 else DISTINCT
+
+    def _fill_line(self, ltrs, line, by_col, spots):
+        """
+        Places the unplaced letters of the current pairs in a line, the
+            deciphered letters on spots and each enciphered letter on the
+            spot after its deciphered letter
+        """
+        d1, d2 = spots
+        pos = self.pos
+        for ltr, spot in zip(ltrs, (d1, d2, (d1 + 1) % 5, (d2 + 1) % 5)):
+            if pos[ltr] == UNUSED:
+                self.place(ltr, spot * 5 + line if by_col else line * 5 + spot)
+        self._advance()
+        return SUCCESS
+
+    def _line_action(self, by_col):
+        """
+        Makes a row action, or a column action if by_col: adds the cipher
+            text plain text pair to a single row (column)
+
+        Returns:
+            Boolean stating if the function could succesfully place a new item in the key or not.
+        """
+        ltrs = self._letters()
+        repeat = self._repeat(ltrs)
+        num_avbl = len(self.unplaced(*ltrs))
+        pos = self.pos
+        if by_col:
+            counts, taken = self.avbl_col, self.col_taken
+            order = LINE_ORDER[self.col_code]
+        else:
+            counts, taken = self.avbl_row, self.row_taken
+            order = LINE_ORDER[self.row_code]
+
+        if num_avbl == 4:
+            # in the line with the most free spots
+            line = order[0]
+            if counts[line] < 4:
+                return FAILURE
+            return self._fill_line(ltrs, line, by_col,
+                                   self.rng.choice(NEW_PAIRS[taken[line]]))
+
+        if num_avbl == 3:
+            if repeat == DISTINCT:
+                slot = next(slot for slot in range(4)
+                            if pos[ltrs[slot]] != UNUSED)
+                line, spot = divmod(pos[ltrs[slot]], 5)
+                if by_col:
+                    line, spot = spot, line
+                pairs = ONE_PLACED[slot][spot][taken[line]]
+                if pairs:
+                    return self._fill_line(ltrs, line, by_col,
+                                           self.rng.choice(pairs))
+            elif repeat != OTHER:
+                # in the first line, from most free spots, they fit in
+                for line in order:
+                    if counts[line] < 3:
+                        break
+                    pairs = SHARED_PAIRS[repeat][taken[line]]
+                    if pairs:
+                        return self._fill_line(ltrs, line, by_col,
+                                               self.rng.choice(pairs))
+            return FAILURE
+
+        # the placed letters fix the line, every letter must be in it
+        anchor = line = spot = None
+        code = repeat
+        for ltr in ltrs:
+            idx = pos[ltr]
+            if idx == UNUSED:
+                code *= 6
+                continue
+            idx_line, idx_spot = divmod(idx, 5)
+            if by_col:
+                idx_line, idx_spot = idx_spot, idx_line
+            if anchor is None:
+                anchor, line, spot = ltr, idx_line, idx_spot
+            elif idx_line != line:
+                return FAILURE
+            code = code * 6 + (idx_spot - spot) % 5 + 1
+
+        if num_avbl == 0:
+            d1, d2, e1, e2 = ltrs
+            if (pos[e1] == self._next_spot(pos[d1], by_col)
+                    and pos[e2] == self._next_spot(pos[d2], by_col)):
+                self._advance()
+                return SUCCESS
+            return FAILURE
+        if repeat == OTHER or code not in COMPLETIONS:
+            return FAILURE
+        bits = taken[line]
+        fit = COMPLETIONS[code][(bits >> spot | bits << 5 - spot) & 31]
+        if fit is None:
+            return FAILURE
+        return self._fill_line(ltrs, line, by_col,
+                               ((fit[0] + spot) % 5, (fit[1] + spot) % 5))
+
+    @staticmethod
+    def _next_spot(idx, by_col):
+        """Key index of the spot after idx in its row (column if by_col)"""
+        if by_col:
+            return (idx + 5) % 25
+        return idx - idx % 5 + (idx + 1) % 5
 
     def action_row(self):
         """
@@ -106,1327 +668,135 @@ class KeyState:
         Returns:
             Boolean stating if the function could succesfully place a new item in the key or not.
         """
-        avbl_chars = self.check_avbl()
-        d1 = self.decp_txt[self.txt_idx]
-        d2 = self.decp_txt[self.txt_idx+1]
-        e1 = self.encp_txt[self.txt_idx]
-        e2 = self.encp_txt[self.txt_idx+1]
-        # if not avbl_chars:
-        #     print("all chars used")
-        #     return -12242134
-        rows = enumerate(self.avbl_row)
-        if len(avbl_chars) == 4:
-            # in this case columns are only usisble if they have > 3 open spots
-            rows = list([r for r in rows if r[1] > 3])
-            rows.sort(key=lambda tup: tup[1])
-            for i in range(len(rows)):
-                max_row = rows[-1-i][0]
-                cur_row = list([s for s in self.avbl if s // 5 == max_row])
-                valid_placements = []
-                # check what spot (if any) is being used in max col, then
-                # randomize where we place things
-                if len(cur_row) == 5:
-                    for idx in range(0, 5):
-                        valid_placements.append((idx, (idx+2) % 5))
-                        valid_placements.append((idx, (idx+3) % 5))
-                else:
-                    for j in range(0, 5):
-                        if max_row*5 + j not in cur_row:
-                            valid_placements.append(((j+1)%5, (j+3)%5))
-                            valid_placements.append(((j+3)%5, (j+1)%5))
-                placement = random.choice(valid_placements)
-                self.add_char(d1, placement[0] +  5 * max_row)
-                self.add_char(e1, ((placement[0] + 1) % 5) + 5 * max_row)
-                self.add_char(d2, placement[1] + 5 * max_row)
-                self.add_char(e2, ((placement[1] + 1) % 5) + 5 * max_row)
-                self.txt_idx += 2
-                return SUCCESS
-        if len(avbl_chars) == 3:
-            rows = list([r for r in rows if r[1] > 2])
-            rows.sort(key=lambda tup: tup[1])
-            if len(set([d1, d2, e1, e2])) == 3:
-                # e1 cant possibly equal e2 and d1 cant equal d2 because of how
-                #   the cipher works
-                if d1 == e1:
-                    return FAILURE
-                elif d2 == e2:
-                    return FAILURE
-                elif d1 == e2:
-                    for i in range(len(rows)):
-                        max_row = rows[-1-i][0]
-                        cur_row = list([s for s in self.avbl if s // 5 == max_row])
-                        valid_placements = []
-                        # check what spot (if any) is being used in max col, then
-                        # randomize where we place things
-                        if len(cur_row) == 5:
-                            for idx in range(0, 5):
-                                valid_placements.append((idx, (idx+4) % 5))
-                        if len(cur_row) == 4:
-                            for j in range(0, 5):
-                                if max_row * 5 + j not in cur_row:
-                                    valid_placements.append(((j+2) % 5, (j+1) % 5))
-                                    valid_placements.append(((j+3) % 5, (j+2) % 5))
-                        if len(cur_row) == 3:
-                            for j in range(0, 5):
-                                if max_row * 5 + j not in cur_row:
-                                    if max_row*5 + ((j+1)%5) not in cur_row:
-                                        valid_placements.append(((j+3) % 5, (j+2) % 5))
-                                    if max_row * 5 + ((j+4)%5) not in cur_row:
-                                        valid_placements.append(((j+2) % 5, (j+1) % 5))
-                        if valid_placements != []:
-                            placement = random.choice(valid_placements)
-                            self.add_char(d1, placement[0] + 5 * max_row)
-                            self.add_char(e1, ((placement[0] + 1) % 5) + 5 * max_row)
-                            self.add_char(d2, placement[1] + 5 * max_row)
-                            # self.add_char(e2, ((placement[1] + 1) % 5) * 5 + max_col)
-                            self.txt_idx += 2
-                            return SUCCESS
-                elif d2 == e1:
-                    for i in range(len(rows)):
-                        max_row = rows[-1-i][0]
-                        cur_row = list([s for s in self.avbl if s // 5 == max_row])
-                        valid_placements = []
-                        # check what spot (if any) is being used in max col, then
-                        # randomize where we place things
-                        if len(cur_row) == 5:
-                            for idx in range(0, 5):
-                                valid_placements.append((idx, (idx+1) % 5))
-                        if len(cur_row) == 4:
-                            if 5*max_row not in cur_row:  # first in row
-                                valid_placements.append((1, 2))
-                                valid_placements.append((2, 3))
-                            if 5*max_row + 1 not in cur_row:  # Second in row
-                                valid_placements.append((2, 3))
-                                valid_placements.append((3, 4))
-                            if 5*max_row + 2 not in cur_row:  # third in row
-                                valid_placements.append((3, 4))
-                                valid_placements.append((4, 0))
-                            if 5*max_row + 3 not in cur_row:  # fourth in col
-                                valid_placements.append((4, 0))
-                                valid_placements.append((0, 1))
-                            if 5*max_row + 4 not in cur_row:  # fifth in col
-                                valid_placements.append((0, 1))
-                                valid_placements.append((1, 2))
-                        if len(cur_row) == 3:
-                            if 5*max_row not in cur_row:  # first in col
-                                if 5*max_row + 1 not in cur_row:
-                                    valid_placements.append((2, 3))
-                                elif 5*max_row + 4 not in cur_row:
-                                    valid_placements.append((1, 2))
-                            if 5*max_row + 1 not in cur_row:  # Second in col
-                                if 5*max_row not in cur_row:
-                                    valid_placements.append((2, 3))
-                                if 5*max_row + 2 not in cur_row:
-                                    valid_placements.append((3, 4))
-                            if 5*max_row + 2 not in cur_row:  # third in col
-                                if 5*max_row + 3 not in cur_row:
-                                    valid_placements.append((4, 0))
-                                if 5*max_row + 1 not in cur_row:
-                                    valid_placements.append((3, 4))
-                            if 5*max_row + 3 not in cur_row:  # fourth in col
-                                if 5*max_row + 2 not in cur_row:
-                                    valid_placements.append((4, 0))
-                                if 5*max_row + 4 not in cur_row:
-                                    valid_placements.append((0, 1))
-                            if 5*max_row + 4 not in cur_row:  # fifth in col
-                                if 5*max_row + 3 not in cur_row:
-                                    valid_placements.append((0, 1))
-                                if 5*max_row not in cur_row:
-                                    valid_placements.append((1, 2))
-                        if valid_placements != []:
-                            placement = random.choice(valid_placements)
-                            self.add_char(d1, placement[0] + 5 * max_row)
-                            # self.add_char(e1, ((placement[0] + 1) % 5) * 5 + max_col)
-                            self.add_char(d2, placement[1] + 5 * max_row)
-                            self.add_char(e2, ((placement[1] + 1) % 5) + 5 * max_row)
-                            self.txt_idx += 2
-                            return SUCCESS
-            else:
-                if d1 in self.used:
-                    d1_idx = self.used[d1] // 5
-                    d1_idx_in_row = self.used[d1] % 5
-                    cur_row = list([s for s in self.avbl if s // 5 == d1_idx])
-                    valid_placements = []
-                    if len(cur_row) == 4:
-                        for i in range(0, 5):
-                            if d1_idx_in_row == i:
-                                valid_placements.append((i, (i+2) % 5))
-                                valid_placements.append((i, (i+3) % 5))
-                    elif len(cur_row) == 3:
-                        for i in range(0,5):
-                            if d1_idx_in_row == i:
-                                if d1_idx * 5 + ((i + 2)%5) not in cur_row:
-                                    valid_placements.append((i, (i+3) % 5))
-                                if d1_idx*5 + ((i + 4)%5) not in cur_row:
-                                    valid_placements.append((i, (i+2) % 5))
-                    if valid_placements != []:
-                        placement = random.choice(valid_placements)
-                        # self.add_char(d1, placement[0] * 5 + d1_idx)
-                        self.add_char(e1, ((placement[0] + 1) % 5) + 5 * d1_idx)
-                        self.add_char(d2, placement[1] + 5 * d1_idx)
-                        self.add_char(e2, ((placement[1] + 1) % 5) + 5 * d1_idx)
-                        self.txt_idx += 2
-                        return SUCCESS
-                elif d2 in self.used:
-                    d2_idx = self.used[d2] // 5
-                    d2_idx_in_row = self.used[d2] % 5
-                    cur_row = list([s for s in self.avbl if s // 5 == d2_idx])
-                    valid_placements = []
-                    if len(cur_row) == 4:
-                        for i in range(0, 5):
-                            if d2_idx_in_row == i:
-                                valid_placements.append(((i+2) % 5, i))
-                                valid_placements.append(((i+3) % 5, i))
-                    elif len(cur_row) == 3:
-                        for i in range(0,5):
-                            if d2_idx_in_row == i:
-                                if d2_idx*5 + ((i + 2)%5) not in cur_row:
-                                    valid_placements.append(((i+3) % 5, i))
-                                if d2_idx*5 + ((i + 4)%5) not in cur_row:
-                                    valid_placements.append(((i+2) % 5, i))
-                    if valid_placements != []:
-                        placement = random.choice(valid_placements)
-                        self.add_char(d1, placement[0] + 5 * d2_idx)
-                        self.add_char(e1, ((placement[0] + 1) % 5) + 5 * d2_idx)
-                        # self.add_char(d2, placement[1] * 5 + d2_idx)
-                        self.add_char(e2, ((placement[1] + 1) % 5) + 5 * d2_idx)
-                        self.txt_idx += 2
-                        return SUCCESS
-                elif e1 in self.used:
-                    e1_idx = self.used[e1] // 5
-                    e1_idx_in_row = self.used[e1] % 5
-                    cur_row = list([s for s in self.avbl if s // 5 == e1_idx])
-                    valid_placements = []
-                    if len(cur_row) == 4:
-                        for i in range(0, 5):
-                            if e1_idx_in_row == i:
-                                valid_placements.append(((i+4) % 5, (i+1) % 5))
-                                valid_placements.append(((i+4) % 5, (i+2) % 5))
-                    elif len(cur_row) == 3:
-                        for i in range(0,5):
-                            if e1_idx_in_row == i:
-                                if e1_idx*5 + ((i + 1)%5) not in cur_row:
-                                    valid_placements.append(((i+4) % 5, (i+2) % 5))
-                                if e1_idx*5 + ((i + 3)%5) not in cur_row:
-                                    valid_placements.append(((i+4) % 5, (i+1) % 5))
-                    if valid_placements != []:
-                        placement = random.choice(valid_placements)
-                        self.add_char(d1, placement[0] + 5 * e1_idx)
-                        # self.add_char(e1, ((placement[0] + 1) % 5) * 5 + e1_idx)
-                        self.add_char(d2, placement[1] + 5 * e1_idx)
-                        self.add_char(e2, ((placement[1] + 1) % 5) + 5 * e1_idx)
-                        self.txt_idx += 2
-                        return SUCCESS
-                elif e2 in self.used:
-                    e2_idx = self.used[e2] // 5
-                    e2_idx_in_row = self.used[e2] % 5
-                    cur_row = list([s for s in self.avbl if s // 5 == e2_idx])
-                    valid_placements = []
-                    if len(cur_row) == 4:
-                        for i in range(0, 5):
-                            if e2_idx_in_row == i:
-                                valid_placements.append(((i+1) % 5, (i+4) % 5))
-                                valid_placements.append(((i+2) % 5, (i+4) % 5))
-                    elif len(cur_row) == 3:
-                        for i in range(0,5):
-                            if e2_idx_in_row == i:
-                                if e2_idx*5 + ((i + 1)%5) not in cur_row:
-                                    valid_placements.append(((i+2) % 5, (i+4) % 5))
-                                if e2_idx*5 + ((i + 3)%5) not in cur_row:
-                                    valid_placements.append(((i+1) % 5, (i+4) % 5))
-                    if valid_placements != []:
-                        placement = random.choice(valid_placements)
-                        self.add_char(d1, placement[0] + 5 * e2_idx)
-                        self.add_char(e1, ((placement[0] + 1) % 5) + 5 * e2_idx)
-                        self.add_char(d2, placement[1] + 5 * e2_idx)
-                        # self.add_char(e2, ((placement[1] + 1) % 5) * 5 + e2_idx)
-                        self.txt_idx += 2
-                        return SUCCESS
-        if len(avbl_chars) == 2:
-            if len(set([d1, d2, e1, e2])) == 3:
-                if d1 == e1:
-                    return FAILURE
-                if e2 == d2:
-                    return FAILURE
-                if d1 == e2:
-                    if d1 in self.used:
-                        if (self.used[d1] + 1) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                            if (self.used[d1] + 4) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                self.add_char(d2, (self.used[d1] + 4)%5 + 5 * (self.used[d1] // 5))
-                                self.add_char(e1, (self.used[d1] + 1) % 5+ 5 * (self.used[d1] // 5))
-                                self.txt_idx +=2
-                                return SUCCESS
-                        return FAILURE
-                    if d2 in self.used:
-                        if (self.used[d2] + 1) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                            if (self.used[d2] + 2) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                self.add_char(d1, (self.used[d2]+1) % 5 + 5 * (self.used[d2] // 5))
-                                self.add_char(e1, (self.used[d2]+2) % 5 + 5 * (self.used[d2] // 5))
-                                self.txt_idx +=2
-                                return SUCCESS
-                            return FAILURE
-                        return FAILURE
-                    elif e1 in self.used:
-                        if (self.used[e1] + 3)% 5 + 5 * (self.used[e1] // 5) in self.avbl:
-                            if (self.used[e1] + 4) % 5 + 5 * (self.used[e1] // 5) in self.avbl:
-                                self.add_char(d1, (self.used[e1]+4) % 5 + 5 * (self.used[e1] // 5))
-                                self.add_char(d2, (self.used[e1]+3) % 5 + 5 * (self.used[e1] // 5))
-                                self.txt_idx +=2
-                                return SUCCESS
-                            return FAILURE
-                        return FAILURE
-                if d2 == e1:
-                    if d2 in self.used:
-                        if (self.used[d2] + 1) % 5 + 5 * (self.used[d2] // 5)in self.avbl:
-                            if (self.used[d2] + 4) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                self.add_char(d1, (self.used[d2] + 4) % 5 + 5 * (self.used[d2] // 5))
-                                self.add_char(e2, (self.used[d2] + 1) % 5 + 5 * (self.used[d2] // 5))
-                                self.txt_idx +=2
-                                return SUCCESS
-                        return FAILURE
-                    if d1 in self.used:
-                        if (self.used[d1] + 1)% 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                            if (self.used[d1] + 2) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                self.add_char(d2, (self.used[d1]+1) % 5 + 5 * (self.used[d1] // 5))
-                                self.add_char(e2, (self.used[d1]+2) % 5 + 5 * (self.used[d1] // 5))
-                                self.txt_idx += 2
-                                return SUCCESS
-                            return FAILURE
-                        return FAILURE
-                    elif e2 in self.used:
-                        if (self.used[e2] + 3) % 5 + 5 * (self.used[e2] // 5) in self.avbl:
-                            if (self.used[e2] + 4) % 5 + 5 * (self.used[e2] // 5) in self.avbl:
-                                self.add_char(d2, (self.used[e2] + 4) % 5 + 5 * (self.used[e2] // 5))
-                                self.add_char(d1, (self.used[e2]+ 3) % 5 + 5 * (self.used[e2] // 5))
-                                self.txt_idx +=2
-                                return SUCCESS
-                            return FAILURE
-                        return FAILURE
-            else:
-                if d1 in self.used:
-                    if e1 in self.used:
-                        if self.used[e1] == (self.used[d1] + 1) % 5 + 5 * (self.used[d1] // 5):
-                            if (self.used[d1]+2) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                if (self.used[d1]+3) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                    self.add_char(d2, (self.used[d1]+2) % 5 + 5 * (self.used[d1] // 5))
-                                    self.add_char(e2, (self.used[d1]+3) % 5 + 5 * (self.used[d1] // 5))
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                            if (self.used[d1]+3) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                if (self.used[d1]+ 4) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                    self.add_char(d2, (self.used[d1]+3) % 5 + 5 * (self.used[d1] // 5))
-                                    self.add_char(e2, (self.used[d1]+4) % 5 + 5 * (self.used[d1] // 5))
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        return FAILURE
-                    if d2 in self.used:
-                        if self.used[d2] == (self.used[d1] + 2) % 5 + 5 * (self.used[d1] // 5):
-                            if (self.used[d1]+1) % 5 + 5 * (self.used[d1] // 5)in self.avbl:
-                                if (self.used[d1]+3) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                    self.add_char(e2, (self.used[d1]+3) % 5 + 5 * (self.used[d1] // 5))
-                                    self.add_char(e1, (self.used[d1]+1) % 5 + 5 * (self.used[d1] // 5))
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        if self.used[d2] == (self.used[d1] + 3) % 5 + 5 * (self.used[d1] // 5):
-                            if (self.used[d1]+1) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                if (self.used[d1]+4) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                    self.add_char(e2, (self.used[d1]+4) % 5 + 5 * (self.used[d1] // 5))
-                                    self.add_char(e1, (self.used[d1]+1) % 5 + 5 * (self.used[d1] // 5))
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        return FAILURE
-                    if e2 in self.used:
-                        if self.used[e2] == (self.used[d1] + 3) % 5 + 5 * (self.used[d1] // 5):
-                            if (self.used[d1]+1) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                if (self.used[d1]+2) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                    self.add_char(d2, (self.used[d1]+2) % 5 + 5 * (self.used[d1] // 5))
-                                    self.add_char(e1, (self.used[d1]+1) % 5 + 5 * (self.used[d1] // 5))
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        if self.used[e2] == (self.used[d1] + 4) % 5 + 5 * (self.used[d1] // 5):
-                            if (self.used[d1]+1) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                if (self.used[d1]+3) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                    self.add_char(d2, (self.used[d1]+3) % 5 + 5 * (self.used[d1] // 5))
-                                    self.add_char(e1, (self.used[d1]+1) % 5 + 5 * (self.used[d1] // 5))
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                    return FAILURE
-                elif d2 in self.used:
-                    if e1 in self.used:
-                        if self.used[e1] == (self.used[d2] + 3) % 5 + 5 * (self.used[d2] // 5):
-                            if (self.used[d2]+1) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                if (self.used[d2]+2) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                    self.add_char(d1, (self.used[d2]+2) % 5 + 5 * (self.used[d2] // 5))
-                                    self.add_char(e2, (self.used[d2]+1) % 5 + 5 * (self.used[d2] // 5))
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        if self.used[e1] == (self.used[d2] + 4) % 5 + 5 * (self.used[d2] // 5):
-                            if (self.used[d2]+1) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                if (self.used[d2]+3) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                    self.add_char(d1, (self.used[d2]+3) % 5 + 5 * (self.used[d2] // 5))
-                                    self.add_char(e2, (self.used[d2]+1) % 5 + 5 * (self.used[d2] // 5))
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        return FAILURE
-                    if e2 in self.used:
-                        if self.used[e2] == (self.used[d2] + 1) % 5 + 5 * (self.used[d2] // 5):
-                            if (self.used[d2]+2) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                if (self.used[d2]+3) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                    self.add_char(d1, (self.used[d2]+2) % 5 + 5 * (self.used[d2] // 5))
-                                    self.add_char(e1, (self.used[d2]+3) % 5 + 5 * (self.used[d2] // 5))
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                            if (self.used[d2]+3) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                if (self.used[d2]+4) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                    self.add_char(d1, (self.used[d2]+3) % 5 + 5 * (self.used[d2] // 5))
-                                    self.add_char(e1, (self.used[d2]+4) % 5 + 5 * (self.used[d2] // 5))
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        return FAILURE
-                    return FAILURE
-                elif e1 in self.used:
-                    if e2 in self.used:
-                        if self.used[e2] == (self.used[e1] + 2) % 5 + 5 * (self.used[e1] // 5):
-                            if (self.used[e1]+1) % 5 + 5 * (self.used[e1] // 5) in self.avbl:
-                                if (self.used[e1]+4) % 5 + 5 * (self.used[e1] // 5) in self.avbl:
-                                    self.add_char(d1, (self.used[e1]+4) % 5 + 5 * (self.used[e1] // 5))
-                                    self.add_char(d2, (self.used[e1]+1) % 5 + 5 * (self.used[e1] // 5))
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        if self.used[e2] == (self.used[e1] + 3) % 5 + 5 * (self.used[e1] // 5):
-                            if (self.used[e1]+ 2) % 5 + 5 * (self.used[e1] // 5) in self.avbl:
-                                if (self.used[e1]+ 4) % 5 + 5 * (self.used[e1] // 5) in self.avbl:
-                                    self.add_char(d1, (self.used[e1]+4) % 5 + 5 * (self.used[e1] // 5))
-                                    self.add_char(d2, (self.used[e1]+2) % 5 + 5 * (self.used[e1] // 5))
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        return FAILURE
-        if len(avbl_chars) == 1:
-            if len(set([d1, d2, e1, e2])) == 3:
-                if d1 == d2:
-                    return FAILURE
-                if e2 == d2:
-                    return FAILURE
-                if d1 == e2:
-                    if d1 in self.used:
-                        if d2 in self.used:
-                            if self.used[d2] == (self.used[d1]+4)%5 + 5 * (self.used[d1] // 5):
-                                if (self.used[d1] + 1) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                    self.add_char(e1, (self.used[d1] + 1) % 5 + 5 * (self.used[d1] // 5))
-                                    self.txt_idx +=2
-                                    return SUCCESS
-                            return FAILURE
-                        if e1 in self.used:
-                            if self.used[e1] == (self.used[d1]+1)%5 + 5 * (self.used[d1] // 5):
-                                if (self.used[d1] + 4) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                    self.add_char(d2, (self.used[d1] + 4) % 5 + 5 * (self.used[d1] // 5))
-                                    self.txt_idx +=2
-                                    return SUCCESS
-                            return FAILURE
-                    if e1 in self.used and d2 in self.used:
-                        if self.used[e1] == (self.used[d2] + 2) % 5 + 5 * (self.used[d2] // 5):
-                            if (self.used[d2] + 1) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                self.add_char(d1, (self.used[d2] + 1)%5 + 5 * (self.used[d2] // 5))
-                                self.txt_idx +=2
-                                return SUCCESS
-                        return FAILURE
-                if d2 == e1:
-                    if d2 in self.used:
-                        if d1 in self.used:
-                            if self.used[d1] == (self.used[d2]+4)%5 + 5 * (self.used[d2] // 5):
-                                if (self.used[d2] + 1) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                    self.add_char(e2, (self.used[d2] + 1) % 5 + 5 * (self.used[d2] // 5))
-                                    self.txt_idx +=2
-                                    return SUCCESS
-                            return FAILURE
-                        if e2 in self.used:
-                            if self.used[e2] == (self.used[d2]+1)%5 + 5 * (self.used[d2] // 5):
-                                if (self.used[d2] + 4) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                    self.add_char(d1, (self.used[d2] + 4) % 5 + 5 * (self.used[d2] // 5))
-                                    self.txt_idx +=2
-                                    return SUCCESS
-                            return FAILURE
-                    if e2 in self.used and d1 in self.used:
-                        if self.used[e2] == (self.used[d1] + 2) % 5 + 5 * (self.used[d1] // 5):
-                            if (self.used[d1] + 1) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                self.add_char(d2, (self.used[d1] + 1)%5 + 5 * (self.used[d1] // 5))
-                                self.txt_idx +=2
-                                return SUCCESS
-                        return FAILURE
-            else:
-                if d1 in self.used:
-                    if d2 in self.used:
-                        if self.used[d2] // 5 == self.used[d1] // 5:
-                            if e1 in self.used:
-                                if self.used[e1] == (self.used[d1] + 1) % 5 + 5 * (self.used[d1] // 5):
-                                    if (self.used[d2]+1) % 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                        self.add_char(e2,(self.used[d2]+1)%5 + 5 * (self.used[d1] // 5))
-                                        self.txt_idx +=2
-                                        return SUCCESS
-                                return FAILURE
-                            elif e2 in self.used:
-                                if self.used[e2] == (self.used[d2] + 1) % 5 + 5 * (self.used[d2] // 5):
-                                    if (self.used[d1]+1) % 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                        self.add_char(e1,(self.used[d1]+1)%5 + 5 * (self.used[d2] // 5))
-                                        self.txt_idx +=2
-                                        return SUCCESS
-                                return FAILURE
-                    elif self.used[e2] // 5 == self.used[d1] // 5:
-                        if self.used[e1] == (self.used[d1] + 1) % 5 + 5 * (self.used[d1] // 5):
-                            if (self.used[e2]+ 4)% 5 + 5 * (self.used[d1] // 5) in self.avbl:
-                                self.add_char(d2,(self.used[e2]+ 4)% 5 + 5 * (self.used[d1] // 5))
-                                self.txt_idx += 2
-                                return SUCCESS
-                        return FAILURE
-                    return FAILURE
-                if d2 in self.used:
-                    if self.used[e1] // 5 == self.used[d2] // 5:
-                        if self.used[e2] == (self.used[d2] + 1) % 5 + 5 * (self.used[d2] // 5):
-                            if (self.used[e1]+4)% 5 + 5 * (self.used[d2] // 5) in self.avbl:
-                                self.add_char(d1,(self.used[e1]+4)%5 + 5 * (self.used[d2] // 5))
-                                self.txt_idx += 2
-                                return SUCCESS
-                    return FAILURE
-        if len(avbl_chars) == 0:
-            we_good = True
-            we_good &= self.used[d1] // 5 == self.used[d2] // 5
-            we_good &= self.used[e1] == (self.used[d1] + 1) % 5 + 5 * (self.used[d1] // 5)
-            we_good &= self.used[e2] == (self.used[d2] + 1) % 5 + 5 * (self.used[d2] // 5)
-            if we_good:
-                self.txt_idx += 2
-                return SUCCESS
-        return FAILURE
+        return self._line_action(False)
 
     def action_column(self):
         """
-        Makes a column action: adds the plain text cipher text in a single column
+        Makes a column action: adds the cipher text plain text pair to a single column.
 
         Returns:
-            Boolean stating whether the action was able to be completed or not
+            Boolean stating if the function could succesfully place a new item in the key or not.
         """
-        avbl_chars = self.check_avbl()
-        d1 = self.decp_txt[self.txt_idx]
-        d2 = self.decp_txt[self.txt_idx+1]
-        e1 = self.encp_txt[self.txt_idx]
-        e2 = self.encp_txt[self.txt_idx+1]
-        # if not avbl_chars:
-        #     print("all chars used")
-        #     return -12242134
-        cols = enumerate(self.avbl_col)
-        if len(avbl_chars) == 4:
-            # in this case columns are only usisble if they have > 3 open spots
-            cols = list([c for c in cols if c[1] > 3])
-            cols.sort(key=lambda tup: tup[1])
-            for i in range(len(cols)):
-                max_col = cols[-1-i][0]
-                cur_col = list([s for s in self.avbl if s % 5 == max_col])
-                valid_placements = []
-                # check what spot (if any) is being used in max col, then
-                # randomize where we place things
-                if len(cur_col) == 5:
-                    for idx in range(0, 5):
-                        valid_placements.append((idx, (idx+2) % 5))
-                        valid_placements.append((idx, (idx+3) % 5))
-                else:
-                    for j in range(0, 5):
-                        if max_col + (j*5) not in cur_col:
-                            valid_placements.append(((j+1)%5, (j+3)%5))
-                            valid_placements.append(((j+3)%5, (j+1)%5))
-                placement = random.choice(valid_placements)
-                self.add_char(d1, placement[0] * 5 + max_col)
-                self.add_char(e1, ((placement[0] + 1) % 5) * 5 + max_col)
-                self.add_char(d2, placement[1] * 5 + max_col)
-                self.add_char(e2, ((placement[1] + 1) % 5) * 5 + max_col)
-                self.txt_idx += 2
-                return SUCCESS
-        if len(avbl_chars) == 3:
-            cols = list([c for c in cols if c[1] > 2])
-            cols.sort(key=lambda tup: tup[1])
-            if len(set([d1, d2, e1, e2])) == 3:
-                # e1 cant possibly equal e2 and d1 cant equal d2 because of how
-                #   the cipher works
-                if d1 == e1:
-                    return FAILURE
-                elif d2 == e2:
-                    return FAILURE
-                elif d1 == e2:
-                    for i in range(len(cols)):
-                        max_col = cols[-1-i][0]
-                        cur_col = list([s for s in self.avbl if s % 5 == max_col])
-                        valid_placements = []
-                        # check what spot (if any) is being used in max col, then
-                        # randomize where we place things
-                        if len(cur_col) == 5:
-                            for idx in range(0, 5):
-                                valid_placements.append((idx, (idx+4) % 5))
-                        if len(cur_col) == 4:
-                            for j in range(0, 5):
-                                if max_col + (j*5) not in cur_col:
-                                    valid_placements.append(((j+2) % 5, (j+1) % 5))
-                                    valid_placements.append(((j+3) % 5, (j+2) % 5))
-                        if len(cur_col) == 3:
-                            for j in range(0, 5):
-                                if max_col + (j*5) not in cur_col:
-                                    if max_col + (((j+1)%5)*5) not in cur_col:
-                                        valid_placements.append(((j+3) % 5, (j+2) % 5))
-                                    if max_col + (((j+4)%5)*5) not in cur_col:
-                                        valid_placements.append(((j+2) % 5, (j+1) % 5))
-                        if valid_placements != []:
-                            placement = random.choice(valid_placements)
-                            self.add_char(d1, placement[0] * 5 + max_col)
-                            self.add_char(e1, ((placement[0] + 1) % 5) * 5 + max_col)
-                            self.add_char(d2, placement[1] * 5 + max_col)
-                            # self.add_char(e2, ((placement[1] + 1) % 5) * 5 + max_col)
-                            self.txt_idx += 2
-                            return SUCCESS
-                elif d2 == e1:
-                    for i in range(len(cols)):
-                        max_col = cols[-1-i][0]
-                        cur_col = list([s for s in self.avbl if s % 5 == max_col])
-                        valid_placements = []
-                        # check what spot (if any) is being used in max col, then
-                        # randomize where we place things
-                        if len(cur_col) == 5:
-                            for idx in range(0, 5):
-                                valid_placements.append((idx, (idx+1) % 5))
-                        if len(cur_col) == 4:
-                            if max_col not in cur_col:  # first in col
-                                valid_placements.append((1, 2))
-                                valid_placements.append((2, 3))
-                            if max_col + 5 not in cur_col:  # Second in col
-                                valid_placements.append((2, 3))
-                                valid_placements.append((3, 4))
-                            if max_col + 10 not in cur_col:  # third in col
-                                valid_placements.append((3, 4))
-                                valid_placements.append((4, 0))
-                            if max_col + 15 not in cur_col:  # fourth in col
-                                valid_placements.append((4, 0))
-                                valid_placements.append((0, 1))
-                            if max_col + 20 not in cur_col:  # fifth in col
-                                valid_placements.append((0, 1))
-                                valid_placements.append((1, 2))
-                        if len(cur_col) == 3:
-                            if max_col not in cur_col:  # first in col
-                                if max_col + 5 not in cur_col:
-                                    valid_placements.append((2, 3))
-                                elif max_col + 20 not in cur_col:
-                                    valid_placements.append((1, 2))
-                            if max_col + 5 not in cur_col:  # Second in col
-                                if max_col not in cur_col:
-                                    valid_placements.append((2, 3))
-                                if max_col + 10 not in cur_col:
-                                    valid_placements.append((3, 4))
-                            if max_col + 10 not in cur_col:  # third in col
-                                if max_col + 15 not in cur_col:
-                                    valid_placements.append((4, 0))
-                                if max_col + 5 not in cur_col:
-                                    valid_placements.append((3, 4))
-                            if max_col + 15 not in cur_col:  # fourth in col
-                                if max_col + 10 not in cur_col:
-                                    valid_placements.append((4, 0))
-                                if max_col + 20 not in cur_col:
-                                    valid_placements.append((0, 1))
-                            if max_col + 20 not in cur_col:  # fifth in col
-                                if max_col + 15 not in cur_col:
-                                    valid_placements.append((0, 1))
-                                if max_col not in cur_col:
-                                    valid_placements.append((1, 2))
-                        if valid_placements != []:
-                            placement = random.choice(valid_placements)
-                            self.add_char(d1, placement[0] * 5 + max_col)
-                            # self.add_char(e1, ((placement[0] + 1) % 5) * 5 + max_col)
-                            self.add_char(d2, placement[1] * 5 + max_col)
-                            self.add_char(e2, ((placement[1] + 1) % 5) * 5 + max_col)
-                            self.txt_idx += 2
-                            return SUCCESS
-            else:
-                if d1 in self.used:
-                    d1_idx = self.used[d1] % 5
-                    d1_idx_in_col = self.used[d1] // 5
-                    cur_col = list([s for s in self.avbl if s % 5 == d1_idx])
-                    valid_placements = []
-                    if len(cur_col) == 4:
-                        for i in range(0, 5):
-                            if d1_idx_in_col == i:
-                                valid_placements.append((i, (i+2) % 5))
-                                valid_placements.append((i, (i+3) % 5))
-                    elif len(cur_col) == 3:
-                        for i in range(0,5):
-                            if d1_idx_in_col == i:
-                                if ((i + 2)%5)*5 + d1_idx not in cur_col:
-                                    valid_placements.append((i, (i+3) % 5))
-                                if ((i + 4)%5)*5 + d1_idx not in cur_col:
-                                    valid_placements.append((i, (i+2) % 5))
-                    if valid_placements != []:
-                        placement = random.choice(valid_placements)
-                        # self.add_char(d1, placement[0] * 5 + d1_idx)
-                        self.add_char(e1, ((placement[0] + 1) % 5) * 5 + d1_idx)
-                        self.add_char(d2, placement[1] * 5 + d1_idx)
-                        self.add_char(e2, ((placement[1] + 1) % 5) * 5 + d1_idx)
-                        self.txt_idx += 2
-                        return SUCCESS
-                elif d2 in self.used:
-                    d2_idx = self.used[d2] % 5
-                    d2_idx_in_col = self.used[d2] // 5
-                    cur_col = list([s for s in self.avbl if s % 5 == d2_idx])
-                    valid_placements = []
-                    if len(cur_col) == 4:
-                        for i in range(0, 5):
-                            if d2_idx_in_col == i:
-                                valid_placements.append(((i+2) % 5, i))
-                                valid_placements.append(((i+3) % 5, i))
-                    elif len(cur_col) == 3:
-                        for i in range(0,5):
-                            if d2_idx_in_col == i:
-                                if ((i + 2)%5)*5 + d2_idx not in cur_col:
-                                    valid_placements.append(((i+3) % 5, i))
-                                if ((i + 4)%5)*5 + d2_idx not in cur_col:
-                                    valid_placements.append(((i+2) % 5, i))
-                    if valid_placements != []:
-                        placement = random.choice(valid_placements)
-                        self.add_char(d1, placement[0] * 5 + d2_idx)
-                        self.add_char(e1, ((placement[0] + 1) % 5) * 5 + d2_idx)
-                        # self.add_char(d2, placement[1] * 5 + d2_idx)
-                        self.add_char(e2, ((placement[1] + 1) % 5) * 5 + d2_idx)
-                        self.txt_idx += 2
-                        return SUCCESS
-                elif e1 in self.used:
-                    e1_idx = self.used[e1] % 5
-                    e1_idx_in_col = self.used[e1] // 5
-                    cur_col = list([s for s in self.avbl if s % 5 == e1_idx])
-                    valid_placements = []
-                    if len(cur_col) == 4:
-                        for i in range(0, 5):
-                            if e1_idx_in_col == i:
-                                valid_placements.append(((i+4) % 5, (i+1) % 5))
-                                valid_placements.append(((i+4) % 5, (i+2) % 5))
-                    elif len(cur_col) == 3:
-                        for i in range(0,5):
-                            if e1_idx_in_col == i:
-                                if ((i + 1)%5)*5 + e1_idx not in cur_col:
-                                    valid_placements.append(((i+4) % 5, (i+2) % 5))
-                                if ((i + 3)%5)*5 + e1_idx not in cur_col:
-                                    valid_placements.append(((i+4) % 5, (i+1) % 5))
-                    if valid_placements != []:
-                        placement = random.choice(valid_placements)
-                        self.add_char(d1, placement[0] * 5 + e1_idx)
-                        # self.add_char(e1, ((placement[0] + 1) % 5) * 5 + e1_idx)
-                        self.add_char(d2, placement[1] * 5 + e1_idx)
-                        self.add_char(e2, ((placement[1] + 1) % 5) * 5 + e1_idx)
-                        self.txt_idx += 2
-                        return SUCCESS
-                elif e2 in self.used:
-                    e2_idx = self.used[e2] % 5
-                    e2_idx_in_col = self.used[e2] // 5
-                    cur_col = list([s for s in self.avbl if s % 5 == e2_idx])
-                    valid_placements = []
-                    if len(cur_col) == 4:
-                        for i in range(0, 5):
-                            if e2_idx_in_col == i:
-                                valid_placements.append(((i+1) % 5, (i+4) % 5))
-                                valid_placements.append(((i+2) % 5, (i+4) % 5))
-                    elif len(cur_col) == 3:
-                        for i in range(0,5):
-                            if e2_idx_in_col == i:
-                                if ((i + 1)%5)*5 + e2_idx not in cur_col:
-                                    valid_placements.append(((i+2) % 5, (i+4) % 5))
-                                if ((i + 3)%5)*5 + e2_idx not in cur_col:
-                                    valid_placements.append(((i+1) % 5, (i+4) % 5))
-                    if valid_placements != []:
-                        placement = random.choice(valid_placements)
-                        self.add_char(d1, placement[0] * 5 + e2_idx)
-                        self.add_char(e1, ((placement[0] + 1) % 5) * 5 + e2_idx)
-                        self.add_char(d2, placement[1] * 5 + e2_idx)
-                        # self.add_char(e2, ((placement[1] + 1) % 5) * 5 + e2_idx)
-                        self.txt_idx += 2
-                        return SUCCESS
-        if len(avbl_chars) == 2:
-            if len(set([d1, d2, e1, e2])) == 3:
-                if d1 == e1:
-                    return FAILURE
-                if e2 == d2:
-                    return FAILURE
-                if d1 == e2:
-                    if d1 in self.used:
-                        if (self.used[d1] + 5) % 25 in self.avbl:
-                            if (self.used[d1] + 20) % 25 in self.avbl:
-                                self.add_char(d2, (self.used[d1] + 20) % 25)
-                                self.add_char(e1, (self.used[d1] + 5) % 25)
-                                self.txt_idx +=2
-                                return SUCCESS
-                        return FAILURE
-                    if d2 in self.used:
-                        if (self.used[d2] + 5)%25 in self.avbl:
-                            if (self.used[d2] + 10)%25 in self.avbl:
-                                self.add_char(d1, (self.used[d2]+5) % 25)
-                                self.add_char(e1, (self.used[d2]+10) % 25)
-                                self.txt_idx +=2
-                                return SUCCESS
-                            return FAILURE
-                        return FAILURE
-                    elif e1 in self.used:
-                        if (self.used[e1] + 15)%25 in self.avbl:
-                            if (self.used[e1] + 20)%25 in self.avbl:
-                                self.add_char(d1, (self.used[e1]+20) % 25)
-                                self.add_char(d2, (self.used[e1]+15) % 25)
-                                self.txt_idx +=2
-                                return SUCCESS
-                            return FAILURE
-                        return FAILURE
-                if d2 == e1:
-                    if d2 in self.used:
-                        if (self.used[d2] + 5) % 25 in self.avbl:
-                            if (self.used[d2] + 20) % 25 in self.avbl:
-                                self.add_char(d1, (self.used[d2] + 20) % 25)
-                                self.add_char(e2, (self.used[d2] + 5) % 25)
-                                self.txt_idx +=2
-                                return SUCCESS
-                        return FAILURE
-                    if d1 in self.used:
-                        if (self.used[d1] + 5)%25 in self.avbl:
-                            if (self.used[d1] + 10)%25 in self.avbl:
-                                self.add_char(d2, (self.used[d1]+5) % 25)
-                                self.add_char(e2, (self.used[d1]+10) % 25)
-                                self.txt_idx +=2
-                                return SUCCESS
-                            return FAILURE
-                        return FAILURE
-                    elif e2 in self.used:
-                        if (self.used[e2] + 15)%25 in self.avbl:
-                            if (self.used[e2] + 20)%25 in self.avbl:
-                                self.add_char(d2, (self.used[e2]+20) % 25)
-                                self.add_char(d1, (self.used[e2]+15) % 25)
-                                self.txt_idx +=2
-                                return SUCCESS
-                            return FAILURE
-                        return FAILURE
-            else:
-                if d1 in self.used:
-                    if e1 in self.used:
-                        if self.used[e1] == (self.used[d1] + 5) % 25:
-                            if (self.used[d1]+10) % 25 in self.avbl:
-                                if (self.used[d1]+15) % 25 in self.avbl:
-                                    self.add_char(d2, (self.used[d1]+10) % 25)
-                                    self.add_char(e2, (self.used[d1]+15) % 25)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                            if (self.used[d1]+15) % 25 in self.avbl:
-                                if (self.used[d1]+20) % 25 in self.avbl:
-                                    self.add_char(d2, (self.used[d1]+15) % 25)
-                                    self.add_char(e2, (self.used[d1]+20) % 25)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        return FAILURE
-                    if d2 in self.used:
-                        if self.used[d2] == (self.used[d1] + 10) % 25:
-                            if (self.used[d1]+5) % 25 in self.avbl:
-                                if (self.used[d1]+15) % 25 in self.avbl:
-                                    self.add_char(e2, (self.used[d1]+15) % 25)
-                                    self.add_char(e1, (self.used[d1]+5) % 25)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        if self.used[d2] == (self.used[d1] + 15) % 25:
-                            if (self.used[d1]+5) % 25 in self.avbl:
-                                if (self.used[d1]+20) % 25 in self.avbl:
-                                    self.add_char(e2, (self.used[d1]+20) % 25)
-                                    self.add_char(e1, (self.used[d1]+5) % 25)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        return FAILURE
-                    if e2 in self.used:
-                        if self.used[e2] == (self.used[d1] + 15) % 25:
-                            if (self.used[d1]+5) % 25 in self.avbl:
-                                if (self.used[d1]+10) % 25 in self.avbl:
-                                    self.add_char(d2, (self.used[d1]+10) % 25)
-                                    self.add_char(e1, (self.used[d1]+5) % 25)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        if self.used[e2] == (self.used[d1] + 20) % 25:
-                            if (self.used[d1]+5) % 25 in self.avbl:
-                                if (self.used[d1]+15) % 25 in self.avbl:
-                                    self.add_char(d2, (self.used[d1]+15) % 25)
-                                    self.add_char(e1, (self.used[d1]+5) % 25)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        return FAILURE
-                elif d2 in self.used:
-                    if e1 in self.used:
-                        if self.used[e1] == (self.used[d2] + 15) % 25:
-                            if (self.used[d2]+5) % 25 in self.avbl:
-                                if (self.used[d2]+10) % 25 in self.avbl:
-                                    self.add_char(d1, (self.used[d2]+10) % 25)
-                                    self.add_char(e2, (self.used[d2]+5) % 25)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        if self.used[e1] == (self.used[d2] + 20) % 25:
-                            if (self.used[d2]+5) % 25 in self.avbl:
-                                if (self.used[d2]+15) % 25 in self.avbl:
-                                    self.add_char(d1, (self.used[d2]+15) % 25)
-                                    self.add_char(e2, (self.used[d2]+5) % 25)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        return FAILURE
-                    if e2 in self.used:
-                        if self.used[e2] == (self.used[d2] + 5) % 25:
-                            if (self.used[d2]+10) % 25 in self.avbl:
-                                if (self.used[d2]+15) % 25 in self.avbl:
-                                    self.add_char(d1, (self.used[d2]+10) % 25)
-                                    self.add_char(e1, (self.used[d2]+15) % 25)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                            if (self.used[d2]+15) % 25 in self.avbl:
-                                if (self.used[d2]+20) % 25 in self.avbl:
-                                    self.add_char(d1, (self.used[d2]+15) % 25)
-                                    self.add_char(e1, (self.used[d2]+20) % 25)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        return FAILURE
-                elif e1 in self.used:
-                    if e2 in self.used:
-                        if self.used[e2] == (self.used[e1] + 10) % 25:
-                            if (self.used[e1]+5) % 25 in self.avbl:
-                                if (self.used[e1]+20) % 25 in self.avbl:
-                                    self.add_char(d1, (self.used[e1]+20) % 25)
-                                    self.add_char(d2, (self.used[e1]+5) % 25)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        if self.used[e2] == (self.used[e1] + 15) % 25:
-                            if (self.used[e1]+10) % 25 in self.avbl:
-                                if (self.used[e1]+20) % 25 in self.avbl:
-                                    self.add_char(d1, (self.used[e1]+20) % 25)
-                                    self.add_char(d2, (self.used[e1]+10) % 25)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-                        return FAILURE
-        if len(avbl_chars) == 1:
-            if len(set([d1, d2, e1, e2])) == 3:
-                if d1 == d2:
-                    return FAILURE
-                if e2 == d2:
-                    return FAILURE
-                if d1 == e2:
-                    if d1 in self.used:
-                        if d2 in self.used:
-                            if self.used[d2] == (self.used[d1]+20)%25:
-                                if (self.used[d1] + 5) % 25 in self.avbl:
-                                    self.add_char(e1, (self.used[d1] + 5) % 25)
-                                    self.txt_idx +=2
-                                    return SUCCESS
-                            return FAILURE
-                        if e1 in self.used:
-                            if self.used[e1] == (self.used[d1]+5)%25:
-                                if (self.used[d1] + 20) % 25 in self.avbl:
-                                    self.add_char(d2, (self.used[d1] + 20) % 25)
-                                    self.txt_idx +=2
-                                    return SUCCESS
-                            return FAILURE
-                    if e1 in self.used and d2 in self.used:
-                        if self.used[e1] == (self.used[d2] + 10) % 25:
-                            if (self.used[d2] + 5) % 25 in self.avbl:
-                                self.add_char(d1, (self.used[d2] + 5)%25)
-                                self.txt_idx +=2
-                                return SUCCESS
-                        return FAILURE
-                if d2 == e1:
-                    if d2 in self.used:
-                        if d1 in self.used:
-                            if self.used[d1] == (self.used[d2]+20)%25:
-                                if (self.used[d2] + 5) % 25 in self.avbl:
-                                    self.add_char(e2, (self.used[d2] + 5) % 25)
-                                    self.txt_idx +=2
-                                    return SUCCESS
-                            return FAILURE
-                        if e2 in self.used:
-                            if self.used[e2] == (self.used[d2]+5)%25:
-                                if (self.used[d2] + 20) % 25 in self.avbl:
-                                    self.add_char(d1, (self.used[d2] + 20) % 25)
-                                    self.txt_idx +=2
-                                    return SUCCESS
-                            return FAILURE
-                    if e2 in self.used and d1 in self.used:
-                        if self.used[e2] == (self.used[d1] + 10) % 25:
-                            if (self.used[d1] + 5) % 25 in self.avbl:
-                                self.add_char(d2, (self.used[d1] + 5)%25)
-                                self.txt_idx +=2
-                                return SUCCESS
-                        return FAILURE
-            else:
-                if d1 in self.used:
-                    if d2 in self.used:
-                        if self.used[d2] % 5 == self.used[d1] % 5:
-                            if e1 in self.used:
-                                if self.used[e1] == (self.used[d1] + 5) % 25:
-                                    if (self.used[d2]+5) % 25 in self.avbl:
-                                        self.add_char(e2,(self.used[d2]+5)%25)
-                                        self.txt_idx +=2
-                                        return SUCCESS
-                                return FAILURE
-                            elif e2 in self.used:
-                                if self.used[e2] == (self.used[d2] + 5) % 25:
-                                    if (self.used[d1]+5) % 25 in self.avbl:
-                                        self.add_char(e1,(self.used[d1]+5)%25)
-                                        self.txt_idx +=2
-                                        return SUCCESS
-                                return FAILURE
-                    elif self.used[e2] % 5 == self.used[d1] % 5:
-                        if self.used[e1] == (self.used[d1] + 5) % 25:
-                            if (self.used[e2]+20)%25 in self.avbl:
-                                self.add_char(d2,(self.used[e2]+20)%25)
-                                self.txt_idx += 2
-                                return SUCCESS
-                        return FAILURE
-                    return FAILURE
-                if d2 in self.used:
-                    if self.used[e1] % 5 == self.used[d2] % 5:
-                        if self.used[e2] == (self.used[d2] + 5) % 25:
-                            if (self.used[e1]+20)%25 in self.avbl:
-                                self.add_char(d1,(self.used[e1]+20)%25)
-                                self.txt_idx += 2
-                                return SUCCESS
-                    return FAILURE
-        if len(avbl_chars) == 0:
-            we_good = True
-            we_good &= self.used[d1] % 5 == self.used[d2] % 5
-            we_good &= self.used[e1] == (self.used[d1] + 5) % 25
-            we_good &= self.used[e2] == (self.used[d2] + 5) % 25
-            if we_good:
-                self.txt_idx += 2
-                return SUCCESS
-        return FAILURE
+        return self._line_action(True)
+
+    def _fill_square(self, ltrs, rows, cols):
+        """
+        Places the unplaced letters of the current pairs on the corners of
+            the rectangle of two rows and two columns (see SLOT_ROW)
+        """
+        pos = self.pos
+        for slot, ltr in enumerate(ltrs):
+            if pos[ltr] == UNUSED:
+                self.place(ltr, rows[SLOT_ROW[slot]] * 5
+                           + cols[SLOT_COL[slot]])
+        self._advance()
+        return SUCCESS
+
+    def _free(self, row, col):
+        return not self.mask >> (row * 5 + col) & 1
 
     def action_square(self):
         """
-        Makes a square action: That is it puts the characters into the array in such a way that the encyphered chars and decyphers chars are diagnol, 
-        and all four form a square.
+        Makes a square action: adds the cipher text plain text pair to the
+            corners of a rectangle
 
         Returns:
-            Boolean stating whether the action was completed or not.
+            Boolean stating if the function could succesfully place a new item in the key or not.
         """
-        avbl_chars = self.check_avbl()
-        d1 = self.decp_txt[self.txt_idx]
-        d2 = self.decp_txt[self.txt_idx+1]
-        e1 = self.encp_txt[self.txt_idx]
-        e2 = self.encp_txt[self.txt_idx+1]
-        # if not avbl_chars:
-        #     print("all chars used")
-        #     return -12242134
-        rows = enumerate(self.avbl_row)
-        rows = list([r for r in rows if r[1] > 1])
-        rows.sort(key=lambda tup: tup[1])
-        cols = enumerate(self.avbl_col)
-        cols = list([c for c in cols if c[1] > 1])
-        cols.sort(key=lambda tup: tup[1])
-        if len(avbl_chars) == 4:
-            for i in range(len(rows)-1):
-                max_row1 = rows[-1-i][0]
-                for j in range(len(rows)-i-1):
-                    max_row2 = rows[-2-i-j][0]
-                    for k in range(len(cols)-1):
-                        max_col1 = cols[-1-k][0]
-                        for l in range(len(cols)-k-1):
-                            max_col2 = cols[-2-k-l][0]
-                            we_good = (max_row1 * 5) + max_col1 in self.avbl
-                            we_good &= (max_row1 * 5) + max_col2 in self.avbl
-                            we_good &= (max_row2 * 5) + max_col1 in self.avbl
-                            we_good &= (max_row2 * 5) + max_col2 in self.avbl
-                            if we_good:
-                                self.add_char(d1, (max_row1*5) + max_col1)
-                                self.add_char(e1, (max_row1*5) + max_col2)
-                                self.add_char(d2, (max_row2*5) + max_col2)
-                                self.add_char(e2, (max_row2*5) + max_col1)
-                                self.txt_idx += 2
-                                return SUCCESS
-        if len(avbl_chars) == 3:
-            if e1 not in avbl_chars:
-                row_used = self.used[e1] // 5
-                col_used = self.used[e1] % 5
-                if self.avbl_row[row_used]==0 or self.avbl_col[col_used]==0:
-                    return FAILURE
-                max_row1 = row_used
-                max_col2 = col_used
-                for i in range(len(rows)-1):
-                    max_row2 = rows[-1-i][0]
-                    if max_row2 != max_row1:
-                        for k in range(len(cols)-1):
-                            max_col1 = cols[-1-k][0]
-                            if max_col2 != max_col1:
-                                we_good = (max_row1 * 5) + max_col1 in self.avbl
-                                # we_good &= (max_row1 * 5) + max_col2 in self.avbl
-                                we_good &= (max_row2 * 5) + max_col1 in self.avbl
-                                we_good &= (max_row2 * 5) + max_col2 in self.avbl
-                                if we_good:
-                                    self.add_char(d1, (max_row1*5) + max_col1)
-                                    # self.add_char(e1, (max_row1*5) + max_col2)
-                                    self.add_char(d2, (max_row2*5) + max_col2)
-                                    self.add_char(e2, (max_row2*5) + max_col1)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-            if e2 not in avbl_chars:
-                row_used = self.used[e2] // 5
-                col_used = self.used[e2] % 5
-                if self.avbl_row[row_used]==0 or self.avbl_col[col_used]==0:
-                    return FAILURE
-                max_row2 = row_used
-                max_col1 = col_used
-                for i in range(len(rows)-1):
-                    max_row1 = rows[-1-i][0]
-                    if max_row2 != max_row1:
-                        for k in range(len(cols)-1):
-                            max_col2 = cols[-1-k][0]
-                            if max_col2 != max_col1:
-                                we_good = (max_row1 * 5) + max_col1 in self.avbl
-                                we_good &= (max_row1 * 5) + max_col2 in self.avbl
-                                # we_good &= (max_row2 * 5) + max_col1 in self.avbl
-                                we_good &= (max_row2 * 5) + max_col2 in self.avbl
-                                if we_good:
-                                    self.add_char(d1, (max_row1*5) + max_col1)
-                                    self.add_char(e1, (max_row1*5) + max_col2)
-                                    self.add_char(d2, (max_row2*5) + max_col2)
-                                    # self.add_char(e2, (max_row2*5) + max_col1)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-            if d1 not in avbl_chars:
-                row_used = self.used[d1] // 5
-                col_used = self.used[d1] % 5
-                if self.avbl_row[row_used]==0 or self.avbl_col[col_used]==0:
-                    return FAILURE
-                max_row1 = row_used
-                max_col1 = col_used
-                for i in range(len(rows)-1):
-                    max_row2 = rows[-1-i][0]
-                    if max_row2 != max_row1:
-                        for k in range(len(cols)-1):
-                            max_col2 = cols[-1-k][0]
-                            if max_col2 != max_col1:
-                                # we_good = (max_row1 * 5) + max_col1 in self.avbl
-                                we_good = (max_row1 * 5) + max_col2 in self.avbl
-                                we_good &= (max_row2 * 5) + max_col1 in self.avbl
-                                we_good &= (max_row2 * 5) + max_col2 in self.avbl
-                                if we_good:
-                                    # self.add_char(d1, (max_row1*5) + max_col1)
-                                    self.add_char(e1, (max_row1*5) + max_col2)
-                                    self.add_char(d2, (max_row2*5) + max_col2)
-                                    self.add_char(e2, (max_row2*5) + max_col1)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-            if d2 not in avbl_chars:
-                row_used = self.used[d2] // 5
-                col_used = self.used[d2] % 5
-                if self.avbl_row[row_used]==0 or self.avbl_col[col_used]==0:
-                    return FAILURE
-                max_row2 = row_used
-                max_col2 = col_used
-                for i in range(len(rows)-1):
-                    max_row1 = rows[-1-i][0]
-                    if max_row2 != max_row1:
-                        for k in range(len(cols)-1):
-                            max_col1 = cols[-1-k][0]
-                            if max_col2 != max_col1:
-                                we_good = (max_row1 * 5) + max_col1 in self.avbl
-                                we_good &= (max_row1 * 5) + max_col2 in self.avbl
-                                we_good &= (max_row2 * 5) + max_col1 in self.avbl
-                                # we_good &= (max_row2 * 5) + max_col2 in self.avbl
-                                if we_good:
-                                    self.add_char(d1, (max_row1*5) + max_col1)
-                                    self.add_char(e1, (max_row1*5) + max_col2)
-                                    # self.add_char(d2, (max_row2*5) + max_col2)
-                                    self.add_char(e2, (max_row2*5) + max_col1)
-                                    self.txt_idx += 2
-                                    return SUCCESS
-        if len(avbl_chars) == 2:
-            if e1 not in avbl_chars and e2 not in avbl_chars:
-                row_used1 = self.used[e1] // 5
-                col_used1 = self.used[e1] % 5
-                row_used2 = self.used[e2] // 5
-                col_used2 = self.used[e2] % 5
-                if self.avbl_row[row_used1]==0 or self.avbl_col[col_used1]==0:
-                    return FAILURE
-                if self.avbl_row[row_used2]==0 or self.avbl_col[col_used2]==0:
-                    return FAILURE
-                if col_used1 == col_used2:
-                    return FAILURE
-                if row_used1 == row_used2:
-                    return FAILURE
-                max_row1 = row_used1
-                max_col2 = col_used1
-                max_row2 = row_used2
-                max_col1 = col_used2
-                we_good = (max_row1 * 5) + max_col1 in self.avbl
-                # we_good &= (max_row1 * 5) + max_col2 in self.avbl
-                # we_good &= (max_row2 * 5) + max_col1 in self.avbl
-                we_good &= (max_row2 * 5) + max_col2 in self.avbl
-                if we_good:
-                    self.add_char(d1, (max_row1*5) + max_col1)
-                    # self.add_char(e1, (max_row1*5) + max_col2)
-                    self.add_char(d2, (max_row2*5) + max_col2)
-                    # self.add_char(e2, (max_row2*5) + max_col1)
-                    self.txt_idx += 2
-                    return SUCCESS
-            if d1 not in avbl_chars and d2 not in avbl_chars:    #  If something breaks retest this/ but I did test it 
-                row_used1 = self.used[d1] // 5
-                col_used1 = self.used[d1] % 5
-                row_used2 = self.used[d2] // 5
-                col_used2 = self.used[d2] % 5
-                if self.avbl_row[row_used1]==0 or self.avbl_col[col_used1]==0:
-                    return FAILURE
-                if self.avbl_row[row_used2]==0 or self.avbl_col[col_used2]==0:
-                    return FAILURE
-                if col_used1 == col_used2: 
-                    return  FAILURE
-                if row_used1 == row_used2:
-                    return FAILURE
-                max_row1 = row_used1
-                max_col2 = col_used1
-                max_row2 = row_used2
-                max_col1 = col_used2
-                we_good = (max_row1 * 5) + max_col1 in self.avbl
-                # we_good &= (max_row1 * 5) + max_col2 in self.avbl
-                # we_good &= (max_row2 * 5) + max_col1 in self.avbl
-                we_good &= (max_row2 * 5) + max_col2 in self.avbl
-                if we_good:
-                    # self.add_char(d1, (max_row1*5) + max_col1)
-                    self.add_char(e1, (max_row1*5) + max_col1)
-                    # self.add_char(d2, (max_row2*5) + max_col2)
-                    self.add_char(e2, (max_row2*5) + max_col2)
-                    self.txt_idx += 2
-                    return SUCCESS
-            if d1 not in avbl_chars and e1 not in avbl_chars:     # both in same row, tested 6/1
-                row_used1 = self.used[d1] // 5
-                col_used1 = self.used[d1] % 5
-                row_used2 = self.used[e1] // 5
-                col_used2 = self.used[e1] % 5
-                if self.avbl_row[row_used1]==0 or self.avbl_col[col_used1]==0:
-                    return FAILURE
-                if self.avbl_row[row_used2]==0 or self.avbl_col[col_used2]==0:
-                    return FAILURE
-                if col_used1 == col_used2:
-                    return FAILURE
-                if row_used1 == row_used2:
-                    max_row1 = row_used1
-                    max_col1 = col_used1  # d1
-                    max_col2 = col_used2  # e1
-                    for i in range(len(rows)-1):
-                        max_row2 = rows[-1-i][0]
-                        we_good = (max_row2 * 5) + max_col1 in self.avbl
-                        we_good &= (max_row2 * 5) + max_col2 in self.avbl
-                        if we_good:
-                            # self.add_char(d1, (max_row1*5) + max_col1)
-                            self.add_char(d2, (max_row2*5) + max_col2)
-                            # self.add_char(d2, (max_row2*5) + max_col2)
-                            self.add_char(e2, (max_row2*5) + max_col1)
-                            self.txt_idx += 2
-                            return SUCCESS
-            if d2 not in avbl_chars and e2 not in avbl_chars:     # both in same row, tested!
-                row_used1 = self.used[d2] // 5
-                col_used1 = self.used[d2] % 5
-                row_used2 = self.used[e2] // 5
-                col_used2 = self.used[e2] % 5
-                if self.avbl_row[row_used1]==0 or self.avbl_col[col_used1]==0:
-                    return FAILURE
-                if self.avbl_row[row_used2]==0 or self.avbl_col[col_used2]==0:
-                    return FAILURE
-                if col_used1 == col_used2:
-                    return FAILURE
-                if row_used1 == row_used2:
-                    max_row1 = row_used1
-                    max_col1 = col_used1  # d2
-                    max_col2 = col_used2  # e2
-                    for i in range(len(rows)-1):
-                        max_row2 = rows[-1-i][0]
-                        we_good = (max_row2 * 5) + max_col1 in self.avbl
-                        we_good &= (max_row2 * 5) + max_col2 in self.avbl
-                        if we_good:
-                            # self.add_char(d1, (max_row1*5) + max_col1)
-                            self.add_char(d1, (max_row2*5) + max_col2)
-                            # self.add_char(d2, (max_row2*5) + max_col2)
-                            self.add_char(e1, (max_row2*5) + max_col1)
-                            self.txt_idx += 2
-                            return SUCCESS
-            if d1 not in avbl_chars and e2 not in avbl_chars:  # both in same column, tested 6/1, feel pretty good about this one
-                row_used1 = self.used[d1] // 5
-                col_used1 = self.used[d1] % 5
-                row_used2 = self.used[e2] // 5
-                col_used2 = self.used[e2] % 5
-                if self.avbl_row[row_used1]==0 or self.avbl_col[col_used1]==0:
-                    return FAILURE
-                if self.avbl_row[row_used2]==0 or self.avbl_col[col_used2]==0:
-                    return FAILURE
-                if row_used1 == row_used2:  #  is this necessary? Possible Optimaztion.
-                    return FAILURE
-                if col_used1 == col_used2:                   
-                    max_col1 = col_used1
-                    max_row1 = row_used1  # d1
-                    max_row2 = row_used2  # e2
-                    for i in range(len(cols)-1):
-                        max_col2 = cols[-1-i][0]
-                        we_good = (max_row1 * 5) + max_col2 in self.avbl
-                        we_good &= (max_row2 * 5) + max_col2 in self.avbl
-                        if we_good:
-                            # self.add_char(d1, (max_row1*5) + max_col1)
-                            self.add_char(e1, (max_row1*5) + max_col2)
-                            # self.add_char(d2, (max_row2*5) + max_col2)
-                            self.add_char(d2, (max_row2*5) + max_col2)
-                            self.txt_idx += 2
-                            return SUCCESS
-            if d2 not in avbl_chars and e1 not in avbl_chars:  # both in same column, tested 6/1, feel pretty good about this one
-                row_used1 = self.used[d2] // 5
-                col_used1 = self.used[d2] % 5
-                row_used2 = self.used[e1] // 5
-                col_used2 = self.used[e1] % 5
-                if self.avbl_row[row_used1]==0 or self.avbl_col[col_used1]==0:
-                    return FAILURE
-                if self.avbl_row[row_used2]==0 or self.avbl_col[col_used2]==0:
-                    return FAILURE
-                if row_used1 == row_used2:  #  is this necessary? Possible Optimaztion.
-                    return FAILURE
-                if col_used1 == col_used2:                   
-                    max_col1 = col_used1
-                    max_row1 = row_used1  # d2
-                    max_row2 = row_used2  # e1
-                    for i in range(len(cols)-1):
-                        max_col2 = cols[-1-i][0]
-                        we_good = (max_row1 * 5) + max_col2 in self.avbl
-                        we_good &= (max_row2 * 5) + max_col2 in self.avbl
-                        if we_good:
-                            # self.add_char(d1, (max_row1*5) + max_col1)
-                            self.add_char(e2, (max_row1*5) + max_col2)
-                            # self.add_char(d2, (max_row2*5) + max_col2)
-                            self.add_char(d1, (max_row2*5) + max_col2)
-                            self.txt_idx += 2
-                            return SUCCESS
-        if len(avbl_chars) == 1:
-            if e1 not in avbl_chars and e2 not in avbl_chars and d1 not in avbl_chars:  # d2 is missing
-                row_used1 = self.used[e2] // 5
-                col_used1 = self.used[e1] % 5 
-                we_good = (row_used1 * 5) + col_used1 in self.avbl
-                if we_good:
-                    self.add_char(d2, (row_used1 * 5) + col_used1)
-                    self.txt_idx += 2
-                    return SUCCESS
-            if e1 not in avbl_chars and e2 not in avbl_chars and d2 not in avbl_chars:  # d1 is missing
-                row_used1 = self.used[e1] // 5
-                col_used1 = self.used[e2] % 5 
-                we_good = (row_used1 * 5) + col_used1 in self.avbl
-                if we_good:
-                    self.add_char(d1, (row_used1 * 5) + col_used1)
-                    self.txt_idx += 2
-                    return SUCCESS
-            if e1 not in avbl_chars and d1 not in avbl_chars and d2 not in avbl_chars:  # e2 is missing
-                row_used1 = self.used[d2] // 5
-                col_used1 = self.used[d1] % 5 
-                we_good = (row_used1 * 5) + col_used1 in self.avbl
-                if we_good:
-                    self.add_char(e2, (row_used1 * 5) + col_used1)
-                    self.txt_idx += 2
+        ltrs = self._letters()
+        num_avbl = len(self.unplaced(*ltrs))
+        pos = self.pos
+
+        if num_avbl == 4:
+            # in the first rows, then columns, with the most free spots
+            col_pairs = SQUARE_PAIRS[self.col_code]
+            for rows in SQUARE_PAIRS[self.row_code]:
+                free = ~(self.row_taken[rows[0]] | self.row_taken[rows[1]])
+                for cols in col_pairs:
+                    if free >> cols[0] & free >> cols[1] & 1:
+                        return self._fill_square(ltrs, rows, cols)
+            return FAILURE
+
+        placed = [divmod(pos[ltr], 5) if pos[ltr] != UNUSED else None
+                  for ltr in ltrs]
+
+        if num_avbl == 3:
+            # the placed letter fixes a corner, the others go on the first
+            #   other row, then column, with the most free spots they fit in
+            for slot in (E1, E2, D1, D2):
+                if placed[slot] is None:
+                    continue
+                row, col = placed[slot]
+                if not self.avbl_row[row] or not self.avbl_col[col]:
+                    return FAILURE
+                for other_row in SQUARE_LINES[self.row_code]:
+                    if other_row == row:
+                        continue
+                    for other_col in SQUARE_LINES[self.col_code]:
+                        if (other_col != col and self._free(row, other_col)
+                                and self._free(other_row, col)
+                                and self._free(other_row, other_col)):
+                            rows = [other_row] * 2
+                            rows[SLOT_ROW[slot]] = row
+                            cols = [other_col] * 2
+                            cols[SLOT_COL[slot]] = col
+                            return self._fill_square(ltrs, rows, cols)
+                break
+            return FAILURE
+
+        if num_avbl == 2:
+            # two placed letters on opposite corners fix the rectangle, on the
+            #   same row (column) they fix the columns (rows) and the other
+            #   row (column) is the first one they fit in
+            for first, second in ((E1, E2), (D1, D2), (D1, E1), (D2, E2),
+                                  (D1, E2), (D2, E1)):
+                if placed[first] is None or placed[second] is None:
+                    continue
+                (row1, col1), (row2, col2) = placed[first], placed[second]
+                if not self.avbl_row[row1] or not self.avbl_col[col1]:
+                    return FAILURE
+                if not self.avbl_row[row2] or not self.avbl_col[col2]:
+                    return FAILURE
+                same_row = SLOT_ROW[first] == SLOT_ROW[second]
+                same_col = SLOT_COL[first] == SLOT_COL[second]
+                if (col1 == col2 and not same_col
+                        or row1 == row2 and not same_row):
+                    return FAILURE
+                rows, cols = [None] * 2, [None] * 2
+                rows[SLOT_ROW[first]], cols[SLOT_COL[first]] = row1, col1
+                rows[SLOT_ROW[second]], cols[SLOT_COL[second]] = row2, col2
+                if same_row:
+                    if row1 == row2:
+                        for other in SQUARE_LINES[self.row_code]:
+                            if self._free(other, col1) and self._free(other,
+                                                                      col2):
+                                rows[1 - SLOT_ROW[first]] = other
+                                return self._fill_square(ltrs, rows, cols)
+                elif same_col:
+                    if col1 == col2:
+                        for other in SQUARE_LINES[self.col_code]:
+                            if self._free(row1, other) and self._free(row2,
+                                                                      other):
+                                cols[1 - SLOT_COL[first]] = other
+                                return self._fill_square(ltrs, rows, cols)
+                elif all(self._free(rows[SLOT_ROW[slot]], cols[SLOT_COL[slot]])
+                         for slot in range(4) if placed[slot] is None):
+                    return self._fill_square(ltrs, rows, cols)
+            return FAILURE
+
+        if num_avbl == 1:
+            # the missing corner is on the row of one placed letter and the
+            #   column of another
+            missing = [slot for slot in range(4) if placed[slot] is None]
+            if len(missing) == 1:
+                slot = missing[0]
+                row = placed[ROW_MATE[slot]][0]
+                col = placed[COL_MATE[slot]][1]
+                if self._free(row, col):
+                    self.place(ltrs[slot], row * 5 + col)
+                    self._advance()
                     return SUCCESS
-            if e2 not in avbl_chars and d1 not in avbl_chars and d2 not in avbl_chars:  # e1 is missing
-                row_used1 = self.used[d1] // 5
-                col_used1 = self.used[d2] % 5 
-                we_good = (row_used1 * 5) + col_used1 in self.avbl
-                if we_good:
-                    self.add_char(e1, (row_used1 * 5) + col_used1)
-                    self.txt_idx += 2
-                    return SUCCESS  
+        return FAILURE
 
     def make_action(self, act_vec):
         """
@@ -1440,13 +810,11 @@ class KeyState:
             The next state, the reward for the action, and a boolean true if a
                 terminal state has been reached
         """
-        action = {
-            str(KeyState.ACT_ROW): KeyState.action_row,
-            str(KeyState.ACT_COL): KeyState.action_column,
-            str(KeyState.ACT_SQR): KeyState.action_square
-        }
-        if action[str(act_vec)](self):
+        if KeyState.ACTIONS[int(act_vec)](self):
             if self.txt_idx == SUBSET_SZ:
                 return self.get_state(), GOOD_REWARD, True
             return self.get_state(), LIVING_REWARD, False
         return self.get_state(), BAD_REWARD, True
+
+    # ACTIONS: the action method of each vector representation
+    ACTIONS = (action_row, action_column, action_square)
@@ -0,0 +1,156 @@
+"""Prepares training episodes on a background thread
+
+The training loop only has to take ready episodes off a bounded queue while
+the next ones are read and turned into KeyStates in the background. The time
+spent preparing episodes and the time the training loop spent waiting for
+them are recorded, so the overlap gained can be measured.
+"""
+import queue
+import random
+import threading
+import time
+import numpy as np
+import keyenv
+
+# DEPTH: default number of episodes prepared ahead
+DEPTH = 4
+
+# _DONE: queued after the last item of a finite source
+_DONE = object()
+
+
+class Prefetcher:
+    """
+    Iterator that reads the items of another iterator ahead of time on a
+        background thread
+
+    Attributes:
+        depth: maximum number of items prepared ahead
+        produced: number of items prepared
+        work_time: seconds the background thread spent preparing items
+        wait_time: seconds callers spent waiting for an item
+    """
+
+    def __init__(self, source, depth=DEPTH, transform=None):
+        """
+        Arguments:
+            source: iterable of items
+            depth: maximum number of items prepared ahead
+            transform: function applied to each item on the background thread
+        """
+        self.depth = depth
+        self.produced = 0
+        self.work_time = 0.0
+        self.wait_time = 0.0
+        self._source = iter(source)
+        self._transform = transform
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _fill(self):
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(self._source)
+                except StopIteration:
+                    break
+                if self._transform is not None:
+                    item = self._transform(item)
+                self.work_time += time.perf_counter() - start
+                self.produced += 1
+                self._put(item)
+        except Exception as err:  # re-raised in the caller's thread
+            self._error = err
+        self._put(_DONE)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._stop.is_set():
+            raise StopIteration
+        start = time.perf_counter()
+        item = self._queue.get()
+        self.wait_time += time.perf_counter() - start
+        if item is _DONE:
+            self._queue.put(_DONE)
+            if self._error is not None:
+                raise self._error
+            raise StopIteration
+        return item
+
+    def close(self):
+        """
+        Stops the background thread and waits for it to finish, next raises
+            StopIteration from then on
+        """
+        self._stop.set()
+        self._thread.join()
+        # wakes a caller of next already waiting on the empty queue
+        try:
+            self._queue.put_nowait(_DONE)
+        except queue.Full:
+            pass
+
+    def stats(self):
+        """
+        Returns a dictionary of the number of items prepared, the time spent
+            preparing them and waiting for them, and the overlap: the
+            fraction of the preparation time that was hidden from the caller
+        """
+        overlap = 0.0
+        if self.work_time:
+            overlap = max(0.0, 1 - self.wait_time / self.work_time)
+        return {
+            'produced': self.produced,
+            'work_time': self.work_time,
+            'wait_time': self.wait_time,
+            'overlap': overlap,
+        }
+
+
+class EpisodeLoader(Prefetcher):
+    """
+    Prefetcher turning (deciphered text, enciphered text, key) episodes into
+        ready to use (KeyState, initial state) pairs, where the state is
+        already shaped (1, input_dim) for the network
+
+    Attributes:
+        seed: master seed of the rngs of the KeyStates, the rng of episode
+            number idx is keyenv.episode_rng(seed, idx)
+    """
+
+    def __init__(self, source, input_dim, depth=DEPTH, seed=None):
+        """
+        Arguments:
+            source: iterable of (deciphered text, enciphered text, key)
+                episodes
+            input_dim: size of the states
+            depth: maximum number of episodes prepared ahead
+            seed: master seed of the rngs of the KeyStates, by default bits
+                of the random module drawn here, on the caller's thread
+        """
+        self.input_dim = input_dim
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self._prepared = 0
+        super().__init__(source, depth, self.prepare)
+
+    def prepare(self, episode):
+        """Builds the KeyState of an episode and its first state"""
+        ken = keyenv.KeyState(episode[0], episode[1],
+                              keyenv.episode_rng(self.seed, self._prepared))
+        self._prepared += 1
+        state = np.reshape(ken.get_state(), (1, self.input_dim)).copy()
+        return ken, state
@@ -1,9 +1,12 @@
 """Contains code to build the learning system"""
-import training_data as td
+import itertools
 import numpy as np
-import pickle
 import agent
-import keyenv
+import cache
+import episodes
+import loader
+import sharding
+import vecenv
 
 
 # =========================== READ IN TRAING DATA ============================
@@ -12,23 +15,17 @@ DATA_FILE = 'data/melville-moby_dick.txt'
 # Size of each chunk of training data, must be even
 SUBSET_SZ = 100
 
-# TRAINING: list of size SUBSET_SZ of tuples of deciphered text, enciphered
-#   text, and cipher keys in that order
-TRAINING = []
+# SEED: seed of the keys of the training data
+SEED = 0
 
-# SERIALIZE_NAME: serialized training data
-SERIALIZE_NAME = 'data/training.pickle'
+# SAMPLE_EPISODES: if True, episodes are random slices of DATA_FILE enciphered
+#   with fresh keys on demand instead of the items of the training data, so
+#   the number of episodes is not limited by the size of the training data
+SAMPLE_EPISODES = False
 
-# If serialized file exists, use that, otherwise read in the training data
-#   from the DATA_FILE and serialize the result
-try:
-    with open(SERIALIZE_NAME, 'rb') as inf:
-        TRAINING = pickle.load(inf)
-except IOError:
-    TRAINING = td.generate_data(DATA_FILE, SUBSET_SZ)
-    with open(SERIALIZE_NAME, 'wb') as outf:
-        pickle.dump(TRAINING, outf)
-        outf.close()
+# PREFETCH: number of episodes prepared ahead of the training loop on a
+#   background thread
+PREFETCH = 4
 
 # =========================== TRAIN OUR SYSTEM ================================
 # EPISODES: The number of times we train the agent
@@ -45,34 +42,121 @@ OUTPUT_DIM = 3
 # BATCH_SIZE: The number size of memory looked at during training
 BATCH_SIZE = 32
 
-# AGENT: The agent taking actions to build a key
-AGENT = agent.OurAgent(INPUT_DIM, OUTPUT_DIM)
-
-# DONE: Boolean indiating if our agent reached a terminal state
-DONE = False
-sum = 0
-for idx in range(EPISODES):
-    # ken: Key environment, i.e. the current state of the key being built
-    ken = keyenv.KeyState(TRAINING[idx][0], TRAINING[idx][1])
-    # ken = keyenv.KeyState(TRAINING[0][0], TRAINING[0][1])
-    # state: array represntation of the current in progress key, cipher text, and decipher text
-    state = np.reshape(ken.get_state(), (1, INPUT_DIM))
-    while ken.txt_idx < SUBSET_SZ:
-        action = AGENT.act(state)
-        next_state, reward, done = ken.make_action(action)
-        next_state = np.reshape(next_state, (1, INPUT_DIM))
-        AGENT.store_state(state, action, reward, next_state, done)
-        state = next_state
-        if done:
-            sum += len(ken.used)
-            AGENT.target_nnet.model.set_weights(AGENT.nnet.model.get_weights())
-            
-                
-                
-            # print("Key:")
-            # ken.print_key()
-            # print("episode {} \n Key:\n{}".format(idx, ken.get_key()))
-            break
-        if len(AGENT.memory) > BATCH_SIZE:
-            AGENT.train(BATCH_SIZE)
-print("Average = " + str(sum/EPISODES))
+# NUM_ENVS: number of episodes evaluate runs side by side, the actions of all
+#   of them are predicted with one network call
+NUM_ENVS = 32
+
+
+def episode_source(data_file=DATA_FILE, subset_sz=SUBSET_SZ, seed=SEED,
+                   sample=SAMPLE_EPISODES, start=0, shard=None):
+    """
+    Returns an iterator over (deciphered text, enciphered text, key) episodes
+
+    Arguments:
+        data_file: string path to the corpus
+        subset_sz: size of each chunk of text, must be even
+        seed: seed of the keys
+        sample: if True episodes are random slices of the corpus enciphered
+            with fresh keys, otherwise the items of the training data, which
+            is generated from data_file, or reused from the cache if it was
+            already generated with the same corpus contents, subset_sz and seed
+        start: index of the first item of the training data used
+        shard: tuple of (node, nodes, worker, workers, shuffle seed) of this
+            process when several processes train on the same data, each then
+            gets its own share of the training data (see sharding.py), epoch
+            after epoch, or its own stream of sampled episodes
+    """
+    if sample:
+        if shard is not None:
+            node, _, worker, workers = shard[:4]
+            seed = '{}:{}'.format(seed, node * workers + worker)
+        return episodes.EpisodeSampler(
+            episodes.corpus_array(data_file), subset_sz, seed, prefetch=0)
+    training = cache.get_dataset(data_file, subset_sz, seed)
+    if shard is not None:
+        node, nodes, worker, workers, shuffle_seed = shard
+        plan = sharding.ShardPlan(len(training), nodes, workers, shuffle_seed)
+        return plan.episodes(training, node, worker)
+    return (training[idx] for idx in range(start, len(training)))
+
+
+def train(source, num_episodes=EPISODES, subset_sz=SUBSET_SZ,
+          batch_size=BATCH_SIZE, prefetch=PREFETCH):
+    """
+    Trains an agent
+
+    Arguments:
+        source: iterator over (deciphered text, enciphered text, key) episodes
+        num_episodes: the number of episodes the agent is trained on
+        subset_sz: number of characters of each episode
+        batch_size: the number size of memory looked at during training
+        prefetch: number of episodes prepared ahead on a background thread
+    Returns:
+        Tuple of the trained agent, the average number of letters placed per
+        episode, and the episode loading stats (see loader.Prefetcher.stats)
+    """
+    # our_agent: The agent taking actions to build a key
+    our_agent = agent.OurAgent(INPUT_DIM, OUTPUT_DIM)
+    # episode_loader: prepares the KeyState and first state of upcoming
+    #   episodes while the agent trains
+    episode_loader = loader.EpisodeLoader(source, INPUT_DIM, prefetch)
+
+    placed = 0
+    for _ in range(num_episodes):
+        # ken: Key environment, i.e. the current state of the key being built
+        # state: array represntation of the current in progress key, cipher text, and decipher text
+        ken, state = next(episode_loader)
+        while ken.txt_idx < subset_sz:
+            action = our_agent.act(state)
+            next_state, reward, done = ken.make_action(action)
+            # next_state is a view of the state ken keeps updating, the
+            #   memory needs its own copy
+            next_state = np.reshape(next_state, (1, INPUT_DIM)).copy()
+            our_agent.store_state(state, action, reward, next_state, done)
+            state = next_state
+            if done:
+                placed += ken.num_used
+                our_agent.target_nnet.model.set_weights(
+                    our_agent.nnet.model.get_weights())
+                # print("Key:")
+                # ken.print_key()
+                # print("episode {} \n Key:\n{}".format(idx, ken.get_key()))
+                break
+            if len(our_agent.memory) > batch_size:
+                our_agent.train(batch_size)
+    episode_loader.close()
+    return our_agent, placed / num_episodes, episode_loader.stats()
+
+
+def evaluate(our_agent, source, num_episodes, subset_sz=SUBSET_SZ,
+             num_envs=NUM_ENVS):
+    """
+    Runs a trained agent greedily (no exploration, no training) on
+        num_episodes episodes, num_envs of them at a time
+
+    Returns:
+        The average number of letters placed per episode, raises a ValueError
+        if source has no episodes
+    """
+    epsilon, our_agent.epsilon = our_agent.epsilon, 0
+    episode_loader = loader.Prefetcher(itertools.islice(source, num_episodes))
+    envs = vecenv.VecKeyEnv(episode_loader, num_envs, subset_sz)
+    states = envs.states.copy()
+    actions = np.zeros(num_envs, dtype=np.int64)
+    active = envs.active
+    while active.any():
+        actions[active] = our_agent.act_batch(states[active])
+        states, _, _ = envs.step(actions)
+        active = envs.active
+    episode_loader.close()
+    our_agent.epsilon = epsilon
+    if not envs.finished:
+        raise ValueError("no episodes to evaluate")
+    return envs.placed / envs.finished
+
+
+if __name__ == '__main__':
+    _, AVERAGE, STATS = train(episode_source())
+    print("Average = " + str(AVERAGE))
+    print("Episode loading: {work_time:.2f}s, waited {wait_time:.2f}s "
+          "({overlap:.0%} overlapped)".format(**STATS))
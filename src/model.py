@@ -1,5 +1,3 @@
-import tensorflow as tf
-from tensorflow import keras
 from keras.models import Sequential, load_model, Model
 from keras.layers import Input, Dense, Conv2D, Flatten, BatchNormalization, Activation, LeakyReLU, add
 from keras.optimizers import Adam
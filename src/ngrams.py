@@ -0,0 +1,114 @@
+"""Letter n-gram statistics of the training corpus
+
+The bigram, trigram and quadgram log10 probabilities are built once from the
+corpus and saved as .npy files, which are then opened as memory maps. Build
+with:
+    python3 src/ngrams.py [corpus] [output directory]
+"""
+import os
+import sys
+import numpy as np
+import cipher
+import stream
+
+# DATA_FILE: default corpus the statistics are taken from
+DATA_FILE = 'data/melville-moby_dick.txt'
+
+# NGRAM_DIR: default directory the tables are saved in
+NGRAM_DIR = 'data/ngrams'
+
+# NAMES: file name of the table of each n-gram size
+NAMES = {2: 'bigrams.npy', 3: 'trigrams.npy', 4: 'quadgrams.npy'}
+
+# FLOOR_COUNT: count given to n-grams never seen in the corpus
+FLOOR_COUNT = 0.01
+
+
+def ngram_index(ltrs, size):
+    """
+    Returns the flat table index of every n-gram of length size in ltrs, an
+        array of letter numbers (0-25) along the last axis
+    """
+    ltrs = np.asarray(ltrs, dtype=np.intp)
+    length = ltrs.shape[-1] - size + 1
+    index = np.zeros(ltrs.shape[:-1] + (max(length, 0),), dtype=np.intp)
+    for offset in range(size):
+        index = index * 26 + ltrs[..., offset:offset + length]
+    return index
+
+
+def build(corpus=DATA_FILE, ngram_dir=NGRAM_DIR, block_sz=stream.BLOCK_SZ):
+    """
+    Counts the n-grams of the corpus a block at a time and saves their log10
+        probabilities, one (26,) * n float32 array per n-gram size
+
+    Arguments:
+        corpus: string path to a text file, normalized like generate_data
+            (lower cased letters only)
+        ngram_dir: directory the tables are saved in
+        block_sz: number of bytes read at a time
+    """
+    counts = {size: np.zeros(26 ** size, dtype=np.int64) for size in NAMES}
+    # tails: the last size - 1 letters read for each n-gram size, so n-grams
+    #   spanning two blocks are counted
+    tails = {size: np.zeros(0, dtype=np.intp) for size in NAMES}
+    with open(corpus, 'rb') as inf:
+        blocks = stream.normalize_blocks(stream.read_blocks(inf, block_sz),
+                                         fold_j=False)
+        for block in blocks:
+            block = np.frombuffer(block.encode('ascii'), dtype=np.uint8)
+            block = block.astype(np.intp) - cipher.ORD_A
+            for size in NAMES:
+                ltrs = np.concatenate([tails[size], block])
+                counts[size] += np.bincount(ngram_index(ltrs, size),
+                                            minlength=26 ** size)
+                tails[size] = ltrs[len(ltrs) - min(len(ltrs), size - 1):]
+    os.makedirs(ngram_dir, exist_ok=True)
+    for size, name in NAMES.items():
+        freq = counts[size].astype(np.float64)
+        freq[freq == 0] = FLOOR_COUNT
+        table = np.log10(freq / freq.sum()).astype(np.float32)
+        np.save(os.path.join(ngram_dir, name), table.reshape((26,) * size))
+
+
+def load(size, ngram_dir=NGRAM_DIR):
+    """
+    Opens a saved table as a read only memory map
+
+    Arguments:
+        size: 2, 3 or 4
+        ngram_dir: directory the tables were saved in
+    Returns:
+        (26,) * size array of log10 probabilities
+    """
+    return np.load(os.path.join(ngram_dir, NAMES[size]), mmap_mode='r')
+
+
+def load_or_build(size, ngram_dir=NGRAM_DIR, corpus=DATA_FILE):
+    """Loads a table, building every table from corpus first if needed"""
+    if not os.path.exists(os.path.join(ngram_dir, NAMES[size])):
+        build(corpus, ngram_dir)
+    return load(size, ngram_dir)
+
+
+def score(texts, table):
+    """
+    Scores many texts at once
+
+    Arguments:
+        texts: N x L uint8 array of ascii codes (see cipher.text_array), or a
+            list of N strings of the same length
+        table: table returned by load
+    Returns:
+        Array of N sums of the log10 probabilities of every n-gram of each
+        text
+    """
+    if not isinstance(texts, np.ndarray):
+        texts = cipher.text_array(texts)
+    ltrs = np.asarray(texts, dtype=np.intp) - cipher.ORD_A
+    index = ngram_index(ltrs, table.ndim)
+    return table.reshape(-1)[index].sum(axis=-1, dtype=np.float64)
+
+
+if __name__ == '__main__':
+    build(*sys.argv[1:3])
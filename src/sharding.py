@@ -0,0 +1,90 @@
+"""Splits the episodes of a dataset between training processes
+
+Every training process is identified by its node (machine) and its worker
+number on that node. In each epoch the episodes are put in an order that only
+depends on the seed and the epoch, and that order is cut into one contiguous
+slice per process. Every process computes the same order on its own, so the
+processes need no coordination, and in every epoch each episode is given to
+exactly one process. The order shuffles blocks of consecutive episodes rather
+than single ones, so each process still reads the memory mapped dataset in
+runs of neighbouring episodes.
+"""
+import numpy as np
+
+# BLOCK_SZ: default number of consecutive episodes kept together when
+#   shuffling
+BLOCK_SZ = 64
+
+
+def split(size, parts, part):
+    """
+    Returns the (start, stop) range of part number part when size items are
+        cut into parts contiguous ranges, whose sizes differ by at most one
+    """
+    if not 0 <= part < parts:
+        raise ValueError("part must be in range(parts)")
+    base, extra = divmod(size, parts)
+    start = part * base + min(part, extra)
+    return start, start + base + (part < extra)
+
+
+class ShardPlan:
+    """
+    Assignment of the episodes of a dataset to (node, worker) pairs
+
+    Attributes:
+        size: number of episodes in the dataset
+        nodes: number of machines
+        workers: number of training processes on each machine
+        seed: seed of the epoch orders, None keeps the dataset order in every
+            epoch
+        block_sz: number of consecutive episodes kept together when shuffling
+    """
+
+    def __init__(self, size, nodes=1, workers=1, seed=None,
+                 block_sz=BLOCK_SZ):
+        if nodes < 1 or workers < 1:
+            raise ValueError("nodes and workers must be positive")
+        if size < nodes * workers:
+            raise ValueError("fewer episodes than training processes")
+        self.size = size
+        self.nodes = nodes
+        self.workers = workers
+        self.seed = seed
+        self.block_sz = block_sz
+
+    def __len__(self):
+        """Number of training processes"""
+        return self.nodes * self.workers
+
+    def rank(self, node, worker):
+        """Returns the number of the process of a worker on a node"""
+        if not (0 <= node < self.nodes and 0 <= worker < self.workers):
+            raise ValueError("no worker {} on node {}".format(worker, node))
+        return node * self.workers + worker
+
+    def order(self, epoch):
+        """Returns the array of every episode index in the order of an epoch"""
+        if self.seed is None:
+            return np.arange(self.size)
+        rng = np.random.default_rng([self.seed, epoch])
+        blocks = rng.permutation(-(-self.size // self.block_sz))
+        order = (blocks[:, None] * self.block_sz
+                 + np.arange(self.block_sz)).ravel()
+        return order[order < self.size]
+
+    def indices(self, node, worker, epoch=0):
+        """Returns the array of the episode indices of a worker in an epoch"""
+        start, stop = split(self.size, len(self), self.rank(node, worker))
+        return self.order(epoch)[start:stop]
+
+    def episodes(self, data, node, worker, epoch=0):
+        """
+        Yields the episodes of a worker from data (a dataset.Dataset or
+            anything indexed the same way), epoch after epoch without end,
+            starting at epoch
+        """
+        while True:
+            for idx in self.indices(node, worker, epoch):
+                yield data[int(idx)]
+            epoch += 1
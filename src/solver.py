@@ -0,0 +1,291 @@
+"""Known plain text key recovery for Playfair ciphers
+
+Recovers the key used to encipher a deciphered text / enciphered text pair
+(as stored in the training data) with constraint propagation and
+backtracking, no learning involved. Run with:
+    python3 src/solver.py [number of pairs]
+to solve the first pairs of the training data (generated into the dataset
+cache on first use, see cache.py) and report the time per pair.
+"""
+import sys
+import time
+from string import ascii_lowercase
+import cache
+import cipher
+
+# ENC, DEC: cipher.ENC_POS and cipher.DEC_POS as nested lists, so lookups do
+#   not go through numpy
+ENC = cipher.ENC_POS.tolist()
+DEC = cipher.DEC_POS.tolist()
+
+# DATA_FILE, SUBSET_SZ, SEED: corpus, chunk size and key seed of the training
+#   data solved when run directly, the defaults of main.py
+DATA_FILE = 'data/melville-moby_dick.txt'
+SUBSET_SZ = 100
+SEED = 0
+
+# KEY_LETTERS: the 25 letters of a key
+KEY_LETTERS = set(ascii_lowercase) - {'j'}
+
+# MAX_NODES: default cap on the number of search nodes visited per pair
+MAX_NODES = 1000000
+
+# UNUSED: placeholder of letters and positions not placed yet
+UNUSED = -1
+
+
+def digraph_constraints(decp_txt, encp_txt):
+    """
+    Converts a text pair to the set of digraph constraints it implies
+
+    Arguments:
+        decp_txt: deciphered text
+        encp_txt: enciphered text of the same length
+    Returns:
+        List of unique (a, b, c, d) tuples of letter numbers (0-25), where the
+        plain digraph ab is enciphered to cd. 'j' is changed to 'i', and a
+        doubled plain letter is changed to 'x' as encipher_text does
+    """
+    if len(decp_txt) != len(encp_txt) or len(decp_txt) % 2:
+        raise ValueError("texts must have the same even length")
+
+    def letter(char):
+        num = ord(char) - cipher.ORD_A
+        if not 0 <= num < 26:
+            raise ValueError("texts must only contain lowercase letters")
+        return cipher.LTR_I if num == cipher.LTR_J else num
+
+    constraints = []
+    seen = set()
+    for idx in range(0, len(decp_txt), 2):
+        ltr_a = letter(decp_txt[idx])
+        ltr_b = letter(decp_txt[idx + 1])
+        if ltr_a == ltr_b:
+            ltr_b = cipher.LTR_X
+        cons = (ltr_a, ltr_b, letter(encp_txt[idx]), letter(encp_txt[idx + 1]))
+        if cons not in seen:
+            seen.add(cons)
+            constraints.append(cons)
+    return constraints
+
+
+def _row_or_col(idx1, idx2):
+    """True if the key positions share a row or a column"""
+    return idx1 // 5 == idx2 // 5 or idx1 % 5 == idx2 % 5
+
+
+def _can_follow(plain, ciph):
+    """
+    True if the letter at position ciph can be the encipherment of the letter
+        at position plain: same row (row and rectangle rules) or directly
+        below (column rule)
+    """
+    return (plain // 5 == ciph // 5 and plain != ciph) \
+        or ciph == (plain + 5) % 25
+
+
+class Solver:
+    """
+    Backtracking search over letter placements consistent with a set of
+        digraph constraints
+
+    Attributes:
+        constraints: list of (a, b, c, d) letter number tuples
+        by_letter: list of 26 lists of the constraints each letter is part of
+        pos: list of 26 key positions of each letter, UNUSED if not placed
+        at: list of 25 letter numbers at each key position, UNUSED if empty
+        trail: letters in the order they were placed, used to undo
+        nodes: number of search nodes visited
+        max_nodes: the search gives up after this many nodes
+    """
+
+    def __init__(self, constraints, max_nodes=MAX_NODES):
+        self.constraints = constraints
+        self.by_letter = [[] for _ in range(26)]
+        for cons in constraints:
+            for ltr in set(cons):
+                self.by_letter[ltr].append(cons)
+        self.pos = [UNUSED] * 26
+        self.at = [UNUSED] * 25
+        self.trail = []
+        self.nodes = 0
+        self.max_nodes = max_nodes
+
+    def place(self, ltr, idx):
+        """
+        Places a letter and propagates every constraint it takes part in
+
+        Returns:
+            False if this contradicts a constraint, placements made before
+            the contradiction are left on the trail for undo
+        """
+        queue = [(ltr, idx)]
+        pos = self.pos
+        while queue:
+            ltr, idx = queue.pop()
+            if pos[ltr] != UNUSED:
+                if pos[ltr] != idx:
+                    return False
+                continue
+            if self.at[idx] != UNUSED:
+                return False
+            pos[ltr] = idx
+            self.at[idx] = ltr
+            self.trail.append(ltr)
+            for ltr_a, ltr_b, ltr_c, ltr_d in self.by_letter[ltr]:
+                pos_a, pos_b = pos[ltr_a], pos[ltr_b]
+                pos_c, pos_d = pos[ltr_c], pos[ltr_d]
+                if pos_a != UNUSED and pos_b != UNUSED:
+                    out = ENC[pos_a][pos_b]
+                    queue.append((ltr_c, out[0]))
+                    queue.append((ltr_d, out[1]))
+                elif pos_c != UNUSED and pos_d != UNUSED:
+                    out = DEC[pos_c][pos_d]
+                    queue.append((ltr_a, out[0]))
+                    queue.append((ltr_b, out[1]))
+                if pos_a != UNUSED:
+                    if pos_c != UNUSED and not _can_follow(pos_a, pos_c):
+                        return False
+                    if pos_d != UNUSED and not _row_or_col(pos_a, pos_d):
+                        return False
+                if pos_b != UNUSED:
+                    if pos_d != UNUSED and not _can_follow(pos_b, pos_d):
+                        return False
+                    if pos_c != UNUSED and not _row_or_col(pos_b, pos_c):
+                        return False
+        return True
+
+    def undo(self, depth):
+        """Removes placements until only depth placements remain"""
+        while len(self.trail) > depth:
+            ltr = self.trail.pop()
+            self.at[self.pos[ltr]] = UNUSED
+            self.pos[ltr] = UNUSED
+
+    def _branch_letter(self):
+        """
+        Picks the next letter to place: the unplaced partner of a placed
+            letter in the constraint with the most placed letters, or the
+            first letter of an untouched constraint
+
+        Returns:
+            The letter number, or None if every constraint is resolved
+        """
+        best, best_known = None, -1
+        for cons in self.constraints:
+            known = [self.pos[ltr] != UNUSED for ltr in cons]
+            if known[0] and known[1] or known[2] and known[3]:
+                continue
+            count = sum(known)
+            if count > best_known:
+                best_known = count
+                if known[0] or known[1]:
+                    best = cons[1] if known[0] else cons[0]
+                else:
+                    best = cons[3] if known[2] else cons[2]
+        return best
+
+    def search(self):
+        """
+        Depth first search for a placement satisfying every constraint
+
+        Returns:
+            True if a solution was found (left in pos / at), False if there is
+            none or max_nodes was reached
+        """
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            return False
+        ltr = self._branch_letter()
+        if ltr is None:
+            return True
+        if not self.trail:
+            # keys are equivalent up to rotating rows and columns, so the
+            #   first letter can be fixed to the top left corner
+            candidates = [0]
+        else:
+            candidates = [idx for idx in range(25) if self.at[idx] == UNUSED]
+        depth = len(self.trail)
+        for idx in candidates:
+            if self.place(ltr, idx) and self.search():
+                return True
+            self.undo(depth)
+        return False
+
+    def get_key(self):
+        """
+        Returns the placements as a list representation of a key, with ' '
+            denoting an unknown spot, if a single spot and a single letter are
+            left they are filled in
+        """
+        key = [' '] * 25
+        for idx, ltr in enumerate(self.at):
+            if ltr != UNUSED:
+                key[idx] = chr(ltr + cipher.ORD_A)
+        if key.count(' ') == 1:
+            missing = KEY_LETTERS.difference(key)
+            key[key.index(' ')] = missing.pop()
+        return key
+
+
+def solve(decp_txt, encp_txt, max_nodes=MAX_NODES):
+    """
+    Recovers the key used to encipher decp_txt into encp_txt
+
+    Arguments:
+        decp_txt: deciphered text
+        encp_txt: enciphered text
+        max_nodes: cap on the number of search nodes
+    Returns:
+        Tuple of the key (a list of 25 characters, ' ' for letters that do
+        not appear in the texts, unique only up to rotating rows and
+        columns), or None if no key was found, and the number of search nodes
+        visited
+    """
+    solver = Solver(digraph_constraints(decp_txt, encp_txt), max_nodes)
+    if solver.search():
+        return solver.get_key(), solver.nodes
+    return None, solver.nodes
+
+
+def rotations(key):
+    """Yields the 25 keys equivalent to key by rotating rows and columns"""
+    for d_row in range(5):
+        for d_col in range(5):
+            rotated = [' '] * 25
+            for idx, char in enumerate(key):
+                rotated[(idx // 5 + d_row) % 5 * 5 + (idx % 5 + d_col) % 5] = \
+                    char
+            yield rotated
+
+
+def matches(partial_key, key):
+    """
+    Returns the number of letters of partial_key that are placed as in key,
+        under the best rotation of partial_key
+    """
+    return max(
+        sum(1 for ch1, ch2 in zip(rotated, key) if ch1 == ch2 != ' ')
+        for rotated in rotations(partial_key)
+    )
+
+
+if __name__ == '__main__':
+    TRAINING = cache.get_dataset(DATA_FILE, SUBSET_SZ, SEED)
+    PAIRS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    PAIRS = min(PAIRS, len(TRAINING))
+    TOTAL_TIME = 0
+    SOLVED = 0
+    PLACED = 0
+    for decp, encp, true_key in (TRAINING[idx] for idx in range(PAIRS)):
+        start = time.perf_counter()
+        KEY, NODES = solve(decp, encp)
+        elapsed = time.perf_counter() - start
+        TOTAL_TIME += elapsed
+        if KEY is not None:
+            SOLVED += 1
+            PLACED += matches(KEY, true_key)
+        print("{:.4f}s nodes={} key={}".format(
+            elapsed, NODES, ''.join(KEY) if KEY else None))
+    print("Solved {}/{} pairs, {:.4f}s per pair, {:.2f} correct letters per key"
+          .format(SOLVED, PAIRS, TOTAL_TIME / PAIRS, PLACED / PAIRS))
@@ -0,0 +1,214 @@
+"""Per episode statistics of a dataset, computed once and stored with it
+
+Indexing a dataset (see dataset.py) writes a stats directory next to its
+arrays holding one array per statistic, one entry per episode:
+    distinct_digraphs: number of different digraphs in the deciphered text
+    repeated_digraphs: number of different digraphs occurring more than once
+    doubled_pairs: number of doubled letter pairs of the source text that
+        encipher_text changed to a letter and 'x'
+    distinct_letters: number of different letters in the deciphered and
+        enciphered texts
+and a digraph index: the episodes whose deciphered text contains each
+digraph. The arrays are memory mapped when loaded, so episodes can be
+filtered or bucketed by difficulty without reading any text.
+
+The doubled pairs cannot be told apart from real 'x's in the stored texts, so
+they are counted from the source text, which is read again from the corpus
+(or ingested directory) recorded in the dataset header.
+"""
+import itertools
+import os
+import shutil
+import numpy as np
+import cipher
+import dataset
+import ingest
+import training_data as td
+
+# STATS_DIR: name of the directory of the statistics in a dataset
+STATS_DIR = 'stats'
+
+# STATS: name of each per episode statistic
+STATS = ('distinct_digraphs', 'repeated_digraphs', 'doubled_pairs',
+         'distinct_letters')
+
+# BLOCK_SZ: number of episodes processed at a time
+BLOCK_SZ = 1 << 14
+
+# DIGRAPHS: number of digraph codes, first letter * 26 + second letter
+DIGRAPHS = 26 * 26
+
+
+def _source_chunks(meta, corpus=None):
+    """
+    Yields the source text of every episode of a dataset, in order, from the
+        corpus or directory recorded in its header, or from corpus if given
+    """
+    if corpus is not None:
+        chunks = td.iter_chunks(corpus, meta['subset_sz'])
+    elif 'root' in meta:
+        blocks = ingest.read_files(ingest.iter_files(meta['root']))
+        chunks = td.chunk_blocks(blocks, meta['subset_sz'])
+    elif 'corpus' in meta:
+        chunks = td.iter_chunks(meta['corpus'], meta['subset_sz'])
+    else:
+        raise ValueError("the dataset header records no source text")
+    start = meta.get('start', 0)
+    for idx, chunk in enumerate(chunks):
+        if idx >= start:
+            yield chunk
+
+
+def _folded(texts):
+    """Letter numbers (0-25) of a uint8 array of ascii codes, with j as i"""
+    ltrs = texts.astype(np.intp) - cipher.ORD_A
+    ltrs[ltrs == cipher.LTR_J] = cipher.LTR_I
+    return ltrs
+
+
+def doubled_pairs(source, plain):
+    """
+    Counts the doubled pairs of each source text
+
+    Arguments:
+        source: N x subset_sz uint8 array of the source texts
+        plain: the matching deciphered texts, checked against source so a
+            changed corpus is not silently indexed
+    Returns:
+        Array of the N counts
+    """
+    ltrs = _folded(source)
+    doubled = ltrs[:, 0::2] == ltrs[:, 1::2]
+    expected = ltrs.copy()
+    expected[:, 1::2][doubled] = cipher.LTR_X
+    if not np.array_equal(expected, _folded(plain)):
+        raise ValueError("source text does not match the dataset")
+    return doubled.sum(axis=1)
+
+
+def digraph_stats(plain):
+    """
+    Counts the distinct and repeated digraphs of each text
+
+    Arguments:
+        plain: N x subset_sz uint8 array of deciphered texts
+    Returns:
+        Tuple of the sorted N x subset_sz/2 array of digraph codes, the
+        number of distinct digraphs and the number of repeated digraphs
+    """
+    ltrs = plain.astype(np.intp) - cipher.ORD_A
+    codes = np.sort(ltrs[:, 0::2] * 26 + ltrs[:, 1::2], axis=1)
+    same = codes[:, 1:] == codes[:, :-1]
+    distinct = codes.shape[1] - same.sum(axis=1)
+    # a repeated digraph is a run of equal codes, counted at its first pair
+    run_start = same.copy()
+    run_start[:, 1:] &= ~same[:, :-1]
+    return codes, distinct, run_start.sum(axis=1)
+
+
+def distinct_letters(plain, ciph):
+    """Counts the different letters of each pair of texts"""
+    ltrs = np.concatenate([plain, ciph], axis=1).astype(np.intp) - cipher.ORD_A
+    seen = np.zeros((len(ltrs), 26), dtype=bool)
+    seen[np.arange(len(ltrs))[:, None], ltrs] = True
+    return seen.sum(axis=1)
+
+
+def index(path, corpus=None, block_sz=BLOCK_SZ):
+    """
+    Computes the statistics and the digraph index of a dataset and stores
+        them in its stats directory, replacing any earlier ones
+
+    Arguments:
+        path: directory of the dataset
+        corpus: string path to the corpus the dataset was generated from, by
+            default the one recorded in its header
+        block_sz: number of episodes processed at a time
+    Returns:
+        The statistics, as returned by load
+    """
+    data = dataset.Dataset(path)
+    stats = {name: np.zeros(data.size, dtype=np.uint16) for name in STATS}
+    pair_sz = data.subset_sz // 2
+    counts = np.zeros(DIGRAPHS, dtype=np.int64)
+    # (code, episode) of every distinct digraph of every episode, one array
+    #   per block
+    found = []
+
+    sources = _source_chunks(data.meta, corpus)
+    for start in range(0, data.size, block_sz):
+        stop = min(start + block_sz, data.size)
+        plain, ciph, _ = data.episodes(start, stop)
+        source = cipher.text_array(list(itertools.islice(
+            sources, stop - start)))
+        if len(source) != stop - start:
+            raise ValueError("source text does not match the dataset")
+        codes, distinct, repeated = digraph_stats(plain)
+        stats['distinct_digraphs'][start:stop] = distinct
+        stats['repeated_digraphs'][start:stop] = repeated
+        stats['doubled_pairs'][start:stop] = doubled_pairs(source, plain)
+        stats['distinct_letters'][start:stop] = distinct_letters(plain, ciph)
+
+        first = np.ones(codes.shape, dtype=bool)
+        first[:, 1:] = codes[:, 1:] != codes[:, :-1]
+        episode = np.repeat(np.arange(start, stop), pair_sz).reshape(
+            codes.shape)
+        found.append((codes[first], episode[first]))
+        counts += np.bincount(codes[first], minlength=DIGRAPHS)
+
+    tmp_dir = os.path.join(path, STATS_DIR + '.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, arr in stats.items():
+        np.save(os.path.join(tmp_dir, name + '.npy'), arr)
+    offsets = np.zeros(DIGRAPHS + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    episodes = np.zeros(offsets[-1], dtype=np.uint32)
+    fill = offsets[:-1].copy()
+    for codes, episode in found:
+        # within a block episodes are in order, so a stable sort by code keeps
+        #   each digraph's episodes sorted
+        order = np.argsort(codes, kind='stable')
+        codes, episode = codes[order], episode[order]
+        block_counts = np.bincount(codes, minlength=DIGRAPHS)
+        block_starts = np.cumsum(block_counts) - block_counts
+        dest = fill[codes] + np.arange(len(codes)) - block_starts[codes]
+        episodes[dest] = episode
+        fill += block_counts
+    np.save(os.path.join(tmp_dir, 'digraph_offsets.npy'), offsets)
+    np.save(os.path.join(tmp_dir, 'digraph_episodes.npy'), episodes)
+
+    stats_dir = os.path.join(path, STATS_DIR)
+    shutil.rmtree(stats_dir, ignore_errors=True)
+    os.rename(tmp_dir, stats_dir)
+    return load(path)
+
+
+def load(path):
+    """
+    Opens the statistics of an indexed dataset as memory maps
+
+    Returns:
+        Dictionary of each statistic name (see STATS), 'digraph_offsets' and
+        'digraph_episodes' to its array
+    """
+    stats_dir = os.path.join(path, STATS_DIR)
+    names = STATS + ('digraph_offsets', 'digraph_episodes')
+    return {name: np.load(os.path.join(stats_dir, name + '.npy'),
+                          mmap_mode='r')
+            for name in names}
+
+
+def episodes_with(stats, digraph):
+    """
+    Returns the sorted array of the episodes whose deciphered text contains
+        a digraph
+
+    Arguments:
+        stats: statistics returned by load
+        digraph: string of two lowercase letters
+    """
+    code = (ord(digraph[0]) - cipher.ORD_A) * 26 + ord(digraph[1]) \
+        - cipher.ORD_A
+    offsets = stats['digraph_offsets']
+    return stats['digraph_episodes'][offsets[code]:offsets[code + 1]]
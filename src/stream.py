@@ -0,0 +1,176 @@
+"""Contains methods to encipher and decipher arbitrarily large texts in fixed
+size blocks"""
+import argparse
+from string import ascii_lowercase, ascii_uppercase
+import cipher
+
+# BLOCK_SZ: default number of bytes read from a file at a time
+BLOCK_SZ = 1 << 20
+
+# FILLER: character used to complete a final digraph that is missing its
+#   second letter
+FILLER = 'x'
+
+# _LOWER: translation table lower casing letters
+_LOWER = bytes.maketrans(
+    (ascii_uppercase + ascii_lowercase).encode('ascii'),
+    (ascii_lowercase * 2).encode('ascii')
+)
+
+# _FOLD: translation table lower casing letters and changing j's to i's
+_FOLD = _LOWER.replace(b'j', b'i')
+
+# _DROP: every byte that is not a letter
+_DROP = bytes(
+    code for code in range(256)
+    if chr(code) not in ascii_lowercase + ascii_uppercase
+)
+
+
+def read_blocks(inf, block_sz=BLOCK_SZ):
+    """
+    Yields the contents of an open binary file block_sz bytes at a time
+    """
+    while True:
+        block = inf.read(block_sz)
+        if not block:
+            return
+        yield block
+
+
+def normalize_blocks(blocks, fold_j=True):
+    """
+    Maps blocks of text onto the Playfair alphabet: lower cases letters,
+        changes j's to i's and removes every other character
+
+    Arguments:
+        blocks: iterable of strings or bytes
+        fold_j: if False j's are kept, giving the alphabet of generate_data
+    Returns:
+        Generator of normalized strings, one per input block (possibly empty)
+    """
+    table = _FOLD if fold_j else _LOWER
+    for block in blocks:
+        if isinstance(block, str):
+            block = block.encode('ascii', 'ignore')
+        yield block.translate(table, _DROP).decode('ascii')
+
+
+def digraph_blocks(blocks, filler=FILLER):
+    """
+    Regroups normalized blocks so every yielded block has an even length, a
+        letter left over at the end of a block is carried into the next one so
+        no digraph is split, and the final letter (if any) is completed with
+        filler
+
+    Arguments:
+        blocks: iterable of normalized strings
+        filler: character added to a final unpaired letter, or None to raise
+            a ValueError instead
+    Returns:
+        Generator of non empty strings of even length
+    """
+    carry = ''
+    for block in blocks:
+        block = carry + block
+        split = len(block) - len(block) % 2
+        carry = block[split:]
+        if split:
+            yield block[:split]
+    if carry:
+        if filler is None:
+            raise ValueError("text must have an even number of characters")
+        yield carry + filler
+
+
+def encipher_stream(key, blocks, filler=FILLER):
+    """
+    Enciphers a stream of text blocks, holding a single block in memory at a
+        time
+
+    Arguments:
+        key: 5 x 5 array of unique letters not including 'j', or its
+            KeySchedule
+        blocks: iterable of strings or bytes of plain text, any characters
+            outside of the alphabet are removed
+        filler: character completing an odd length text
+    Returns:
+        Generator of enciphered strings
+    """
+    schedule = cipher.compile_key(key)
+    for block in digraph_blocks(normalize_blocks(blocks), filler):
+        yield schedule.encipher(block)
+
+
+def decipher_stream(key, blocks):
+    """
+    Deciphers a stream of text blocks, holding a single block in memory at a
+        time
+
+    Arguments:
+        key: 5 x 5 array of unique letters not including 'j', that was used to
+            encipher the text, or its KeySchedule
+        blocks: iterable of strings or bytes of cipher text
+    Returns:
+        Generator of deciphered strings
+    """
+    schedule = cipher.compile_key(key)
+    for block in digraph_blocks(normalize_blocks(blocks), None):
+        yield schedule.decipher(block)
+
+
+def _transform_file(transform, key, in_name, out_name, block_sz):
+    """
+    Writes the output of transform over the blocks of in_name to out_name,
+        returning the number of characters written
+    """
+    written = 0
+    with open(in_name, 'rb') as inf, open(out_name, 'w') as outf:
+        for block in transform(key, read_blocks(inf, block_sz)):
+            outf.write(block)
+            written += len(block)
+    return written
+
+
+def encipher_file(key, in_name, out_name, block_sz=BLOCK_SZ):
+    """
+    Enciphers the file in_name into the file out_name using bounded memory
+
+    Arguments:
+        key: the key to encipher with
+        in_name: string path to a plain text file
+        out_name: string path the cipher text is written to
+        block_sz: number of bytes read at a time
+    Returns:
+        The number of enciphered characters written
+    """
+    return _transform_file(encipher_stream, key, in_name, out_name, block_sz)
+
+
+def decipher_file(key, in_name, out_name, block_sz=BLOCK_SZ):
+    """
+    Deciphers the file in_name into the file out_name using bounded memory
+
+    Arguments:
+        key: the key the file was enciphered with
+        in_name: string path to a cipher text file
+        out_name: string path the deciphered text is written to
+        block_sz: number of bytes read at a time
+    Returns:
+        The number of deciphered characters written
+    """
+    return _transform_file(decipher_stream, key, in_name, out_name, block_sz)
+
+
+if __name__ == '__main__':
+    PARSER = argparse.ArgumentParser(
+        description='Encipher or decipher a file with a Playfair key'
+    )
+    PARSER.add_argument('mode', choices=['encipher', 'decipher'])
+    PARSER.add_argument('key', help='the 25 letters of the key')
+    PARSER.add_argument('infile')
+    PARSER.add_argument('outfile')
+    PARSER.add_argument('--block-sz', type=int, default=BLOCK_SZ)
+    ARGS = PARSER.parse_args()
+    TRANSFORM = encipher_file if ARGS.mode == 'encipher' else decipher_file
+    print(TRANSFORM(ARGS.key, ARGS.infile, ARGS.outfile, ARGS.block_sz))
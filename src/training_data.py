@@ -1,8 +1,76 @@
 """Houses method to read in and format training data"""
-from string import ascii_lowercase
+import collections
+import multiprocessing
+import random
+import cipher
+import dataset
+import stream
 from cipher import encipher_text, decipher_text, generate_key
 
-def generate_data(filename, subset_sz):
+# SHARD_SZ: number of chunks handed to a worker at a time by generate_dataset
+SHARD_SZ = 4096
+
+
+def chunk_blocks(blocks, subset_sz, keep_tail=False):
+    """
+    Regroups blocks of raw text into chunks of its letters (lower cased)
+
+    Arguments:
+        blocks: iterable of bytes (or strings) of text
+        subset_sz: size of each chunk of text
+        keep_tail: if True the final chunk is yielded even if it is shorter
+            than subset_sz, otherwise it is dropped
+    Returns:
+        Generator of strings of subset_sz letters
+    """
+    text = ""
+    for block in stream.normalize_blocks(blocks, fold_j=False):
+        text += block
+        end = len(text) - len(text) % subset_sz
+        for idx in range(0, end, subset_sz):
+            yield text[idx:idx + subset_sz]
+        text = text[end:]
+    if text and keep_tail:
+        yield text
+
+
+def iter_chunks(filename, subset_sz, keep_tail=False,
+                block_sz=stream.BLOCK_SZ):
+    """
+    Reads a text file in large blocks, keeping only its letters (lower
+        cased), and lazily yields it in chunks
+
+    Arguments:
+        filename: string path to a text file
+        subset_sz: size of each chunk of text
+        keep_tail: if True the final chunk is yielded even if it is shorter
+            than subset_sz, otherwise it is dropped
+        block_sz: number of bytes read at a time
+    Returns:
+        Generator of strings of subset_sz letters
+    """
+    with open(filename, 'rb') as inf:
+        yield from chunk_blocks(stream.read_blocks(inf, block_sz), subset_sz,
+                                keep_tail)
+
+
+def count_letters(filename, block_sz=stream.BLOCK_SZ):
+    """Returns the number of letters iter_chunks reads from a text file"""
+    with open(filename, 'rb') as inf:
+        blocks = stream.normalize_blocks(stream.read_blocks(inf, block_sz),
+                                         fold_j=False)
+        return sum(len(block) for block in blocks)
+
+
+def chunk_key(seed, idx):
+    """
+    Returns the key of chunk number idx, derived from the master seed alone,
+        so a chunk gets the same key however the chunks are split up
+    """
+    return generate_key(random.Random('{}:{}'.format(seed, idx)))
+
+
+def generate_data(filename, subset_sz, keep_tail=False, seed=None):
     """
     Creates list of training data tuples (each containing deciphered text,
         enciphered text, and cipher keys) from file containing plain_text
@@ -10,33 +78,138 @@ def generate_data(filename, subset_sz):
     Arguments:
         filename: string path to a text file
         subset_sz: size of each chunk of text in the returned training data
+        keep_tail: if True a final chunk shorter than subset_sz is kept,
+            padded with 'x' to an even length
+        seed: master seed of the keys (see chunk_key), if None the global
+            random module is used
     Returns:
         list of size SUBSET_SZ of tuples of deciphered text, enciphered
         text, and cipher keys in that order
     """
-    input_chars = ""
-
-    # plain_text: List of strings containing <SUBSET_SZ> characters from
-    #   INPUT_CHARS
-    plain_text = []
-
-    with open(filename) as inf:
-        for line in inf:
-            for char in line:
-                char = char.lower()
-                if char in ascii_lowercase:
-                    input_chars += char
-
-    for idx in range(0, len(input_chars), subset_sz):
-        plain_text.append((input_chars[idx:idx + subset_sz]))
-    del plain_text[-1]
-
     # training: list of size SUBSET_SZ of tuples of deciphered text, enciphered
     #   text, and cipher keys in that order
     training = []
 
-    for text in plain_text:
-        key = generate_key()
+    for idx, text in enumerate(iter_chunks(filename, subset_sz, keep_tail)):
+        if len(text) % 2:
+            text += stream.FILLER
+        key = generate_key() if seed is None else chunk_key(seed, idx)
         cipher_text = encipher_text(key, text)
         training.append((decipher_text(key, cipher_text), cipher_text, key))
     return training
+
+
+def encipher_chunks(seed, start, chunks):
+    """
+    Enciphers consecutive chunks with the batch api
+
+    Arguments:
+        seed: master seed of the keys
+        start: index of the first chunk, see chunk_key
+        chunks: list of strings of the same even length
+    Returns:
+        Tuple of the uint8 arrays of the deciphered texts, enciphered texts
+        and keys
+    """
+    keys = cipher.key_array(
+        [chunk_key(seed, start + idx) for idx in range(len(chunks))]
+    )
+    encp = cipher.encipher_batch(keys, cipher.text_array(chunks))
+    return cipher.decipher_batch(keys, encp), encp, keys
+
+
+def imap_bounded(pool, func, iterable, window=None):
+    """
+    Like pool.imap, but only window items (by default twice the number of
+        processes) are read from iterable ahead of the results, so a large
+        input is never all held in memory
+
+    Returns:
+        Generator of the results, in the order of iterable
+    """
+    window = window or 2 * pool._processes
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(pool.apply_async(func, (item,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+# _COLUMNS: the dataset columns opened by each generate_dataset worker
+_COLUMNS = None
+
+
+def _open_dataset(path):
+    """Pool initializer, opens the dataset being generated for writing"""
+    global _COLUMNS
+    _COLUMNS = dataset.open_columns(path, 'r+')
+
+
+def _generate_shard(work):
+    """
+    Enciphers a shard of chunks with the batch api and writes it into the
+        dataset opened by _open_dataset
+
+    Arguments:
+        work: tuple of the master seed, the index of the first chunk, and the
+            list of chunks
+    """
+    seed, start, chunks = work
+    plain, ciph, key = _COLUMNS
+    stop = start + len(chunks)
+    plain[start:stop], ciph[start:stop], key[start:stop] = encipher_chunks(
+        seed, start, chunks)
+    for arr in _COLUMNS:
+        arr.flush()
+    return len(chunks)
+
+
+def _shards(filename, subset_sz, seed, shard_sz):
+    """Yields (seed, start index, chunks) work items for _generate_shard"""
+    shard = []
+    start = 0
+    for text in iter_chunks(filename, subset_sz):
+        shard.append(text)
+        if len(shard) == shard_sz:
+            yield seed, start, shard
+            start += len(shard)
+            shard = []
+    if shard:
+        yield seed, start, shard
+
+
+def generate_dataset(filename, subset_sz, path, seed, workers=None,
+                     shard_sz=SHARD_SZ, **extra):
+    """
+    Generates training data straight into an on disk dataset, spreading the
+        chunks over a pool of processes. Each chunk's key only depends on the
+        seed and the chunk's index, so the dataset is byte for byte the same
+        whatever the number of workers, and the same as generate_data with the
+        same seed
+
+    Arguments:
+        filename: string path to a text file
+        subset_sz: size of each chunk of text, must be even
+        path: directory the dataset is written to
+        seed: master seed of the keys
+        workers: number of processes, defaults to the number of cpus
+        shard_sz: number of chunks handed to a worker at a time
+        extra: additional entries stored in the dataset header
+    Returns:
+        The dataset.Dataset
+    """
+    if subset_sz % 2:
+        raise ValueError("subset_sz must be even")
+    size = count_letters(filename) // subset_sz
+    arrays = dataset.allocate(path, size, subset_sz)
+    del arrays
+    with multiprocessing.Pool(workers, _open_dataset, (path,)) as pool:
+        work = _shards(filename, subset_sz, seed, shard_sz)
+        written = sum(imap_bounded(pool, _generate_shard, work))
+    if written != size:
+        raise IOError("{} changed while generating the dataset".format(
+            filename))
+    dataset.finish(path, size, subset_sz, seed=seed, **extra)
+    return dataset.Dataset(path)
@@ -0,0 +1,102 @@
+"""A batch of key environments stepped together
+
+VecKeyEnv keeps N KeyStates and the stacked N x keyenv.STATE_DIM array of
+their states, so an agent can pick the actions of the whole batch with one
+network call (see agent.OurAgent.act_batch). An environment whose episode ends
+starts the next episode of an episode source right away.
+"""
+import random
+import numpy as np
+import keyenv
+
+
+class VecKeyEnv:
+    """
+    Batch of key environments
+
+    Attributes:
+        envs: list of the KeyState of each environment, None once the episode
+            source ran out
+        states: num_envs x keyenv.STATE_DIM uint8 array of the current state
+            of each environment, zeros for the environments that are not
+            running
+        subset_sz: number of characters of each episode
+        finished: number of episodes that ended
+        placed: number of letters placed in the episodes that ended
+        seed: master seed of the rngs of the KeyStates, the rng of episode
+            number idx is keyenv.episode_rng(seed, idx)
+        started: number of episodes started
+    """
+
+    def __init__(self, source, num_envs, subset_sz=keyenv.SUBSET_SZ,
+                 seed=None):
+        """
+        Arguments:
+            source: iterable of (deciphered text, enciphered text, key)
+                episodes
+            num_envs: number of environments
+            subset_sz: number of characters of each episode
+            seed: master seed of the rngs of the KeyStates, by default bits
+                of the random module
+        """
+        self.subset_sz = subset_sz
+        self.finished = 0
+        self.placed = 0
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.started = 0
+        self._source = iter(source)
+        self.envs = [None] * num_envs
+        self.states = np.zeros((num_envs, keyenv.STATE_DIM), dtype=np.uint8)
+        for idx in range(num_envs):
+            self._reset(idx)
+
+    def __len__(self):
+        return len(self.envs)
+
+    @property
+    def active(self):
+        """Boolean array, True for the environments still running episodes"""
+        return np.array([ken is not None for ken in self.envs])
+
+    def _reset(self, idx):
+        """Starts the next episode of the source in environment idx"""
+        try:
+            episode = next(self._source)
+        except StopIteration:
+            self.envs[idx] = None
+            self.states[idx] = 0
+            return
+        ken = keyenv.KeyState(episode[0], episode[1],
+                              keyenv.episode_rng(self.seed, self.started))
+        self.started += 1
+        self.envs[idx] = ken
+        self.states[idx] = ken.get_state()
+
+    def step(self, actions):
+        """
+        Makes one action in every running environment, then starts the next
+            episode in the environments whose episode ended
+
+        Arguments:
+            actions: array of the action of each environment, ignored for the
+                environments that are not running
+        Returns:
+            Tuple of a copy of the states (the first state of the next episode
+            for the environments whose episode ended), the rewards and the
+            done flags of the actions. The environments that are not running
+            get a reward of 0 and are always done.
+        """
+        rewards = np.zeros(len(self.envs), dtype=np.int64)
+        dones = np.ones(len(self.envs), dtype=bool)
+        for idx, ken in enumerate(self.envs):
+            if ken is None:
+                continue
+            state, rewards[idx], done = ken.make_action(actions[idx])
+            if done or ken.txt_idx >= self.subset_sz:
+                self.finished += 1
+                self.placed += ken.num_used
+                self._reset(idx)
+            else:
+                dones[idx] = False
+                self.states[idx] = state
+        return self.states.copy(), rewards, dones
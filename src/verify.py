@@ -0,0 +1,99 @@
+"""Checks many candidate keys against a deciphered text / enciphered text pair
+at once"""
+import numpy as np
+import cipher
+import solver
+
+# SPACE: ascii code marking an unused spot in a partial key
+SPACE = ord(' ')
+
+# FOLLOWS[p, q]: True if an enciphered letter at q can come from a plain
+#   letter at p (same row, or directly below)
+FOLLOWS = np.array([[solver._can_follow(idx1, idx2) for idx2 in range(25)]
+                    for idx1 in range(25)])
+
+# ROW_COL[p, q]: True if positions p and q share a row or a column
+ROW_COL = np.array([[solver._row_or_col(idx1, idx2) for idx2 in range(25)]
+                    for idx1 in range(25)])
+
+
+def partial_key_array(keys):
+    """
+    Converts (partial) keys to an N x 25 uint8 array of ascii codes, with
+        SPACE at unused spots
+
+    Arguments:
+        keys: list of keys as lists of 25 characters (' ' for unused spots,
+            as returned by KeyState.get_key) or strings, or an array already
+            in this form
+    """
+    if isinstance(keys, np.ndarray):
+        return keys.astype(np.uint8, copy=False).reshape(-1, 25)
+    return cipher.key_array(keys)
+
+
+def verify_keys(decp_txt, encp_txt, keys):
+    """
+    Checks every digraph of a text pair against every candidate key
+
+    Arguments:
+        decp_txt: deciphered text
+        encp_txt: enciphered text
+        keys: K candidate keys, see partial_key_array
+    Returns:
+        Tuple of a length K array of the number of digraphs each key
+        enciphers correctly (all four letters placed and consistent), and a
+        K x D boolean array marking the digraphs that contradict each key
+    """
+    if len(decp_txt) != len(encp_txt) or len(decp_txt) % 2:
+        raise ValueError("texts must have the same even length")
+    cons = np.array([
+        (ord(a), ord(b), ord(c), ord(d)) for a, b, c, d in zip(
+            decp_txt[0::2], decp_txt[1::2], encp_txt[0::2], encp_txt[1::2])
+    ], dtype=np.intp).reshape(-1, 4) - cipher.ORD_A
+    if cons.size and (cons.min() < 0 or cons.max() > 25):
+        raise ValueError("texts must only contain lowercase letters")
+    cons[cons == cipher.LTR_J] = cipher.LTR_I
+    # 1. If both letters are the same, the second was enciphered as 'x'
+    cons[cons[:, 0] == cons[:, 1], 1] = cipher.LTR_X
+
+    keys = partial_key_array(keys)
+    count = len(keys)
+    rows = np.arange(count)[:, None]
+    # key_ltrs: letter number at each key position, -1 for unused spots
+    key_ltrs = keys.astype(np.intp) - cipher.ORD_A
+    key_ltrs[keys == SPACE] = -1
+    # inv: position of each letter number in each key, -1 if not placed
+    inv = np.full((count, 27), -1, dtype=np.intp)
+    inv[rows, np.where(key_ltrs < 0, 26, key_ltrs)] = np.arange(25)
+    inv = inv[:, :26]
+    inv[:, cipher.LTR_J] = inv[:, cipher.LTR_I]
+
+    pos = [inv[:, cons[:, col]] for col in range(4)]
+    placed = [each >= 0 for each in pos]
+    safe = [np.maximum(each, 0) for each in pos]
+    conflicts = np.zeros((count, len(cons)), dtype=bool)
+
+    def check_forced(table, src1, src2, dst1, dst2):
+        """
+        Marks conflicts where the letters src1 and src2 are placed but the
+            positions they force dst1 and dst2 into disagree with the key
+        """
+        both = placed[src1] & placed[src2]
+        out = table[safe[src1], safe[src2]]
+        for dst, out_pos in ((dst1, out[..., 0]), (dst2, out[..., 1])):
+            wrong = placed[dst] & (pos[dst] != out_pos)
+            at_out = key_ltrs[rows, out_pos]
+            wrong |= (at_out >= 0) & (at_out != cons[:, dst])
+            conflicts[both & wrong] = True
+        return both
+
+    plain_placed = check_forced(cipher.ENC_POS, 0, 1, 2, 3)
+    check_forced(cipher.DEC_POS, 2, 3, 0, 1)
+    for src, dst, table in ((0, 2, FOLLOWS), (1, 3, FOLLOWS),
+                            (0, 3, ROW_COL), (1, 2, ROW_COL)):
+        both = placed[src] & placed[dst]
+        conflicts |= both & ~table[safe[src], safe[dst]]
+
+    explained = plain_placed & placed[2] & placed[3] & ~conflicts
+    return explained.sum(axis=1), conflicts